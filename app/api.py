@@ -0,0 +1,332 @@
+"""
+Read-only JSON API over the derived player metrics: per-90s, role scores and
+performance indices of the shared dataset.
+
+    python app/api.py [--host 127.0.0.1] [--port 8600]
+
+    GET /players?team=Arsenal&position=MID&min_minutes=900&limit=50&offset=0
+    GET /teams?position=DEF
+    GET /leaderboards
+    GET /leaderboards/Attack_Index?k=10&team=Chelsea&bands=1
+    GET /filters
+
+Every endpoint takes league= and season= to pick a partition (the catalog
+default otherwise), and bands=1 adds bootstrap confidence bounds to index and
+role score leaderboards. Responses carry an ETag derived from the dataset
+version and the normalized request, so If-None-Match is answered with 304
+without touching the data, and rendered bodies are kept in an LRU response
+cache.
+"""
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+import utils.catalog as catalog
+import utils.group_stats as gs
+from components.team_analysis import team_stats_table
+from utils.cube import get_cube
+from utils.data_loader import get_dataset, get_dataset_version, loaded_dataset_version
+from utils.filter_index import apply_filters
+from utils.indices import SCORE_COLUMNS, get_index_store
+from utils.ranks import get_rank_engine, leaderboard
+from utils.uncertainty import BAND_COLUMNS, get_bootstrap_engine
+
+# Rendered response bodies kept across requests
+RESPONSE_CACHE_SIZE = 1024
+# Rows returned by /players when no limit is given
+DEFAULT_LIMIT = 100
+MAX_HEADER_BYTES = 16384
+
+PLAYER_COLUMNS = ['Player Name', 'Club', 'Position', 'Nationality', 'League', 'Season', 'Appearances', 'Minutes']
+METRIC_COLUMNS = [
+    'Goals_per_90', 'Assists_per_90', 'G+A_per_90', 'Shot_Accuracy', 'Key_Passes_per_90',
+    'Progressive_per_90', 'Defensive_per_90', 'Duel_Success_Rate', 'Clean_Sheet_Rate', 'Card Score'
+] + list(gs.ROLE_WEIGHTS)
+# Query parameters whose values are sets: their order does not change a response
+SET_PARAMETERS = {'team', 'position'}
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """A parsed GET with its query normalized into a cache key"""
+
+    def __init__(self, target):
+        url = urlsplit(target)
+        self.path = unquote(url.path).rstrip('/') or '/'
+        self.query = parse_qs(url.query)
+        self.key = (self.path, tuple(sorted(
+            (name, tuple(sorted(values)) if name in SET_PARAMETERS else tuple(values))
+            for name, values in self.query.items()
+        )))
+
+    def get(self, name, default=None):
+        values = self.query.get(name)
+        return values[-1] if values else default
+
+    def integer(self, name, default, low=0, high=None):
+        value = self.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ApiError(400, f"{name} must be an integer") from None
+        if high is None and value < low:
+            raise ApiError(400, f"{name} must be >= {low}")
+        if high is not None and not low <= value <= high:
+            raise ApiError(400, f"{name} must be between {low} and {high}")
+        return value
+
+    @property
+    def partitions(self):
+        default = catalog.default_partition()
+        return ((self.get('league', default.league), self.get('season', default.season)),)
+
+    @property
+    def selection(self):
+        """(teams, positions, min_minutes) in the form the indexes cache by"""
+        return (
+            sorted(self.query.get('team', [])) or None,
+            sorted(self.query.get('position', [])) or None,
+            self.integer('min_minutes', 0)
+        )
+
+
+def _json(**fields):
+    """JSON object of the fields; frames are written by pandas as lists of records"""
+    items = (
+        (json.dumps(name), value.to_json(orient='records') if isinstance(value, pd.DataFrame) else json.dumps(value))
+        for name, value in fields.items()
+    )
+    return '{' + ','.join(f'{name}:{value}' for name, value in items) + '}'
+
+
+def players(df, version, request):
+    teams, positions, min_minutes = request.selection
+    limit = request.integer('limit', DEFAULT_LIMIT, low=1)
+    offset = request.integer('offset', 0)
+    rows = apply_filters(df, teams, positions, min_minutes)
+    name = request.get('name')
+    if name is not None:
+        rows = rows[rows['Player Name'].str.casefold() == name.casefold()]
+    page = rows.iloc[offset:offset + limit]
+    # Indices are standardized against the requested cohort, as on the Advanced Metrics page
+    scores = get_index_store(df, version).scores(teams, positions, min_minutes)
+    page = page[PLAYER_COLUMNS + METRIC_COLUMNS].join(scores[SCORE_COLUMNS])
+    return _json(version=version, count=len(rows), offset=offset, players=page)
+
+
+def teams(df, version, request):
+    selection = request.selection
+    table = team_stats_table(df, *selection)
+    table.insert(1, 'Players', get_cube(df).rollup('Club', *selection).size.reindex(table['Club']).to_numpy())
+    return _json(version=version, teams=table)
+
+
+def leaderboards(df, version, request, metric=None):
+    engine = get_rank_engine(df)
+    if metric is None:
+        return _json(version=version, metrics=SCORE_COLUMNS + engine.metrics)
+    k = request.integer('k', 10, low=1, high=100)
+    teams, positions, min_minutes = request.selection
+    if metric in SCORE_COLUMNS:
+        scores = get_index_store(df, version).scores(teams, positions, min_minutes)
+        # Scores are rebuilt per selection, so a RankEngine over them would not be reused
+        top = scores.nlargest(k, metric)[[metric]]
+        rows = df.loc[top.index, PLAYER_COLUMNS].join(top)
+    elif metric in engine.metrics:
+        rows = leaderboard(df, metric, k, list(dict.fromkeys(PLAYER_COLUMNS + [metric])), teams, positions, min_minutes)
+    else:
+        raise ApiError(404, f"Unknown metric {metric!r}; see /leaderboards")
+    if request.get('bands') == '1' and metric in BAND_COLUMNS:
+        bands = get_bootstrap_engine(df).bands(teams, positions, min_minutes)
+        rows = rows.join(bands[[f'{metric}_low', f'{metric}_high']])
+    return _json(version=version, metric=metric, players=rows)
+
+
+def filters(df, version, request):
+    return _json(
+        version=version,
+        partitions=[{'league': p.league, 'season': p.season} for p in catalog.load_catalog()],
+        clubs=sorted(df['Club'].unique()),
+        positions=sorted(df['Position'].unique()),
+        max_minutes=int(df['Minutes'].max())
+    )
+
+
+ROUTES = {'/players': players, '/teams': teams, '/leaderboards': leaderboards, '/filters': filters}
+
+
+def render(request, version):
+    """Body of a request against the dataset version it was keyed with"""
+    df = get_dataset(request.partitions)
+    if request.path.startswith('/leaderboards/'):
+        return leaderboards(df, version, request, request.path[len('/leaderboards/'):])
+    if request.path not in ROUTES:
+        raise ApiError(404, f"Unknown endpoint {request.path}; use one of {', '.join(ROUTES)}")
+    return ROUTES[request.path](df, version, request)
+
+
+class ResponseCache:
+    """LRU cache of rendered bodies keyed by dataset version and normalized request"""
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._bodies = collections.OrderedDict()
+
+    def get(self, key):
+        body = self._bodies.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._bodies.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        self._bodies[key] = body
+        while len(self._bodies) > self.maxsize:
+            self._bodies.popitem(last=False)
+
+
+class ApiServer:
+    """
+    HTTP/1.1 server with keep-alive on asyncio streams. Cache hits and 304s
+    are answered on the event loop; bodies are rendered in worker threads,
+    and concurrent requests for the same body share one render
+    """
+
+    def __init__(self, cache_size=RESPONSE_CACHE_SIZE):
+        self.cache = ResponseCache(cache_size)
+        self._pending = {}
+
+    async def version(self, partitions):
+        # Selections in memory are answered on the event loop; any other
+        # (first use, or evicted from the dataset LRU) is loaded in a worker
+        version = loaded_dataset_version(partitions)
+        if version is None:
+            loop = asyncio.get_running_loop()
+            version = await loop.run_in_executor(None, get_dataset_version, partitions)
+        return version
+
+    async def respond(self, method, target, headers):
+        """(status, headers, body) of one request"""
+        if method not in ('GET', 'HEAD'):
+            raise ApiError(405, "Only GET and HEAD are supported")
+        request = Request(target)
+        try:
+            version = await self.version(request.partitions)
+        except KeyError as exc:
+            raise ApiError(404, str(exc.args[0])) from None
+        key = (version, request.key)
+        etag = f'"{version}-{hashlib.sha1(repr(request.key).encode()).hexdigest()[:16]}"'
+        response_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in (tag.strip() for tag in headers.get('if-none-match', '').split(',')):
+            return 304, response_headers, b''
+
+        body = self.cache.get(key)
+        if body is None:
+            if key not in self._pending:
+                loop = asyncio.get_running_loop()
+                self._pending[key] = loop.run_in_executor(None, lambda: render(request, version).encode())
+            try:
+                body = await self._pending[key]
+            finally:
+                self._pending.pop(key, None)
+            self.cache.put(key, body)
+        return 200, response_headers, body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.send(writer, 431, {}, b'', keep_alive=False)
+                    break
+                request_line, *lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+                try:
+                    method, target, http_version = request_line.split(' ', 2)
+                except ValueError:
+                    await self.send(writer, 400, {}, b'', keep_alive=False)
+                    break
+                headers = {}
+                for line in lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length', '0') != '0':
+                    await reader.readexactly(int(headers['content-length']))
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if http_version == 'HTTP/1.0' else connection != 'close'
+
+                try:
+                    status, response_headers, body = await self.respond(method, target, headers)
+                except ApiError as exc:
+                    status, response_headers, body = exc.status, {}, _json(error=str(exc)).encode()
+                except Exception as exc:
+                    status, response_headers, body = 500, {}, _json(error=repr(exc)).encode()
+                await self.send(writer, status, response_headers, b'' if method == 'HEAD' else body,
+                                keep_alive, len(body))
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def send(writer, status, headers, body, keep_alive, length=None):
+        head = [f'HTTP/1.1 {status} {REASONS.get(status, "")}']
+        if status != 304:
+            head.append('Content-Type: application/json')
+            head.append(f'Content-Length: {len(body) if length is None else length}')
+        head.extend(f'{name}: {value}' for name, value in headers.items())
+        head.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8600):
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+
+
+async def serve(host, port):
+    server = await ApiServer().start(host, port)
+    print(f"Serving on http://{host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the derived player metrics as a JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    args = parser.parse_args()
+
+    # Load the default partition before accepting requests
+    start = time.perf_counter()
+    get_dataset_version()
+    print(f"Loaded dataset in {time.perf_counter() - start:.1f}s")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
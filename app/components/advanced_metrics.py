@@ -4,9 +4,19 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from scipy import stats
-from utils.data_loader import filter_data, get_team_colors
+from utils.data_loader import get_dataset, get_dataset_version, get_team_colors
+from utils.filter_index import apply_session_filters
+from utils.cube import get_cube
+from utils.correlation import get_correlation_cube
+from utils.indices import get_index_store
+from utils.recruitment import RECRUITMENT_PROFILES, get_recruitment_engine
+from utils.uncertainty import BOOTSTRAP_RESAMPLES, CONFIDENCE, get_bootstrap_engine
+from utils.profiling import span, timed
+from utils.figure_cache import cached_figure, filter_key
+from utils import charts
 import utils.group_stats as gs
 
+@timed()
 def advanced_metrics():
     """
     Advanced metrics component showing correlations and advanced statistics
@@ -14,172 +24,224 @@ def advanced_metrics():
     st.title("Advanced Metrics")
     
     # Get filtered data
-    df = st.session_state.data
+    filters = st.session_state.filters
+    dataset = get_dataset(filters['partitions'])
+    df = apply_session_filters(dataset, filters)
+    if df.empty:
+        st.info("No players match the selected filters")
+        return
+
+    # Figures are cached per filter selection, dataset version and page options
+    version = get_dataset_version(filters['partitions'])
+    selection = (filters['team'], filters['position'], filters['min_minutes'])
+
+    def figure(chart, build, params=()):
+        return cached_figure('advanced_metrics', chart, version, filter_key(*selection), build, params)
     
     # Correlation Analysis
     st.subheader("Performance Metrics Correlation")
     
-    # Select metrics for correlation
-    numeric_cols = ['Goals', 'Assists', 'Shots', 'Shots On Target', 
-                   'Passes', 'Successful Passes', 'Progressive Carries',
-                   'Possession Won', 'Minutes']
-    
-    correlation_matrix = df[numeric_cols].corr()
-    
-    fig_corr = px.imshow(
-        correlation_matrix,
-        labels=dict(color="Correlation"),
-        x=numeric_cols,
-        y=numeric_cols,
-        color_continuous_scale="RdBu",
-        aspect="auto"
+    # Select metrics for correlation; any numeric metric can be added
+    correlation_cube = get_correlation_cube(dataset)
+    numeric_cols = st.multiselect(
+        "Metrics",
+        correlation_cube.metrics,
+        default=['Goals', 'Assists', 'Shots', 'Shots On Target',
+                 'Passes', 'Successful Passes', 'Progressive Carries',
+                 'Possession Won', 'Minutes']
     )
-    st.plotly_chart(fig_corr)
+    
+    if len(numeric_cols) < 2:
+        st.info("Select at least two metrics to correlate")
+    else:
+        def correlation():
+            correlation_matrix = correlation_cube.corr(numeric_cols, *selection)
+            
+            return px.imshow(
+                correlation_matrix,
+                labels=dict(color="Correlation"),
+                x=numeric_cols,
+                y=numeric_cols,
+                color_continuous_scale="RdBu",
+                aspect="auto"
+            )
+        st.plotly_chart(figure('correlation', correlation, tuple(numeric_cols)))
     
     # Performance Indices
     st.subheader("Player Performance Index")
     
-    # Calculate performance index
-    df['Attack_Index'] = (
-        stats.zscore(df['Goals']) + 
-        stats.zscore(df['Assists']) + 
-        stats.zscore(df['Shots On Target'])
-    ) / 3
-    
-    df['Possession_Index'] = (
-        stats.zscore(df['Successful Passes']) + 
-        stats.zscore(df['Progressive Carries']) + 
-        stats.zscore(df['Possession Won'])
-    ) / 3
-    
-    df['Defense_Index'] = (
-        stats.zscore(df['Tackles']) +
-        stats.zscore(df['Interceptions']) +
-        stats.zscore(df['Blocks']) +
-        stats.zscore(df['Clean Sheets'])
-    ) / 4
+    # Indices and z-scores come from the index store of this dataset version;
+    # standardizing within positions compares players with their peers
+    cohort = st.radio(
+        "Standardize against",
+        ["Selected players", "Same position"],
+        horizontal=True
+    )
+    store = get_index_store(dataset, version)
+    scores = store.scores(
+        filters['team'], filters['position'], filters['min_minutes'],
+        by='Position' if cohort == "Same position" else None
+    )
+    df = df[['Player Name', 'Club', 'Position', 'Minutes', 'Appearances',
+             'G+A_per_90', 'Passes %']].join(scores)
+
+    # Bootstrap bands: low-minute players' scores rest on few events
+    uncertainty = st.toggle(
+        "Show confidence bands",
+        key='advanced_uncertainty',
+        help=f"{CONFIDENCE:.0%} bootstrap intervals from resampling every player's season totals"
+    )
+    if uncertainty:
+        with span('bootstrap'):
+            intervals = get_bootstrap_engine(dataset).bands(
+                *selection, by='Position' if cohort == "Same position" else None
+            )
+        if intervals.attrs['resamples'] < BOOTSTRAP_RESAMPLES:
+            st.caption(f"Bands from {intervals.attrs['resamples']} resamples for this cohort of {len(intervals):,} players")
+        df = df.join(intervals)
+
+    def band(metric):
+        return [f'{metric}_low', f'{metric}_high'] if uncertainty else []
 
     # Show top performers
     st.write("Top 10 Players by Attack Index (Include Goals, Assists, Shots On Target)")
-    attack_leaders = df.nlargest(10, 'Attack_Index')[
-        ['Player Name', 'Club', 'Position', 'Attack_Index']
+    attack_leaders = df.loc[scores.nlargest(10, 'Attack_Index').index][
+        ['Player Name', 'Club', 'Position', 'Attack_Index'] + band('Attack_Index')
     ]
     st.dataframe(attack_leaders)
     
     st.write("Top 10 Players by Possession Index (Include Successful Passes, Progressive Carries, Possession Won)")
-    possession_leaders = df.nlargest(10, 'Possession_Index')[
-        ['Player Name', 'Club', 'Position', 'Possession_Index']
+    possession_leaders = df.loc[scores.nlargest(10, 'Possession_Index').index][
+        ['Player Name', 'Club', 'Position', 'Possession_Index'] + band('Possession_Index')
     ]
     st.dataframe(possession_leaders)
 
     st.write("Top 10 Players by Defense Index (Include Tackles, Interceptions, Blocks, Clean Sheets)")
-    defense_leaders = df.nlargest(10, 'Defense_Index')[
-        ['Player Name', 'Club', 'Position', 'Defense_Index']
+    defense_leaders = df.loc[scores.nlargest(10, 'Defense_Index').index][
+        ['Player Name', 'Club', 'Position', 'Defense_Index'] + band('Defense_Index')
     ]
     st.dataframe(defense_leaders)
 
     # Scatter plot of indices
-    fig_indices = px.scatter(
-        df,
-        x='Attack_Index',
-        y='Possession_Index',
-        color='Position',
-        hover_data=['Player Name', 'Club'],
-        title="Attack vs Possession Index"
-    )
-    st.plotly_chart(fig_indices)
+    def indices():
+        return charts.scatter(
+            df,
+            x='Attack_Index',
+            y='Possession_Index',
+            color='Position',
+            hover_data=['Player Name', 'Club'],
+            title="Attack vs Possession Index"
+        )
+    st.plotly_chart(figure('indices', indices, (cohort,)))
     
     # Advanced Team Analysis
     st.subheader("Team Style Analysis")
     
-    team_style = df.groupby('Club').agg({
-        'Passes': 'mean',
-        'Progressive Carries': 'mean',
-        'Possession Won': 'mean',
-        'Goals': 'mean',
-        'Shots': 'mean'
-    }).reset_index()
+    def team_style():
+        team_style = get_cube(dataset).rollup('Club', *selection).agg({
+            'Passes': 'mean',
+            'Progressive Carries': 'mean',
+            'Possession Won': 'mean',
+            'Goals': 'mean',
+            'Shots': 'mean'
+        }).reset_index()
     
-    # Normalize metrics
-    style_metrics = ['Passes', 'Progressive Carries', 'Possession Won', 'Goals', 'Shots']
-    team_style[style_metrics] = team_style[style_metrics].apply(stats.zscore)
-    team_colors_map = get_team_colors()
+        # Normalize metrics
+        style_metrics = ['Passes', 'Progressive Carries', 'Possession Won', 'Goals', 'Shots']
+        team_style[style_metrics] = team_style[style_metrics].apply(stats.zscore)
+        team_colors_map = get_team_colors()
     
-    # Create radar chart for team styles
-    fig_style = go.Figure()
-    for team in team_style['Club']:
-        team_data = team_style[team_style['Club'] == team]
+        # Create radar chart for team styles
+        fig_style = go.Figure()
+        for team in team_style['Club']:
+            team_data = team_style[team_style['Club'] == team]
         
-        fig_style.add_trace(go.Scatterpolar(
-            r=team_data[style_metrics].values.flatten().tolist(),
-            theta=style_metrics,
-            name=team,
-            hoverinfo='text',
-            hovertext=[
-                f"{metric}: {team_data[metric].iloc[0]:.1f}"
-                for metric in style_metrics
-            ],
-            line=dict(color=team_colors_map[team], width=0),
-            fill='toself'
-        ))
+            fig_style.add_trace(go.Scatterpolar(
+                r=team_data[style_metrics].values.flatten().tolist(),
+                theta=style_metrics,
+                name=team,
+                hoverinfo='text',
+                hovertext=[
+                    f"{metric}: {team_data[metric].iloc[0]:.1f}"
+                    for metric in style_metrics
+                ],
+                line=dict(color=team_colors_map.get(team), width=0),
+                fill='toself'
+            ))
     
-    fig_style.update_layout(
-        polar=dict(radialaxis=dict(visible=True, showticklabels=False, showline=False)),
-        showlegend=True,
-    )
-    st.plotly_chart(fig_style)
+        fig_style.update_layout(
+            polar=dict(radialaxis=dict(visible=True, showticklabels=False, showline=False)),
+            showlegend=True,
+        )
+        return fig_style
+    st.plotly_chart(figure('team_style', team_style))
 
-    def create_recruitment_analysis(df):
+    def create_recruitment_analysis(df, shortlists):
         """Recruitment analysis based on value-for-money ratio"""
-        # Import required libraries
-        for col in ['Goals_per_90', 'Assists_per_90', 'Shot_Accuracy', 'Passes %', 'Defensive_per_90', 'Duel_Success_Rate']:
-            df[f'{col}_z'] = stats.zscore(df[col])
-        # Weighted sum of standardized scores
-        df['Performance_Score'] = (
-        df['Goals_per_90_z'] * 3 +
-        df['Assists_per_90_z'] * 2 +
-        df['Shot_Accuracy_z'] * 1 +
-        df['Passes %_z'] * 1 +
-        df['Defensive_per_90_z'] * 1 +
-        df['Duel_Success_Rate_z'] * 1)
-
         # Identify valued players (lots of playing time, high performance)
-        undervalued_field_players = df[(df['Position'] != 'GKP') &
-            (df['Minutes'] > df['Minutes'].quantile(0.3)) &
-            (df['Performance_Score'] > df['Performance_Score'].quantile(0.7)) &
-            (df['Appearances'] > 10)
-        ].sort_values('Performance_Score', ascending=False)
+        # The 'Balanced' profile is the Performance_Score weighting
+        balanced = shortlists[shortlists['Profile'] == 'Balanced']
+        undervalued_field_players = df.loc[balanced.index]
 
 
         # Scatter plot: Performance vs Playing Time
         # Scatter plot with Plotly
-        fig_talent = px.scatter(df[df['Position'] != 'GKP'], 
-                                x='Minutes', 
-                                y='Performance_Score',
-                                color='Appearances',
-                                hover_data=['Player Name', 'Club', 'Position'],
-                                title='💎 Hidden Talent Identification',
-                                labels={'Minutes': 'Minutes played',
-                                        'Performance_Score': 'Performance Score',
-                                        'Appearances': 'Number of Appearances'})
+        def talent():
+            field_players = df[df['Position'] != 'GKP']
+            errors = {}
+            if uncertainty:
+                field_players = field_players.assign(
+                    Upper=field_players['Performance_Score_high'] - field_players['Performance_Score'],
+                    Lower=field_players['Performance_Score'] - field_players['Performance_Score_low']
+                )
+                errors = dict(error_y='Upper', error_y_minus='Lower')
+            return charts.scatter(field_players, 
+                                  x='Minutes', 
+                                  y='Performance_Score',
+                                  color='Appearances',
+                                  **errors,
+                                  hover_data=['Player Name', 'Club', 'Position'],
+                                  title='💎 Hidden Talent Identification',
+                                  labels={'Minutes': 'Minutes played',
+                                          'Performance_Score': 'Performance Score',
+                                          'Appearances': 'Number of Appearances'})
 
         # Top valued players plot with Plotly
-        fig_top = px.bar(undervalued_field_players.head(15),
-                            y='Player Name',
-                            x='Performance_Score',
-                            orientation='h',
-                            title='🎯 Top 15 Valued Players',
-                            labels={'Performance_Score': 'Performance Score',
-                                'Player Name': ''})
+        def top_valued():
+            return px.bar(undervalued_field_players.head(15),
+                          y='Player Name',
+                          x='Performance_Score',
+                          orientation='h',
+                          title='🎯 Top 15 Valued Players',
+                          labels={'Performance_Score': 'Performance Score',
+                              'Player Name': ''})
 
         # Display plots
-        st.plotly_chart(fig_talent)
-        st.plotly_chart(fig_top)
+        st.plotly_chart(figure('talent', talent, (cohort, uncertainty)))
+        st.plotly_chart(figure('top_valued', top_valued, (cohort,)))
+
+        return undervalued_field_players[['Player Name', 'Club', 'Position', 'Performance_Score'] + band('Performance_Score')
+                                         + ['Minutes', 'G+A_per_90', 'Passes %']].head(20)
 
-        return undervalued_field_players[['Player Name', 'Club', 'Position', 'Performance_Score', 
-                            'Minutes', 'G+A_per_90', 'Passes %']].head(20)
+    # Shortlists of every recruitment profile in one pass over the cohort's z-scores
+    shortlists = get_recruitment_engine(dataset).shortlists(
+        RECRUITMENT_PROFILES, *selection, by='Position' if cohort == "Same position" else None
+    )
 
     st.subheader("Recruitment Analysis: Identifying Undervalued Field Players")
-    undervalued_players = create_recruitment_analysis(df)
+    undervalued_players = create_recruitment_analysis(df, shortlists)
     st.subheader("Top 20 Field Players")
-    st.dataframe(undervalued_players, height=400)
\ No newline at end of file
+    st.dataframe(undervalued_players, height=400)
+
+    # Shortlists of the scouting profiles side by side
+    st.subheader("Recruitment Profiles")
+    profiles = st.multiselect("Profiles", list(RECRUITMENT_PROFILES), default=list(RECRUITMENT_PROFILES))
+    with st.expander("Profile weights (applied to z-scores)"):
+        st.dataframe(pd.DataFrame(RECRUITMENT_PROFILES).fillna(0)[profiles])
+    if profiles:
+        comparison = shortlists[shortlists['Profile'].isin(profiles)]
+        comparison = comparison.assign(Player=dataset.loc[comparison.index, 'Player Name'].to_numpy())
+        st.dataframe(
+            comparison.pivot(index='Rank', columns='Profile', values='Player').reindex(columns=profiles),
+            height=400
+        )
\ No newline at end of file
@@ -2,22 +2,72 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from utils.data_loader import filter_data, get_team_colors
+import numpy as np
+import functools
+from utils.data_loader import get_dataset, get_dataset_version, get_team_colors
+from utils.cube import get_cube
+from utils.profiling import timed
+from utils.figure_cache import cached_figure, filter_key
 
 
+@timed()
 def overview():
     """
     Overview section displaying key statistics and trends
     """
     st.title("Premier League Analytics 2024/25")
     
-    # Get filtered data and team colors
-    df = st.session_state.data
+    # Roll the aggregation cube up to the filter selection and get team colors
+    cube = get_cube(get_dataset(st.session_state.filters['partitions']))
+    filters = st.session_state.filters
+    selection = (filters['team'], filters['position'], filters['min_minutes'])
+    totals = cube.rollup(None, *selection)
     team_colors = get_team_colors()
-    if st.session_state.filters['team']:
-        df = df[df['Club'].isin(st.session_state.filters['team'])]
-    if st.session_state.filters['position']:
-        df = df[df['Position'].isin(st.session_state.filters['position'])]
+    if totals.index.empty:
+        st.info("No players match the selected filters")
+        return
+
+    # Figures are cached per filter selection and dataset version; the
+    # aggregates behind them are only computed when a figure is rebuilt
+    version = get_dataset_version(filters['partitions'])
+
+    def figure(chart, build):
+        return cached_figure('overview', chart, version, filter_key(*selection), build)
+
+    # Only the first sections are rendered up front; in on-demand mode the
+    # others are aggregated and drawn once they are opened
+    on_demand = st.toggle("Load sections on demand", value=True, key='overview_on_demand')
+
+    def section(title, key):
+        st.subheader(title)
+        return not on_demand or st.toggle(f"Show {title.lower()}", key=f'overview_{key}')
+
+    @functools.cache
+    def team_rollup():
+        return cube.rollup('Club', *selection)
+
+    @functools.cache
+    def team_stats():
+        return team_rollup().agg({
+            'Goals': 'sum',
+            'Assists': 'sum',
+            'Goals Conceded': 'sum',
+            'Shots': 'sum',
+            'Shots On Target': 'sum',
+            'Goals_per_90': 'mean',
+            'Defensive_per_90': 'mean'
+        }).reset_index()
+
+    @functools.cache
+    def team_buildup():
+        return team_rollup().agg({
+            'Passes': 'mean',
+            'Passes %': 'mean',
+            'Progressive Carries': 'mean',
+            'Possession Won': 'mean',
+            'Crosses %': 'mean',
+            'fThird Passes': 'mean'
+        }).reset_index()
     
     # Layout with columns
     col1, col2, col3 = st.columns(3)
@@ -25,145 +75,137 @@ def overview():
     with col1:
         st.metric(
             "Total Goals",
-            df['Goals'].sum(),
-            f"{df['Goals'].mean():.2f} per player"
+            totals.total('Goals'),
+            f"{totals.total('Goals', 'mean'):.2f} per player"
         )
     
     with col2:
         st.metric(
             "Total Assists",
-            df['Assists'].sum(),
-            f"{df['Assists'].mean():.2f} per player"
+            totals.total('Assists'),
+            f"{totals.total('Assists', 'mean'):.2f} per player"
         )
     
     with col3:
         st.metric(
             "Average Minutes",
-            f"{df['Minutes'].mean():.0f}",
-            f"{df['Minutes'].std():.0f} std dev"
+            f"{totals.total('Minutes', 'mean'):.0f}",
+            f"{totals.total('Minutes', 'std'):.0f} std dev"
         )
     
     # Position Distribution
     st.subheader("Player Distribution by Position")
-    pos_dist = df['Position'].value_counts()
-    fig_pos = px.pie(
-        values=pos_dist.values,
-        names=pos_dist.index,
-        title="Position Distribution"
-    )
-    st.plotly_chart(fig_pos)
+    def position_distribution():
+        pos_dist = cube.rollup('Position', *selection).size.sort_values(ascending=False)
+        return px.pie(
+            values=pos_dist.values,
+            names=pos_dist.index,
+            title="Position Distribution"
+        )
+    st.plotly_chart(figure('position_distribution', position_distribution))
 
     # Team Performance Overview
     st.subheader("Team Performance Overview")
-    team_stats = df.groupby('Club').agg({
-        'Goals': 'sum',
-        'Assists': 'sum',
-        'Goals Conceded': 'sum',
-        'Shots': 'sum',
-        'Shots On Target': 'sum',
-        'Goals_per_90': 'mean',
-        'Defensive_per_90': 'mean'
-    }).reset_index()
-    
-    fig_team = px.bar(
-        team_stats,
-        x='Club',
-        y=['Goals', 'Goals Conceded'],
-        title="Goals and Assists by Team",
-        barmode='group'
-    )
-    st.plotly_chart(fig_team)
+    def team_goals():
+        return px.bar(
+            team_stats(),
+            x='Club',
+            y=['Goals', 'Goals Conceded'],
+            title="Goals and Assists by Team",
+            barmode='group'
+        )
+    st.plotly_chart(figure('team_goals', team_goals))
     
     # Shot Efficiency Analysis
-    st.subheader("Shot Efficiency Analysis")
-    shot_efficiency = team_stats.copy()
-    shot_efficiency['Conversion Rate'] = (shot_efficiency['Goals'] / shot_efficiency['Shots']) * 100
-    
-    fig_efficiency = px.scatter(
-        shot_efficiency,
-        x='Shots',
-        y='Goals',
-        size='Conversion Rate',
-        hover_data=['Club'],
-        color= 'Club',
-        color_discrete_map=team_colors,
-        text='Club',
-        title="Shot Efficiency by Team"
-    )
-    st.plotly_chart(fig_efficiency)
+    def shot_efficiency():
+        shot_efficiency = team_stats().copy()
+        shot_efficiency['Conversion Rate'] = (shot_efficiency['Goals'] / shot_efficiency['Shots']) * 100
+        # Clubs without shots in the selection get the smallest marker instead of a NaN size
+        shot_efficiency['Conversion Rate'] = shot_efficiency['Conversion Rate'].replace([np.inf, -np.inf], np.nan).fillna(0)
+        
+        return px.scatter(
+            shot_efficiency,
+            x='Shots',
+            y='Goals',
+            size='Conversion Rate',
+            hover_data=['Club'],
+            color= 'Club',
+            color_discrete_map=team_colors,
+            text='Club',
+            title="Shot Efficiency by Team"
+        )
+    if section("Shot Efficiency Analysis", 'shot_efficiency'):
+        st.plotly_chart(figure('shot_efficiency', shot_efficiency))
 
     # Defensive Efficiency Analysis
-    st.subheader("Defensive Efficiency Analysis")
-    defensive_efficiency = team_stats.copy()
-    defensive_efficiency['Defensive Efficiency'] = (
-        defensive_efficiency['Shots On Target'] / defensive_efficiency['Goals Conceded']
-    ) * 100
-    fig_defensive = px.scatter(
-        defensive_efficiency,
-        x='Shots On Target',
-        y='Goals Conceded',
-        size='Defensive Efficiency',
-        hover_data=['Club'],
-        color= 'Club',
-        color_discrete_map=team_colors,
-        text='Club',
-        title="Defensive Efficiency by Team"
-    )
-    st.plotly_chart(fig_defensive)
+    def defensive_efficiency():
+        defensive_efficiency = team_stats().copy()
+        defensive_efficiency['Defensive Efficiency'] = (
+            defensive_efficiency['Shots On Target'] / defensive_efficiency['Goals Conceded']
+        ) * 100
+        # 0/0 and x/0 clubs (no goals conceded in the selection) get the smallest marker
+        defensive_efficiency['Defensive Efficiency'] = (
+            defensive_efficiency['Defensive Efficiency'].replace([np.inf, -np.inf], np.nan).fillna(0)
+        )
+        return px.scatter(
+            defensive_efficiency,
+            x='Shots On Target',
+            y='Goals Conceded',
+            size='Defensive Efficiency',
+            hover_data=['Club'],
+            color= 'Club',
+            color_discrete_map=team_colors,
+            text='Club',
+            title="Defensive Efficiency by Team"
+        )
+    if section("Defensive Efficiency Analysis", 'defensive_efficiency'):
+        st.plotly_chart(figure('defensive_efficiency', defensive_efficiency))
     
     # Scatter plot: Offense vs Defense
-    st.subheader("Team Offensive and Defensive Balance")
-
-    fig_offense_defense = px.scatter(
-        team_stats,
-        x='Goals_per_90',
-        y='Defensive_per_90',
-        color='Club',
-        color_discrete_map=team_colors,
-        text='Club'
-    )
-    fig_offense_defense.update_layout(
-        title='Team Offensive-Defensive Balance',
-        xaxis_title='Goals per 90min (team average)',
-        yaxis_title='Defensive actions per 90min'
-    )
-    st.plotly_chart(fig_offense_defense)
+    def offense_defense():
+        fig_offense_defense = px.scatter(
+            team_stats(),
+            x='Goals_per_90',
+            y='Defensive_per_90',
+            color='Club',
+            color_discrete_map=team_colors,
+            text='Club'
+        )
+        fig_offense_defense.update_layout(
+            title='Team Offensive-Defensive Balance',
+            xaxis_title='Goals per 90min (team average)',
+            yaxis_title='Defensive actions per 90min'
+        )
+        return fig_offense_defense
+    if section("Team Offensive and Defensive Balance", 'offense_defense'):
+        st.plotly_chart(figure('offense_defense', offense_defense))
 
     # Team buildup analysis
-    st.subheader("Team Build-Up Analysis")
-    team_buildup = df.groupby('Club').agg({
-        'Passes': 'mean',
-        'Passes %': 'mean',
-        'Progressive Carries': 'mean',
-        'Possession Won': 'mean',
-        'Crosses %': 'mean',
-        'fThird Passes': 'mean'
-    }).reset_index()
-
-    fig_buildup = px.scatter(
-        team_buildup,
-        x='Passes',
-        y='Progressive Carries',
-        size='Passes %',
-        hover_data=['Club'],
-        color= 'Club',
-        color_discrete_map=team_colors,
-        text='Club',
-        title="Build-Up Play by Team"
-    )
-    st.plotly_chart(fig_buildup)
-
-    fig_finalThird = px.scatter(
-        team_buildup,
-        x='fThird Passes',
-        y='Crosses %',
-        size='Possession Won',
-        hover_data=['Club'],
-        color= 'Club',
-        color_discrete_map=team_colors,
-        text='Club',
-        title="Final Third Play by Team"
-    )
-    st.plotly_chart(fig_finalThird)
-
+    def buildup():
+        return px.scatter(
+            team_buildup(),
+            x='Passes',
+            y='Progressive Carries',
+            size='Passes %',
+            hover_data=['Club'],
+            color= 'Club',
+            color_discrete_map=team_colors,
+            text='Club',
+            title="Build-Up Play by Team"
+        )
 
+    def final_third():
+        return px.scatter(
+            team_buildup(),
+            x='fThird Passes',
+            y='Crosses %',
+            size='Possession Won',
+            hover_data=['Club'],
+            color= 'Club',
+            color_discrete_map=team_colors,
+            text='Club',
+            title="Final Third Play by Team"
+        )
+    if section("Team Build-Up Analysis", 'buildup'):
+        st.plotly_chart(figure('buildup', buildup))
+        st.plotly_chart(figure('final_third', final_third))
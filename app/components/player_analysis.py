@@ -2,9 +2,19 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from utils.data_loader import filter_data, get_team_colors
+import numpy as np
+from utils.data_loader import get_dataset, get_team_colors
+from utils.filter_index import get_filter_index
+from utils.players import get_player_registry
+from utils.ranks import get_rank_engine
+from utils.similarity import WEIGHTINGS, similar_players
 import utils.group_stats as gs
+from utils.profiling import span, step, timed
 
+# Players listed in the comparison widget; a search narrows larger selections
+PLAYER_OPTIONS = 1000
+
+@timed()
 def player_analysis():
     """
     Player analysis component with detailed player statistics and comparisons
@@ -12,26 +22,31 @@ def player_analysis():
     st.title("Player Analysis")
     
     # Get filtered data and team colors
-    df = st.session_state.data
+    df = get_dataset(st.session_state.filters['partitions'])
     team_colors = get_team_colors()
           
-    # Apply filters
-    filtered_df = df.copy()
-
-    if st.session_state.filters['position']:
-        filtered_df = filtered_df[filtered_df['Position'].isin(st.session_state.filters['position'])]
-    if st.session_state.filters['team']:
-        filtered_df = filtered_df[filtered_df['Club'].isin(st.session_state.filters['team'])]
-    filtered_df = filtered_df[filtered_df['Minutes'] >= st.session_state.filters['min_minutes']]
-
-    
-
-    # Player selection from filtered data
-    players = sorted(filtered_df['Player Name'].unique())
+    # Player selection from the filtered rows. Widgets hold stable player
+    # ids; the registry resolves ids, labels and searches without scanning df
+    filters = st.session_state.filters
+    registry = get_player_registry(df)
+    row_ids = get_filter_index(df).row_ids(filters['team'], filters['position'], filters['min_minutes'])
+    query = st.text_input(
+        "Search players",
+        placeholder=f"Name or surname, accents optional ({len(row_ids):,} players)"
+    )
+    with span('player_search'):
+        matches = registry.search(query, row_ids, limit=PLAYER_OPTIONS)
+    # Players already picked stay listed while the search changes; picks
+    # from partitions that are no longer loaded are dropped
+    kept = [player for player in st.session_state.get('compare_players', []) if registry.has(player)]
+    st.session_state['compare_players'] = kept
+    players = list(dict.fromkeys(kept + list(registry.ids[matches])))
     selected_players = st.multiselect(
         "Select Players to Compare",
         players,
-        max_selections=5
+        format_func=registry.label,
+        max_selections=5,
+        key='compare_players'
     )
     
     if not selected_players:
@@ -39,12 +54,14 @@ def player_analysis():
         return
     
     # Player comparison
-    player_stats = df[df['Player Name'].isin(selected_players)]
+    player_rows = registry.rows(selected_players)
+    player_stats = df.iloc[player_rows]
+    player_labels = registry.labels[player_rows]
     
     # Create a color mapping for the selected players based on their teams
     player_team_colors = {
-        player: team_colors[player_stats[player_stats['Player Name'] == player]['Club'].iloc[0]]
-        for player in selected_players
+        player: team_colors.get(club)
+        for player, club in zip(selected_players, player_stats['Club'])
     }
     
     # Display Analysis Type Selection
@@ -66,20 +83,23 @@ def player_analysis():
         metrics = ['Passes %', 'Progressive Carries',
                   'fThird Passes %', 'Possession Won', 'Dispossessed']
 
+    step('radar')
     fig = go.Figure()
-    for player in selected_players:
-        player_data = player_stats[player_stats['Player Name'] == player]
+    # One (players x metrics) block of raw and normalized values
+    values = player_stats[metrics].to_numpy(dtype=np.float64)
+    normalized = player_stats[[f'{metric}_norm' for metric in metrics]].to_numpy(dtype=np.float64)
+    for i, player in enumerate(selected_players):
         #values = [player[f'{metric}_norm'] for metric in metrics]
         #values.append(values[0])  # Complete the circle
         
         fig.add_trace(go.Scatterpolar(
-            r=[player_data[f'{metric}_norm'].iloc[0] for metric in metrics],
+            r=normalized[i],
             theta=metrics,
-            name=player,
+            name=player_labels[i],
             hoverinfo='text',
             hovertext=[
-                f"{metric}: {player_data[metric].iloc[0]:.1f}<br>Relative: {player_data[f'{metric}_norm'].iloc[0]:.1%}"
-                for metric in metrics
+                f"{metric}: {value:.1f}<br>Relative: {norm:.1%}"
+                for metric, value, norm in zip(metrics, values[i], normalized[i])
             ],
             line=dict(color=player_team_colors[player], width=0),
             fillcolor=player_team_colors[player],
@@ -133,12 +153,49 @@ def player_analysis():
                 'fThird Passes', 'fThird Passes %', 'Through Balls',
                 'Dispossessed']
     
-    st.dataframe(player_stats[cols].set_index('Player Name'))
+    # Percentiles from the rank engine, next to each raw value
+    percentile_group = st.radio(
+        "Percentiles within",
+        ["League", "Position"],
+        horizontal=True
+    )
+    step('percentiles')
+    value_cols = [col for col in cols if col not in ['Player Name', 'Club', 'Position']]
+    percentiles = get_rank_engine(df).percentiles(player_rows, value_cols, percentile_group)
+    detail = player_stats[cols].copy()
+    for col in reversed(value_cols):
+        detail.insert(detail.columns.get_loc(col) + 1, f'{col} pct', percentiles[col].round().astype('Int64'))
+    st.dataframe(detail.set_index('Player Name'))
+    
+    # Similar players: nearest neighbours on per-90 and percentage style metrics
+    st.subheader("Similar Players")
+    search_cols = st.columns(3)
+    with search_cols[0]:
+        reference = st.selectbox("Players similar to", selected_players, format_func=registry.label)
+    with search_cols[1]:
+        weighting = st.selectbox("Weighting", list(WEIGHTINGS))
+    with search_cols[2]:
+        k = st.slider("Number of players", 5, 20, 10)
+    reference_row = registry.row(reference)
+    similar_positions = st.multiselect(
+        "Positions to search",
+        sorted(df['Position'].unique()),
+        default=[df['Position'].iloc[reference_row]]
+    )
+    step('similar_players')
+    similar = similar_players(
+        df, reference_row, k, similar_positions, weighting,
+        st.session_state.filters['min_minutes']
+    )
+    st.dataframe(
+        similar.set_index('Player Name').style.format({'Distance': '{:.3f}', 'Similarity': '{:.1%}'})
+    )
     
     # Detailed Analysis based on type
     if analysis_type == "Offensive Metrics":
         # Offensive Performance
         st.subheader("Offensive Performance")
+        step('offensive')
         off_metrics = pd.melt(
             player_stats,
             id_vars=['Player Name'],
@@ -159,6 +216,7 @@ def player_analysis():
         
         # Shot Efficiency
         st.subheader("Shot Efficiency Analysis")
+        step('shot_efficiency')
         fig_efficiency = px.scatter(
             player_stats,
             x='Shots',
@@ -175,6 +233,7 @@ def player_analysis():
     elif analysis_type == "Defensive Metrics":
         # Defensive Actions
         st.subheader("Defensive Actions")
+        step('defensive')
         def_metrics = pd.melt(
             player_stats,
             id_vars=['Player Name'],
@@ -198,6 +257,7 @@ def player_analysis():
         cols = st.columns(2)
         
         with cols[0]:
+            step('ground_duels')
             fig_ground = px.bar(
                 player_stats,
                 x='Player Name',
@@ -208,6 +268,7 @@ def player_analysis():
             st.plotly_chart(fig_ground)
             
         with cols[1]:
+            step('aerial_duels')
             fig_aerial = px.bar(
                 player_stats,
                 x='Player Name',
@@ -219,6 +280,7 @@ def player_analysis():
         
         # Cards Analysis
         st.subheader("Cards Analysis")
+        step('cards')
         fig_cards = px.scatter(
             player_stats,
             x='Appearances',    
@@ -234,6 +296,7 @@ def player_analysis():
     else:  # Possession Metrics
         # Passing Analysis
         st.subheader("Passing Analysis")
+        step('passing')
         fig_passing = px.bar(
             player_stats,
             x='Player Name',
@@ -245,6 +308,7 @@ def player_analysis():
         
         # Progressive Play
         st.subheader("Progressive Play Analysis")
+        step('progressive')
         prog_metrics = pd.melt(
             player_stats,
             id_vars=['Player Name'],
@@ -263,6 +327,7 @@ def player_analysis():
         )
         st.plotly_chart(fig_prog)
 
+        step('carries_vs_passes')
         fig_runVSpassing = px.scatter(
             player_stats,
             x='Progressive Carries',
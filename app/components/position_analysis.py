@@ -3,20 +3,34 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from utils.data_loader import filter_data, get_team_colors
+from utils.data_loader import get_dataset, get_dataset_version, get_team_colors
+from utils.filter_index import apply_session_filters
+from utils.cube import get_cube
+from utils.correlation import get_correlation_cube
+from utils.profiling import timed
+from utils.figure_cache import cached_figure, filter_key
 import utils.group_stats as gs
 
+@timed()
 def position_analysis():
 
     # Get filtered data and team colors
-    df = st.session_state.data
+    dataset = get_dataset(st.session_state.filters['partitions'])
+    filters = st.session_state.filters
+    df = apply_session_filters(dataset, filters)
+    position_rollup = get_cube(dataset).rollup(
+        'Position', filters['team'], filters['position'], filters['min_minutes']
+    )
     team_colors = get_team_colors()
     st.title("Position Analysis")
+    if df.empty:
+        st.info("No players match the selected filters")
+        return
 
     # Performance by Position
     st.subheader("Performance by Position")
 
-    position_stats = df.groupby('Position').agg({
+    position_stats = position_rollup.agg({
         'Goals_per_90': 'mean',
         'Assists_per_90': 'mean',
         'G+A_per_90': 'mean',
@@ -31,37 +45,51 @@ def position_analysis():
 
     # Visualization
 
-    def create_tactical_dashboard(df):
+    # Figures are cached per filter selection and dataset version
+    version = get_dataset_version(filters['partitions'])
+    selection = (filters['team'], filters['position'], filters['min_minutes'])
+
+    def figure(chart, build):
+        return cached_figure('position_analysis', chart, version, filter_key(*selection), build)
+
+    def create_tactical_dashboard(df, position_rollup):
         
         # Correlation matrix of offensive metrics
-        offensive_metrics = ['Goals_per_90', 'Assists_per_90', 'Shot_Accuracy', 
-                            'Conversion %', 'Progressive_per_90']
-        corr_matrix = df[offensive_metrics].corr()
+        def correlation():
+            offensive_metrics = ['Goals_per_90', 'Assists_per_90', 'Shot_Accuracy', 
+                                'Conversion %', 'Progressive_per_90']
+            corr_matrix = get_correlation_cube(dataset).corr(offensive_metrics, *selection)
 
-        fig_corr = px.imshow(corr_matrix, text_auto=True, color_continuous_scale='RdYlBu_r')
-        fig_corr.update_layout(title='Offensive Metrics Correlation')
-        st.plotly_chart(fig_corr)
+            fig_corr = px.imshow(corr_matrix, text_auto=True, color_continuous_scale='RdYlBu_r')
+            fig_corr.update_layout(title='Offensive Metrics Correlation')
+            return fig_corr
+        st.plotly_chart(figure('correlation', correlation))
 
         # Distribution of goals per position
-        position_goals = df.groupby('Position')['Goals_per_90'].mean().sort_values(ascending=True)
-        fig_goals = px.bar(position_goals, x=position_goals.index, y=position_goals.values,
-                           title='Goals per 90 Minutes by Position', labels={'x': 'Position', 'y': 'Goals per 90 Minutes'})
-        st.plotly_chart(fig_goals)
+        def goals():
+            position_goals = position_rollup.column('Goals_per_90', 'mean').sort_values(ascending=True)
+            return px.bar(position_goals, x=position_goals.index, y=position_goals.values,
+                          title='Goals per 90 Minutes by Position', labels={'x': 'Position', 'y': 'Goals per 90 Minutes'})
+        st.plotly_chart(figure('goals', goals))
               
         # Defensive efficiency by position
-        defensive_by_pos = df.groupby('Position')['Defensive_per_90'].mean().sort_values(ascending=True)
-        fig_defensive = px.bar(defensive_by_pos, orientation='h',
-                             title='Defensive Actions per 90 Minutes by Position',
-                             labels={'value': 'Defensive Actions per 90 Minutes', 'Position': 'Position'})
-        fig_defensive.update_layout(showlegend=False)
-        st.plotly_chart(fig_defensive)
+        def defensive():
+            defensive_by_pos = position_rollup.column('Defensive_per_90', 'mean').sort_values(ascending=True)
+            fig_defensive = px.bar(defensive_by_pos, orientation='h',
+                                 title='Defensive Actions per 90 Minutes by Position',
+                                 labels={'value': 'Defensive Actions per 90 Minutes', 'Position': 'Position'})
+            fig_defensive.update_layout(showlegend=False)
+            return fig_defensive
+        st.plotly_chart(figure('defensive', defensive))
         
         # Pass accuracy by position
-        pass_accuracy = df.groupby('Position')['Passes %'].mean().sort_values(ascending=True)
-        fig_passes = px.bar(pass_accuracy, orientation='h',
-                          title='Pass Accuracy by Position',
-                          labels={'value': 'Pass Success Percentage', 'Position': 'Position'})
-        fig_passes.update_layout(showlegend=False)
-        st.plotly_chart(fig_passes)
+        def passes():
+            pass_accuracy = position_rollup.column('Passes %', 'mean').sort_values(ascending=True)
+            fig_passes = px.bar(pass_accuracy, orientation='h',
+                              title='Pass Accuracy by Position',
+                              labels={'value': 'Pass Success Percentage', 'Position': 'Position'})
+            fig_passes.update_layout(showlegend=False)
+            return fig_passes
+        st.plotly_chart(figure('passes', passes))
 
-    create_tactical_dashboard(df)
\ No newline at end of file
+    create_tactical_dashboard(df, position_rollup)
\ No newline at end of file
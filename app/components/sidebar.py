@@ -1,7 +1,12 @@
 import streamlit as st
 import plotly.express as px
-from utils.data_loader import filter_data
+import pandas as pd
+from utils.data_loader import filter_data, get_dataset
+from utils.catalog import load_catalog
+from utils.figure_cache import figure_cache
+import utils.profiling as profiling
 
+@profiling.timed()
 def sidebar():
     """
     Create and manage the sidebar filters
@@ -17,9 +22,27 @@ def sidebar():
     st.sidebar.markdown("---")
     st.sidebar.title("🎯 Filters")
     
+    # League and season partitions; only the selected ones are loaded
+    partitions = load_catalog()
+    default = partitions[0]
+    leagues = sorted({p.league for p in partitions})
+    selected_leagues = st.sidebar.multiselect("Select League(s)", leagues, default=[default.league])
+    seasons = sorted({p.season for p in partitions if p.league in selected_leagues}, reverse=True)
+    selected_seasons = st.sidebar.multiselect(
+        "Select Season(s)", seasons, default=[default.season] if default.season in seasons else seasons[:1]
+    )
+    selection = tuple(
+        (p.league, p.season) for p in partitions
+        if p.league in selected_leagues and p.season in selected_seasons
+    )
+    if not selection:
+        st.sidebar.warning(f"No data for this selection, showing {default.league} {default.season}")
+        selection = ((default.league, default.season),)
+
     # Common filters
-    teams = sorted(st.session_state.data['Club'].unique())
-    positions = sorted(st.session_state.data['Position'].unique())
+    df = get_dataset(selection)
+    teams = sorted(df['Club'].unique())
+    positions = sorted(df['Position'].unique())
     
     selected_team = st.sidebar.multiselect("Select Team(s)", teams)
     selected_position = st.sidebar.multiselect("Select Position(s)", positions)
@@ -27,9 +50,40 @@ def sidebar():
     
     # Store filter selections in session state
     st.session_state.filters = {
+        'partitions': selection,
         'team': selected_team,
         'position': selected_position,
         'min_minutes': min_minutes
     }
     
     return page
+
+def performance_panel(rerun):
+    """
+    Optional debug panel with the span timings of the rerun that just
+    finished, the figure cache counters and an export of recent traces
+    """
+    st.sidebar.markdown("---")
+    if not st.sidebar.checkbox("Show performance panel"):
+        return
+
+    st.sidebar.title("⏱️ Performance")
+    st.sidebar.metric("Last rerun", f"{rerun.duration * 1000:.0f} ms")
+    spans = pd.DataFrame(
+        [('\u2003' * depth + name, ms) for depth, name, ms in rerun.rows()][1:],
+        columns=['Span', 'ms']
+    )
+    st.sidebar.dataframe(spans.style.format({'ms': '{:.1f}'}), hide_index=True)
+
+    # Figure cache counters, shared by all sessions of this process
+    cache_stats = figure_cache.stats()
+    st.sidebar.caption(
+        f"Figure cache: {cache_stats['size']}/{cache_stats['maxsize']} figures, "
+        f"{cache_stats['hit_rate']:.0%} hits ({cache_stats['hits']} of {cache_stats['hits'] + cache_stats['misses']})"
+    )
+    st.sidebar.download_button(
+        "Export traces (JSON lines)",
+        profiling.export_traces(),
+        file_name='traces.jsonl',
+        mime='application/json'
+    )
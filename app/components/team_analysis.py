@@ -3,10 +3,98 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-from utils.data_loader  import filter_data
-from utils.data_loader import get_team_colors
+from utils.data_loader import get_dataset, get_dataset_version, get_team_colors
+from utils.filter_index import apply_filters
+from utils.cube import get_cube
+from utils.ranks import leaderboard
+from utils.profiling import timed
+from utils.figure_cache import cached_figure, filter_key
+from utils import charts
 
 
+# Score, columns and heading of each top performers chart
+TOP_PERFORMERS = [
+    ("Top Attack Performers", 'Forward_Score', ['Player Name', 'Forward_Score', 'Goals', 'Minutes', 'Club']),
+    ("Top Playmakers", 'Midfielder_Score', ['Player Name', 'Midfielder_Score', 'Minutes', 'Club']),
+    ("Top Defensive Players", 'Defender_Score', ['Player Name', 'Defender_Score', 'Tackles', 'Minutes', 'Club'])
+]
+
+TEAM_STATS_SPEC = {
+    'Goals': 'sum',
+    'Assists': 'sum',
+    'Shots': 'sum',
+    'Shots On Target': 'sum',
+    'Passes': 'sum',
+    'Passes %': 'mean',
+    'Progressive Carries': 'sum',
+    'Possession Won': 'sum',
+    'Tackles': 'sum',
+    'Interceptions': 'sum',
+    'Blocks': 'sum',
+    'Ground Duels': 'sum',
+    'gDuels %': 'mean',
+    'Aerial Duels': 'sum',
+    'aDuels %': 'mean',
+    'Dispossessed': 'sum'
+}
+
+# The building blocks below take the dataset and a (teams, positions,
+# min_minutes) selection and have no Streamlit calls, so the page and the
+# batch club reports render the same content
+
+def overview_metrics(df, teams, positions=None, min_minutes=0):
+    """(label, value, delta) of each Team Overview metric"""
+    cube = get_cube(df)
+    totals = cube.rollup(None, teams, positions, min_minutes)
+    active = cube.rollup(None, teams, positions, max(min_minutes, 1)).size.sum()
+    return [
+        ("Squad Size", int(totals.size.sum()), f"{active} active players"),
+        ("Total Goals", totals.total('Goals'), f"{totals.total('Goals', 'mean'):.2f} per player"),
+        ("Total Assists", totals.total('Assists'), f"{totals.total('Assists', 'mean'):.2f} per player"),
+        ("Total Goals Conceded", totals.total('Goals Conceded'),
+         f"{totals.total('Goals Conceded', 'mean'):.2f} per player")
+    ]
+
+def squad_composition(df, teams, positions=None, min_minutes=0):
+    pos_dist = get_cube(df).rollup('Position', teams, positions, min_minutes).size.sort_values(ascending=False)
+    return px.pie(
+        values=pos_dist.values,
+        names=pos_dist.index,
+        title="Position Distribution"
+    )
+
+def minutes_distribution(df, teams, positions=None, min_minutes=0):
+    return charts.bar(
+        apply_filters(df, teams, positions, min_minutes),
+        x='Player Name',
+        y='Minutes',
+        color='Position',
+        title="Minutes Played by Player"
+    )
+
+def top_performers(df, score, columns, teams, positions=None, min_minutes=0):
+    return px.bar(
+        leaderboard(df, score, 5, columns, teams, positions, min_minutes),
+        x='Player Name',
+        y=score,
+        color='Club',
+        color_discrete_map=get_team_colors()
+    )
+
+def team_stats_table(df, teams, positions=None, min_minutes=0):
+    """Attacking, defensive and passing totals per club"""
+    cube = get_cube(df)
+    team_stats = cube.rollup('Club', teams, positions, min_minutes).agg(TEAM_STATS_SPEC)
+    # Clean sheets only count for goalkeepers: sum the GKP cells of the cube
+    if not positions or 'GKP' in positions:
+        keeper_rollup = cube.rollup('Club', teams, ['GKP'], min_minutes)
+        clean_sheets = keeper_rollup.column('Clean Sheets')
+    else:
+        clean_sheets = pd.Series(dtype='int64')
+    team_stats['Clean Sheets'] = clean_sheets.reindex(team_stats.index, fill_value=0)
+    return team_stats.reset_index()
+
+@timed()
 def team_analysis():
     """
     Team analysis component showing team performance and statistics
@@ -14,10 +102,7 @@ def team_analysis():
     st.title("Team Analysis")
     
     # Get filtered data and team colors
-    if 'data' not in st.session_state or st.session_state.data is None:
-        st.warning("No data loaded. Please upload or load data to proceed.")
-        return
-    df = st.session_state.data
+    df = get_dataset(st.session_state.filters['partitions'])
     team_colors = get_team_colors()
     
     # Team selection
@@ -34,222 +119,144 @@ def team_analysis():
         st.info("Please select at least one team to analyze")
         return
     
-    # Filter data based on selection
-    team_data = df[df['Club'].isin(selected_teams)]
-    
     # Apply additional filters
     positions = st.multiselect("Filter by Position", sorted(df['Position'].unique()))
     min_minutes = st.slider("Minimum Minutes Played", 0, 3000, 0)
     
-    if positions:
-        team_data = team_data[team_data['Position'].isin(positions)]
-    if min_minutes > 0:
-        team_data = team_data[team_data['Minutes'] >= min_minutes]
+    # Filter data based on selection; team-level aggregates come from the cube
+    team_data = apply_filters(df, selected_teams, positions, min_minutes)
+    if team_data.empty:
+        st.info("No players match the selected filters")
+        return
+    selection = (selected_teams, positions, min_minutes)
+    team_rollup = get_cube(df).rollup('Club', *selection)
+
+    # Figures are cached per team/position/minutes selection and dataset version
+    version = get_dataset_version(st.session_state.filters['partitions'])
+
+    def figure(chart, build):
+        return cached_figure('team_analysis', chart, version, filter_key(*selection), build)
     
     # Team Overview
     st.subheader("Team Overview")
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric(
-            "Squad Size",
-            len(team_data),
-            f"{len(team_data[team_data['Minutes'] > 0])} active players"
-        )
-    
-    with col2:
-        st.metric(
-            "Total Goals",
-            team_data['Goals'].sum(),
-            f"{team_data['Goals'].mean():.2f} per player"
-        )
-    
-    with col3:
-        st.metric(
-            "Total Assists",
-            team_data['Assists'].sum(),
-            f"{team_data['Assists'].mean():.2f} per player"
-        )
-
-    with col4:
-        st.metric(
-            "Total Goals Conceded",
-            team_data['Goals Conceded'].sum(),
-            f"{team_data['Goals Conceded'].mean():.2f} per player"
-        )
+    for col, (label, value, delta) in zip(st.columns(4), overview_metrics(df, *selection)):
+        with col:
+            st.metric(label, value, delta)
     
     # Position Distribution
     st.subheader("Squad Composition")
-    pos_dist = team_data['Position'].value_counts()
-    fig_pos = px.pie(
-        values=pos_dist.values,
-        names=pos_dist.index,
-        title="Position Distribution"
-    )
-    st.plotly_chart(fig_pos)
+    st.plotly_chart(figure('position_distribution', lambda: squad_composition(df, *selection)))
 
     # Playing Time Distribution
     st.subheader("Playing Time Distribution")
-    fig_minutes = px.bar(
-        team_data,
-        x='Player Name',
-        y='Minutes',
-        color='Position',
-        title="Minutes Played by Player"
-    )
-    st.plotly_chart(fig_minutes)
+    st.plotly_chart(figure('minutes', lambda: minutes_distribution(df, *selection)))
     
     # Player Performance
-    st.subheader("Top Attack Performers")
-    
-    # Goals
-    top_scorers = team_data.nlargest(5, 'Forward_Score')[['Player Name', 'Forward_Score', 'Goals', 'Minutes', 'Club']]
-    fig_scorers = px.bar(
-        top_scorers,
-        x='Player Name',
-        y='Forward_Score',
-        color='Club',
-        color_discrete_map=team_colors
-    )
-    st.plotly_chart(fig_scorers)
-
-    st.subheader("Top Playmakers")
-
-    top_assisters = team_data.nlargest(5, 'Midfielder_Score')[['Player Name', 'Midfielder_Score', 'Minutes', 'Club']]
-    fig_assisters = px.bar(
-        top_assisters,
-        x='Player Name',
-        y='Midfielder_Score',
-        color='Club',
-        color_discrete_map=team_colors
-    )
-    st.plotly_chart(fig_assisters)
-
-    st.subheader("Top Defensive Players")
-
-    top_defenders = team_data.nlargest(5, 'Defender_Score')[['Player Name', 'Defender_Score', 'Tackles', 'Minutes', 'Club']]
-    fig_defenders = px.bar(
-        top_defenders,
-        x='Player Name',
-        y='Defender_Score',
-        color='Club',
-        color_discrete_map=team_colors
-    )
-    st.plotly_chart(fig_defenders)
+    for title, score, columns in TOP_PERFORMERS:
+        st.subheader(title)
+        st.plotly_chart(figure(score, lambda: top_performers(df, score, columns, *selection)))
 
     if analysis_type == "Team Comparison":
         st.write("## Team Comparison Analysis")
         
         # Possession and Progressive Play Comparison
         st.subheader("Possession and Progressive Play")
-        team_possession = team_data.groupby('Club').agg({
-            'Passes': 'sum',
-            'Passes %': 'mean',
-            'Progressive Carries': 'sum',
-            'fThird Passes': 'sum',
-            'Through Balls': 'sum'
-        }).reset_index()
+        def possession():
+            team_possession = team_rollup.agg({
+                'Passes': 'sum',
+                'Passes %': 'mean',
+                'Progressive Carries': 'sum',
+                'fThird Passes': 'sum',
+                'Through Balls': 'sum'
+            }).reset_index()
         
-        fig_possession = px.bar(
-            team_possession,
-            x='Club',
-            y=['Passes', 'Progressive Carries'],
-            barmode='group',
-            title="Possession and Progressive Play Metrics"
-        )
-        st.plotly_chart(fig_possession)
+            fig_possession = px.bar(
+                team_possession,
+                x='Club',
+                y=['Passes', 'Progressive Carries'],
+                barmode='group',
+                title="Possession and Progressive Play Metrics"
+            )
+            return fig_possession
+        st.plotly_chart(figure('possession', possession))
         
         # Defensive Comparison
         st.subheader("Defensive Performance")
-        team_defense = team_data.groupby('Club').agg({
-            'Tackles_norm': 'mean',
-            'Interceptions_norm': 'mean',
-            'Blocks_norm': 'mean',
-            'Clean Sheets_norm': 'mean',
-            'Possession Won_norm': 'mean',
-            'Tackles': 'mean',
-            'Interceptions': 'mean',
-            'Blocks': 'mean',
-            'Clean Sheets': 'mean',
-            'Possession Won': 'mean'
-        }).reset_index()
+        def defense():
+            team_defense = team_rollup.agg({
+                'Tackles_norm': 'mean',
+                'Interceptions_norm': 'mean',
+                'Blocks_norm': 'mean',
+                'Clean Sheets_norm': 'mean',
+                'Possession Won_norm': 'mean',
+                'Tackles': 'mean',
+                'Interceptions': 'mean',
+                'Blocks': 'mean',
+                'Clean Sheets': 'mean',
+                'Possession Won': 'mean'
+            }).reset_index()
         
-        # Radar chart for defensive metrics
-        fig_defense = go.Figure()
-        metrics = ['Tackles', 'Interceptions', 'Blocks', 'Clean Sheets', 'Possession Won']
-        team_colors_map = get_team_colors()
+            # Radar chart for defensive metrics
+            fig_defense = go.Figure()
+            metrics = ['Tackles', 'Interceptions', 'Blocks', 'Clean Sheets', 'Possession Won']
+            team_colors_map = get_team_colors()
         
-        for team in team_defense['Club']:
-            team_def_data = team_defense[team_defense['Club'] == team]
-            # values.append(values[0])  # Complete the circle
+            for team in team_defense['Club']:
+                team_def_data = team_defense[team_defense['Club'] == team]
+                # values.append(values[0])  # Complete the circle
             
-            fig_defense.add_trace(go.Scatterpolar(
-                r=[team_def_data[f'{metric}_norm'].iloc[0] for metric in metrics],
-                theta=metrics,
-                name=team,
-                hoverinfo='text',
-                hovertext=[
-                    f"{metric}: {team_def_data[metric].iloc[0]:.1f}<br>Relative: {team_def_data[f'{metric}_norm'].iloc[0]:.1%}"
-                    for metric in metrics
-                ],
-                line=dict(color=team_colors_map[team], width=0),
-                fill='toself'
-            ))
+                fig_defense.add_trace(go.Scatterpolar(
+                    r=[team_def_data[f'{metric}_norm'].iloc[0] for metric in metrics],
+                    theta=metrics,
+                    name=team,
+                    hoverinfo='text',
+                    hovertext=[
+                        f"{metric}: {team_def_data[metric].iloc[0]:.1f}<br>Relative: {team_def_data[f'{metric}_norm'].iloc[0]:.1%}"
+                        for metric in metrics
+                    ],
+                    line=dict(color=team_colors_map.get(team), width=0),
+                    fill='toself'
+                ))
         
-        fig_defense.update_layout(  
-            polar=dict(radialaxis=dict(visible=True, showticklabels=False, showline=False)),
-            showlegend=True,
-            title="Defensive Metrics Comparison"
-        )
-        st.plotly_chart(fig_defense)
+            fig_defense.update_layout(  
+                polar=dict(radialaxis=dict(visible=True, showticklabels=False, showline=False)),
+                showlegend=True,
+                title="Defensive Metrics Comparison"
+            )
+            return fig_defense
+        st.plotly_chart(figure('defense', defense))
         
         # Attacking Efficiency
         st.subheader("Attacking Efficiency")
-        team_attack = team_data.groupby('Club').agg({
-            'Goals': 'sum',
-            'Shots': 'sum',
-            'Shots On Target': 'sum',
-            'Big Chances Missed': 'sum'
-        }).reset_index()
+        def attack():
+            team_attack = team_rollup.agg({
+                'Goals': 'sum',
+                'Shots': 'sum',
+                'Shots On Target': 'sum',
+                'Big Chances Missed': 'sum'
+            }).reset_index()
         
-        team_attack['Conversion Rate'] = (team_attack['Goals'] / team_attack['Shots'] * 100).round(2)
-        team_attack['Shot Accuracy'] = (team_attack['Shots On Target'] / team_attack['Shots'] * 100).round(2)
+            team_attack['Conversion Rate'] = (team_attack['Goals'] / team_attack['Shots'] * 100).round(2)
+            team_attack['Shot Accuracy'] = (team_attack['Shots On Target'] / team_attack['Shots'] * 100).round(2)
         
-        fig_attack = px.scatter(
-            team_attack,
-            x='Shot Accuracy',
-            y='Conversion Rate',
-            size='Goals',
-            hover_data=['Club', 'Shots', 'Goals'],
-            text='Club',
-            color= 'Club',
-            color_discrete_map=team_colors,
-            title="Shot Efficiency Analysis"
-        )
-        st.plotly_chart(fig_attack)
+            fig_attack = px.scatter(
+                team_attack,
+                x='Shot Accuracy',
+                y='Conversion Rate',
+                size='Goals',
+                hover_data=['Club', 'Shots', 'Goals'],
+                text='Club',
+                color= 'Club',
+                color_discrete_map=team_colors,
+                title="Shot Efficiency Analysis"
+            )
+            return fig_attack
+        st.plotly_chart(figure('attack', attack))
         
     # Detailed Team Statistics
     st.subheader("Detailed Team Statistics")
     
     # Calculate advanced team stats
-    team_stats = team_data.groupby('Club').agg({
-        'Goals': 'sum',
-        'Assists': 'sum',
-        'Shots': 'sum',
-        'Shots On Target': 'sum',
-        'Passes': 'sum',
-        'Passes %': 'mean',
-        'Progressive Carries': 'sum',
-        'Possession Won': 'sum',
-        'Tackles': 'sum',
-        'Interceptions': 'sum',
-        'Blocks': 'sum',
-        'Ground Duels': 'sum',
-        'gDuels %': 'mean',
-        'Aerial Duels': 'sum',
-        'aDuels %': 'mean',
-        'Dispossessed': 'sum',
-        'Clean Sheets': lambda x: x[team_data['Position'] == 'GKP'].sum()
-    }).reset_index()
+    team_stats = team_stats_table(df, *selection)
     st.write("Below is a summary table of key statistics for the selected teams, including attacking, defensive, and passing metrics.")
     st.dataframe(team_stats)
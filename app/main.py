@@ -1,11 +1,12 @@
 import streamlit as st
-from components.sidebar import sidebar
+from components.sidebar import sidebar, performance_panel
 from components.overview import overview
 from components.player_analysis import player_analysis
 from components.team_analysis import team_analysis
 from components.advanced_metrics import advanced_metrics
 from components.position_analysis import position_analysis
 import utils.data_loader as data_loader
+import utils.profiling as profiling
 
 
 # Page configuration
@@ -20,25 +21,29 @@ st.set_page_config(
 with open('app/style.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
-# Initialize session state
-if 'data' not in st.session_state:
-    st.session_state.data = data_loader.load_data()
-
 def main():
-    # Sidebar
-    page = sidebar()
-    
-    # Main content
-    if page == "Overview":
-        overview()
-    elif page == "Position Analysis":
-        position_analysis()
-    elif page == "Player Analysis":
-        player_analysis()
-    elif page == "Team Analysis":
-        team_analysis()
-    elif page == "Advanced Metrics":
-        advanced_metrics()
+    # Every rerun is timed as a tree of spans, shown in the performance panel
+    with profiling.trace('rerun') as rerun:
+        # Load the shared dataset once per server process; sessions only keep their filters
+        data_loader.get_dataset()
+
+        # Sidebar
+        page = sidebar()
+        rerun.attrs['page'] = page
+        
+        # Main content
+        if page == "Overview":
+            overview()
+        elif page == "Position Analysis":
+            position_analysis()
+        elif page == "Player Analysis":
+            player_analysis()
+        elif page == "Team Analysis":
+            team_analysis()
+        elif page == "Advanced Metrics":
+            advanced_metrics()
+
+    performance_panel(rerun)
 
 if __name__ == "__main__":
     main()
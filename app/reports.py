@@ -0,0 +1,172 @@
+"""
+Static match-day report per club: the Team Overview metrics, squad
+composition, minutes distribution, top performers and detailed statistics of
+the Team Analysis page, rendered to HTML for every club in parallel.
+
+    python app/reports.py [--league LEAGUE --season SEASON] [--output reports] [--workers N]
+                          [--plotlyjs {file,cdn,inline}]
+
+By default the reports load one plotly.min.js written next to them, so the
+output directory must be kept together; --plotlyjs cdn loads it from the
+plotly CDN instead (small files, needs a network), and --plotlyjs inline
+embeds it in every report (self-contained, about 4 MB each).
+"""
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+import utils.catalog as catalog
+from components.team_analysis import (
+    TOP_PERFORMERS, minutes_distribution, overview_metrics, squad_composition,
+    team_stats_table, top_performers
+)
+from utils.cube import get_cube
+from utils.data_loader import get_dataset
+from utils.filter_index import get_filter_index
+from utils.ranks import get_rank_engine
+
+# How a report loads plotly.js: from a shared file next to it, from the CDN,
+# or embedded in the report itself
+PLOTLYJS_MODES = ['file', 'cdn', 'inline']
+
+# Dataset the workers render from; set before the pool starts so forked
+# workers share the parent's copy instead of loading their own
+_dataset = None
+
+
+def _init_worker(df):
+    global _dataset
+    _dataset = df
+
+
+def prepare_dataset(partitions):
+    """Load the dataset and build the indexes the report charts use, once"""
+    df = get_dataset(partitions)
+    get_cube(df)
+    get_filter_index(df)
+    get_rank_engine(df)
+    return df
+
+
+def figure_html(fig):
+    # plotly.js is loaded once in the page head, not with every figure
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def plotlyjs_tag(plotlyjs='file'):
+    """Script tag of the report head that loads plotly.js"""
+    if plotlyjs == 'file':
+        return '<script src="plotly.min.js"></script>'
+    if plotlyjs == 'cdn':
+        return f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>'
+    return f'<script>{get_plotlyjs()}</script>'
+
+
+def club_report(club, plotlyjs='file'):
+    """HTML report of one club"""
+    df = _dataset
+    selection = ([club],)
+    metrics = ''.join(
+        f'<div class="metric"><div class="label">{html.escape(label)}</div>'
+        f'<div class="value">{value}</div><div class="delta">{html.escape(delta)}</div></div>'
+        for label, value, delta in overview_metrics(df, *selection)
+    )
+    sections = [
+        ("Team Overview", f'<div class="metrics">{metrics}</div>'),
+        ("Squad Composition", figure_html(squad_composition(df, *selection))),
+        ("Playing Time Distribution", figure_html(minutes_distribution(df, *selection)))
+    ]
+    sections += [
+        (title, figure_html(top_performers(df, score, columns, *selection)))
+        for title, score, columns in TOP_PERFORMERS
+    ]
+    sections.append(("Detailed Team Statistics", team_stats_table(df, *selection).to_html(index=False)))
+    body = ''.join(f'<h2>{html.escape(title)}</h2>\n{content}\n' for title, content in sections)
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(club)} - Team Report</title>
+{plotlyjs_tag(plotlyjs)}
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+.metrics {{ display: flex; gap: 2em; }}
+.metric .value {{ font-size: 2em; }}
+.metric .delta {{ color: #09ab3b; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ddd; padding: 4px 8px; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(club)}</h1>
+{body}</body>
+</html>
+"""
+
+
+def report_filename(club):
+    return re.sub(r'[^a-z0-9]+', '-', club.lower()).strip('-') + '.html'
+
+
+def write_report(club, output, plotlyjs='file'):
+    path = Path(output) / report_filename(club)
+    path.write_text(club_report(club, plotlyjs), encoding='utf-8')
+    return path
+
+
+def write_reports(partitions=None, output='reports', workers=None, plotlyjs='file'):
+    """Render every club's report in a process pool; returns the written paths"""
+    df = prepare_dataset(partitions)
+    clubs = sorted(df['Club'].unique())
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    if plotlyjs == 'file':
+        (output / 'plotly.min.js').write_text(get_plotlyjs(), encoding='utf-8')
+
+    # Forked workers inherit the dataset and its indexes from the parent. Where
+    # fork is unavailable (Windows) the pool spawns, and initargs pickles the
+    # dataset to every worker, which rebuilds the indexes it uses on first use
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    _init_worker(df)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(df,)) as pool:
+        paths = list(pool.map(write_report, clubs, [output] * len(clubs), [plotlyjs] * len(clubs)))
+
+    links = ''.join(f'<li><a href="{path.name}">{html.escape(club)}</a></li>' for club, path in zip(clubs, paths))
+    (output / 'index.html').write_text(
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Team Reports</title></head>'
+        f'<body><h1>Team Reports</h1><ul>{links}</ul></body></html>\n',
+        encoding='utf-8'
+    )
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a static HTML report for every club")
+    parser.add_argument('--league')
+    parser.add_argument('--season')
+    parser.add_argument('--output', default='reports')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument(
+        '--plotlyjs', choices=PLOTLYJS_MODES, default='file',
+        help="file: one shared plotly.min.js next to the reports (keep the directory together); "
+             "cdn: load it from cdn.plot.ly (needs a network); inline: embed it in every report (~4 MB each)"
+    )
+    args = parser.parse_args()
+
+    default = catalog.default_partition()
+    partitions = [(args.league or default.league, args.season or default.season)]
+    start = time.perf_counter()
+    paths = write_reports(partitions, args.output, args.workers, args.plotlyjs)
+    print(f"Wrote {len(paths)} club reports to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# A player is one row per (name, club); these columns identify the row
+KEY_COLUMNS = ['Player Name', 'Club']
+IDENTITY_COLUMNS = ['Player Name', 'Club', 'Nationality', 'Position', 'League', 'Season']
+
+# Percentage columns of the source schema and the counts they are a rate of.
+# They are combined as averages weighted by those counts; everything else
+# numeric in the source schema is a cumulative count and is added up.
+RATE_WEIGHTS = {
+    'Conversion %': ['Shots'],
+    'Passes %': ['Passes'],
+    'Crosses %': ['Crosses'],
+    'fThird Passes %': ['fThird Passes'],
+    'gDuels %': ['Ground Duels'],
+    'aDuels %': ['Aerial Duels'],
+    'Saves %': ['Saves', 'Goals Conceded']
+}
+
+# Streaming reads size their chunks so that a parsed chunk plus the parser's
+# working copies stay within the memory budget
+DEFAULT_MEMORY_BUDGET_MB = 256
+PARSE_OVERHEAD = 3
+SAMPLE_ROWS = 1000
+
+# Helper columns of a partial aggregate: weighted rate sums, their weights,
+# and the plain rate sums used when every part has zero weight
+_WEIGHTED = ' (weighted)'
+_WEIGHT = ' (weight)'
+_PARTS = '_parts'
+
+
+def combine_rates(rates, weights, fallback):
+    """
+    Weighted average of per-part rates; rows whose parts all have zero weight
+    get the fallback value
+    """
+    total = weights.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        combined = (rates * weights).sum(axis=1) / total
+    return np.where(total > 0, combined, fallback)
+
+
+def _partials(df):
+    """
+    Reduce source rows to one additive partial aggregate per player, so that
+    partials of different chunks combine with a plain sum
+    """
+    df = df.copy()
+    df[_PARTS] = 1
+    for rate, weight_columns in RATE_WEIGHTS.items():
+        if rate in df.columns:
+            weights = df[weight_columns].to_numpy(dtype=np.float64).sum(axis=1)
+            df[rate + _WEIGHTED] = df[rate].to_numpy(dtype=np.float64) * weights
+            df[rate + _WEIGHT] = weights
+    return _combine(df)
+
+
+def _combine(df):
+    spec = {
+        col: 'first' if col in IDENTITY_COLUMNS else 'sum'
+        for col in df.columns if col not in KEY_COLUMNS
+    }
+    return df.groupby(KEY_COLUMNS, sort=False, dropna=False, observed=True).agg(spec)
+
+
+def _finalize(partials, dtypes):
+    """Turn combined partials back into player rows of the source schema"""
+    df = partials.reset_index()
+    parts = df.pop(_PARTS).to_numpy(dtype=np.float64)
+    for rate in RATE_WEIGHTS:
+        if rate not in df.columns:
+            continue
+        weights = df.pop(rate + _WEIGHT).to_numpy()
+        weighted = df.pop(rate + _WEIGHTED).to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            df[rate] = np.where(weights > 0, weighted / weights, df[rate].to_numpy(dtype=np.float64) / parts)
+    for col, dtype in dtypes.items():
+        if pd.api.types.is_integer_dtype(dtype):
+            df[col] = np.rint(df[col].to_numpy(dtype=np.float64)).astype(dtype)
+    return df[list(dtypes.index)]
+
+
+def aggregate_players(df):
+    """
+    Aggregate match- or event-level rows of the source schema to one row per
+    player: counts are summed and percentages weighted by their counts.
+    Player-level input comes back unchanged.
+    """
+    return _finalize(_partials(df), df.dtypes)
+
+
+def _promote(dtypes, chunk_dtypes):
+    """A column with gaps in any chunk is a float column, as in one eager read"""
+    return pd.Series([
+        np.result_type(old, new) if old != new and pd.api.types.is_numeric_dtype(old)
+        and pd.api.types.is_numeric_dtype(new) else old
+        for old, new in zip(dtypes, chunk_dtypes)
+    ], index=dtypes.index)
+
+
+def chunk_rows(path, memory_budget_mb):
+    """Rows per chunk that keep one parsed chunk within the memory budget"""
+    sample = pd.read_csv(path, nrows=SAMPLE_ROWS)
+    bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    return max(int(memory_budget_mb * 2 ** 20 / (bytes_per_row * PARSE_OVERHEAD)), 1)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None when unknown"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stream_players(path, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Same result as aggregate_players(pd.read_csv(path)), reading the file in
+    chunks sized by the memory budget. Each chunk is reduced to per-player
+    partials right away, so memory holds one chunk plus one row per player.
+    """
+    start = time.perf_counter()
+    chunksize = chunk_rows(path, memory_budget_mb)
+    partials = None
+    dtypes = None
+    n_rows = n_chunks = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        dtypes = chunk.dtypes if dtypes is None else _promote(dtypes, chunk.dtypes)
+        n_rows += len(chunk)
+        n_chunks += 1
+        chunk = _partials(chunk)
+        partials = chunk if partials is None else _combine(pd.concat([partials, chunk]).reset_index())
+    if partials is None:
+        return pd.read_csv(path)
+
+    df = _finalize(partials, dtypes)
+    rss = peak_rss_mb()
+    logger.info("Streamed %d rows in %d chunks of %d to %d players in %.3fs (peak RSS %s MB)",
+                n_rows, n_chunks, chunksize, len(df), time.perf_counter() - start,
+                'unknown' if rss is None else f'{rss:.0f}')
+    return df
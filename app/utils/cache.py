@@ -0,0 +1,64 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import pandas as pd
+import utils.group_stats as gs
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent.parent.parent / 'data' / '.cache'
+
+# Bump whenever the preprocessing in data_loader changes what it derives
+PIPELINE_VERSION = 3
+
+
+def cache_key(source_path):
+    """
+    Hash of the source CSV contents, the pipeline version and the scoring weights
+    """
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(str(PIPELINE_VERSION).encode())
+    digest.update(json.dumps(gs.ROLE_WEIGHTS, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def _cache_path(name, key):
+    return CACHE_DIR / f'{name}-{key}.feather'
+
+
+def read_frame(name, key):
+    """
+    Read a cached frame back, or return None when there is no usable entry
+    """
+    path = _cache_path(name, key)
+    if not path.exists():
+        return None
+    try:
+        return pd.read_feather(path)
+    except Exception as exc:  # missing pyarrow, truncated or stale file
+        logger.warning("Ignoring unreadable cache file %s: %s", path, exc)
+        return None
+
+
+def write_frame(name, key, df):
+    """
+    Store the derived frame and drop older entries for the same source
+    """
+    path = _cache_path(name, key)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary name first so concurrent readers never see half a file
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        df.to_feather(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as exc:
+        logger.warning("Could not write cache file %s: %s", path, exc)
+        return
+    for stale in CACHE_DIR.glob(f'{name}-*.feather'):
+        if stale != path and stale.stem[len(name) + 1:].isalnum():
+            stale.unlink(missing_ok=True)
@@ -0,0 +1,38 @@
+import json
+import re
+from collections import namedtuple
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent.parent / 'data'
+CATALOG_PATH = DATA_DIR / 'catalog.json'
+
+# One league/season table with the schema of epl_player_stats_24_25.csv.
+# New partitions go under data/<league-slug>/<season>.csv and get an entry in
+# data/catalog.json; the first entry is the default selection. Files with one
+# row per match or event instead of per player are marked with "level".
+Partition = namedtuple('Partition', ['league', 'season', 'path', 'level'], defaults=['player'])
+
+
+def load_catalog():
+    """
+    Read the partition catalog, resolving paths relative to the data directory
+    """
+    with open(CATALOG_PATH) as f:
+        entries = json.load(f)['partitions']
+    return [Partition(e['league'], e['season'], DATA_DIR / e['path'], e.get('level', 'player')) for e in entries]
+
+
+def default_partition():
+    return load_catalog()[0]
+
+
+def get_partition(league, season):
+    for partition in load_catalog():
+        if partition.league == league and partition.season == season:
+            return partition
+    raise KeyError(f"No partition for {league} {season} in {CATALOG_PATH}")
+
+
+def partition_name(partition):
+    """Filesystem-safe name of a partition, used for its cache file"""
+    return re.sub(r'[^a-z0-9]+', '-', f'{partition.league} {partition.season}'.lower()).strip('-')
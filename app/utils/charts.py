@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Scatter plots of more rows than this are drawn with WebGL (scattergl)
+WEBGL_ROWS = 1000
+# Above this many rows a scatter is binned server-side into a density grid
+# and only the top rows are still drawn as points
+DENSITY_ROWS = 10000
+DENSITY_BINS = 100
+HIGHLIGHT_ROWS = 200
+# Bar charts of more rows than this become a histogram of the bar values
+MAX_BARS = 1000
+HISTOGRAM_BINS = 40
+
+
+def density_trace(x, y, bins=DENSITY_BINS, name='All players'):
+    """Heatmap of the row counts of an (x, y) point cloud on a bins x bins grid"""
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    counts, x_edges, y_edges = np.histogram2d(x[finite], y[finite], bins=bins)
+    return go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        # Empty cells stay transparent
+        z=np.where(counts > 0, counts, np.nan).T,
+        colorscale='Greys',
+        showscale=False,
+        name=name,
+        hovertemplate='%{z:.0f} players<extra></extra>'
+    )
+
+
+def scatter(df, x, y, highlight=None, **kwargs):
+    """
+    px.scatter whose payload stays bounded: SVG for small frames, WebGL
+    above WEBGL_ROWS rows, and above DENSITY_ROWS a density heatmap of every
+    row under the HIGHLIGHT_ROWS highest rows by highlight (y by default)
+    """
+    if len(df) <= DENSITY_ROWS:
+        return px.scatter(df, x=x, y=y, render_mode='webgl' if len(df) > WEBGL_ROWS else 'svg', **kwargs)
+    top = df.nlargest(HIGHLIGHT_ROWS, highlight or y)
+    fig = px.scatter(top, x=x, y=y, render_mode='webgl', **kwargs)
+    fig.add_trace(density_trace(df[x], df[y]))
+    # Underneath the points, so they keep their hover
+    fig.data = fig.data[-1:] + fig.data[:-1]
+    return fig
+
+
+def bar(df, x, y, color=None, max_bars=MAX_BARS, **kwargs):
+    """
+    px.bar of one bar per row up to max_bars rows; above that, the bars are
+    aggregated server-side into a histogram of y (players per bin and color)
+    """
+    if len(df) <= max_bars:
+        return px.bar(df, x=x, y=y, color=color, **kwargs)
+    values = df[y].to_numpy(dtype=np.float64)
+    edges = np.histogram_bin_edges(values[np.isfinite(values)], bins=HISTOGRAM_BINS)
+    bins = pd.cut(df[y], edges, include_lowest=True)
+    keys = [bins] + ([df[color]] if color else [])
+    counts = df.groupby(keys, observed=True).size().rename('Players').reset_index()
+    counts[y] = counts[y].map(lambda interval: interval.mid).astype(np.float64)
+    fig = px.bar(counts, x=y, y='Players', color=color, **kwargs)
+    fig.update_layout(bargap=0)
+    return fig
@@ -0,0 +1,158 @@
+import weakref
+import numpy as np
+import pandas as pd
+from utils.derived import get_derived
+
+
+class CorrelationCube:
+    """
+    Sufficient statistics for Pearson correlations of every numeric metric
+    per (Club, Position) cell: row counts, sums, sums of squares and the
+    co-moment matrix. Any metric subset and club/position filter is answered
+    by adding up cells. A minimum-minutes filter touches only the rows on the
+    smaller side of the threshold, which are subtracted from or replace the
+    cell totals. When a metric has missing values the pairwise statistics
+    are kept too, so results match DataFrame.corr() on pairwise complete rows.
+    """
+
+    def __init__(self, df):
+        self.metrics = [
+            col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        ]
+        self._columns = {metric: j for j, metric in enumerate(self.metrics)}
+        self._frame = weakref.ref(df)
+        self._metric_positions = np.array([df.columns.get_loc(col) for col in self.metrics], dtype=np.int64)
+
+        clubs = df['Club'].astype('category')
+        positions = df['Position'].astype('category')
+        self.clubs = list(clubs.cat.categories)
+        self.positions = list(positions.cat.categories)
+        self._cells = clubs.cat.codes.to_numpy().astype(np.int64) * len(self.positions) + positions.cat.codes.to_numpy()
+        self._n_cells = len(self.clubs) * len(self.positions)
+
+        minutes = df['Minutes'].to_numpy()
+        self._minutes_order = np.argsort(minutes, kind='stable')
+        self._sorted_minutes = minutes[self._minutes_order]
+
+        values = df[self.metrics].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        self.has_missing = not present.all()
+        # Shifting by the column means keeps the sums small, so the
+        # sum-of-products formulas do not lose precision to cancellation
+        with np.errstate(invalid='ignore'):
+            self._shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(df) else np.zeros(len(self.metrics))
+
+        m = len(self.metrics)
+        self._stats = {
+            'n': np.zeros((self._n_cells, m, m)),
+            'sum': np.zeros((self._n_cells, m, m)),
+            'squares': np.zeros((self._n_cells, m, m)),
+            'products': np.zeros((self._n_cells, m, m))
+        } if self.has_missing else {
+            'n': np.zeros(self._n_cells),
+            'sum': np.zeros((self._n_cells, m)),
+            'squares': np.zeros((self._n_cells, m)),
+            'products': np.zeros((self._n_cells, m, m))
+        }
+        order = np.argsort(self._cells, kind='stable')
+        cells = self._cells[order]
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]]) if len(cells) else np.array([], dtype=np.int64)
+        for start, stop in zip(starts, np.r_[starts[1:], len(cells)]):
+            rows = order[start:stop]
+            stats = self._row_stats(values[rows] - self._shift, pairwise=self.has_missing)
+            for name, table in self._stats.items():
+                table[cells[start]] = stats[name]
+
+    @staticmethod
+    def _row_stats(values, pairwise):
+        """
+        Statistics of a block of (shifted) rows. Pairwise statistics are m x m
+        matrices over the rows where both metrics are present
+        """
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        if not pairwise:
+            return {
+                'n': float(len(values)),
+                'sum': filled.sum(axis=0),
+                'squares': (filled ** 2).sum(axis=0),
+                'products': filled.T @ filled
+            }
+        mask = present.astype(np.float64)
+        return {
+            'n': mask.T @ mask,
+            'sum': filled.T @ mask,
+            'squares': (filled ** 2).T @ mask,
+            'products': filled.T @ filled
+        }
+
+    def _cell_stats(self, cell_ids, idx):
+        """Pairwise statistics of the given metric ids, summed over cells"""
+        block = np.ix_(idx, idx)
+        if self.has_missing:
+            return {name: table[cell_ids].sum(axis=0)[block] for name, table in self._stats.items()}
+        n = self._stats['n'][cell_ids].sum()
+        sums = self._stats['sum'][cell_ids].sum(axis=0)[idx]
+        squares = self._stats['squares'][cell_ids].sum(axis=0)[idx]
+        return {
+            'n': np.full((len(idx), len(idx)), n),
+            'sum': np.repeat(sums[:, np.newaxis], len(idx), axis=1),
+            'squares': np.repeat(squares[:, np.newaxis], len(idx), axis=1),
+            'products': self._stats['products'][cell_ids].sum(axis=0)[block]
+        }
+
+    def _rows_stats(self, row_ids, idx):
+        """Pairwise statistics of the given metric ids over some rows"""
+        df = self._frame()
+        values = df.iloc[row_ids, self._metric_positions[idx]].to_numpy(dtype=np.float64) - self._shift[idx]
+        return self._row_stats(values, pairwise=True)
+
+    def _select(self, labels, selected):
+        if not selected:
+            return np.arange(len(labels))
+        lookup = {label: i for i, label in enumerate(labels)}
+        return np.unique(np.array([lookup[value] for value in selected if value in lookup], dtype=np.int64))
+
+    def corr(self, metrics, teams=None, positions=None, min_minutes=0):
+        """Same result as DataFrame.corr() over the rows matching the filters"""
+        idx = np.array([self._columns[metric] for metric in metrics], dtype=np.int64)
+        club_ids = self._select(self.clubs, teams)
+        position_ids = self._select(self.positions, positions)
+        selected = np.zeros(self._n_cells, dtype=bool)
+        selected[(club_ids[:, np.newaxis] * len(self.positions) + position_ids).ravel()] = True
+        cell_ids = np.flatnonzero(selected)
+
+        stats = self._cell_stats(cell_ids, idx)
+        if min_minutes > 0:
+            start = np.searchsorted(self._sorted_minutes, min_minutes, side='left')
+            below = self._minutes_order[:start]
+            below = below[selected[self._cells[below]]]
+            if 2 * len(below) <= stats['n'].max(initial=0):
+                # Fewer rows fall below the threshold: take them out of the cells
+                removed = self._rows_stats(below, idx)
+                stats = {name: stats[name] - removed[name] for name in stats}
+            else:
+                above = np.sort(self._minutes_order[start:])
+                stats = self._rows_stats(above[selected[self._cells[above]]], idx)
+
+        return pd.DataFrame(self._pearson(stats), index=list(metrics), columns=list(metrics))
+
+    @staticmethod
+    def _pearson(stats):
+        n, sums, squares, products = stats['n'], stats['sum'], stats['squares'], stats['products']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = products - sums * sums.T / n
+            variance_x = squares - sums ** 2 / n
+            variance_y = variance_x.T
+            # No spread (or a single row): DataFrame.corr() returns NaN as well
+            spread = (variance_x > 1e-12 * squares) & (variance_y > 1e-12 * squares.T) & (n > 0)
+            r = np.where(spread, covariance / np.sqrt(variance_x * variance_y), np.nan)
+        r = np.clip(r, -1, 1)
+        np.fill_diagonal(r, np.where(np.diag(spread), 1.0, np.nan))
+        return r
+
+
+def get_correlation_cube(df):
+    """Return the correlation cube of a frame, built once per frame"""
+    return get_derived(df, 'correlation_cube', CorrelationCube)
@@ -0,0 +1,217 @@
+import weakref
+import numpy as np
+import pandas as pd
+from utils.derived import get_derived
+
+
+class AggregationCube:
+    """
+    Sums, non-null counts and sums of squares of every numeric metric per
+    (Club, Position, minutes bucket) cell. The bucket axis is stored as suffix
+    sums, so a minimum-minutes filter on a bucket edge is a single lookup; for
+    other thresholds only the rows of the one straddling bucket are touched.
+    """
+
+    def __init__(self, df, minutes_step=90):
+        self.metrics = [
+            col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        ]
+        self.integer_metrics = {col for col in self.metrics if pd.api.types.is_integer_dtype(df[col])}
+        self.minutes_step = minutes_step
+        # Maxima behind the lazy '_norm' columns of a NormalizedFrame
+        self.norm_max = getattr(df, 'norm_max', {})
+        self._frame = weakref.ref(df)
+        self._metric_positions = [df.columns.get_loc(col) for col in self.metrics]
+
+        clubs = df['Club'].astype('category')
+        positions = df['Position'].astype('category')
+        self.clubs = list(clubs.cat.categories)
+        self.positions = list(positions.cat.categories)
+        self._club_codes = clubs.cat.codes.to_numpy()
+        self._position_codes = positions.cat.codes.to_numpy()
+
+        minutes = df['Minutes'].to_numpy()
+        self._minutes_order = np.argsort(minutes, kind='stable')
+        self._sorted_minutes = minutes[self._minutes_order]
+        buckets = (minutes // minutes_step).astype(np.int64)
+        n_buckets = int(buckets.max()) + 1 if len(df) else 1
+
+        # One extra, always empty bucket answers thresholds above the maximum
+        shape = (len(self.clubs), len(self.positions), n_buckets + 1)
+        cells = np.ravel_multi_index((self._club_codes, self._position_codes, buckets), shape)
+        n_cells = int(np.prod(shape))
+
+        values = df[self.metrics].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        values = np.where(present, values, 0.0)
+
+        sums = np.empty((n_cells, len(self.metrics)))
+        counts = np.empty((n_cells, len(self.metrics)))
+        squares = np.empty((n_cells, len(self.metrics)))
+        for j in range(len(self.metrics)):
+            sums[:, j] = np.bincount(cells, weights=values[:, j], minlength=n_cells)
+            counts[:, j] = np.bincount(cells, weights=present[:, j], minlength=n_cells)
+            squares[:, j] = np.bincount(cells, weights=values[:, j] ** 2, minlength=n_cells)
+        rows = np.bincount(cells, minlength=n_cells).astype(np.float64)
+
+        def suffix(table):
+            table = table.reshape(shape + table.shape[1:])
+            return np.flip(np.cumsum(np.flip(table, axis=2), axis=2), axis=2)
+
+        self._sums = suffix(sums)
+        self._counts = suffix(counts)
+        self._squares = suffix(squares)
+        self._rows = suffix(rows)
+
+    def _select(self, labels, selected):
+        if not selected:
+            return np.arange(len(labels))
+        lookup = {label: i for i, label in enumerate(labels)}
+        # Sorted like groupby output, whatever the selection order
+        return np.unique(np.array([lookup[value] for value in selected if value in lookup], dtype=np.int64))
+
+    def _straddling_rows(self, min_minutes):
+        """Row ids with min_minutes <= Minutes < the next bucket edge"""
+        upper = -(-min_minutes // self.minutes_step) * self.minutes_step
+        start = np.searchsorted(self._sorted_minutes, min_minutes, side='left')
+        stop = np.searchsorted(self._sorted_minutes, upper, side='left')
+        return self._minutes_order[start:stop]
+
+    def rollup(self, by=None, teams=None, positions=None, min_minutes=0):
+        """
+        Aggregate the cube to one row per 'Club' or 'Position' (or a single
+        total when by is None) for the given filter combination
+        """
+        club_ids = self._select(self.clubs, teams)
+        position_ids = self._select(self.positions, positions)
+        min_minutes = max(min_minutes, 0)
+        n_buckets = self._rows.shape[2]
+        bucket = min(-(-min_minutes // self.minutes_step), n_buckets - 1)
+
+        block = np.ix_(club_ids, position_ids)
+        sums = self._sums[block + (bucket,)].copy()
+        counts = self._counts[block + (bucket,)].copy()
+        squares = self._squares[block + (bucket,)].copy()
+        rows = self._rows[block + (bucket,)].copy()
+
+        if min_minutes % self.minutes_step:
+            self._add_rows(self._straddling_rows(min_minutes), club_ids, position_ids,
+                           sums, counts, squares, rows)
+
+        if by == 'Club':
+            axis, labels = 1, [self.clubs[i] for i in club_ids]
+        elif by == 'Position':
+            axis, labels = 0, [self.positions[i] for i in position_ids]
+        elif by is None:
+            axis, labels = (0, 1), ['All']
+        else:
+            raise ValueError(f"Cannot roll up by {by!r}; use 'Club', 'Position' or None")
+
+        def reduce(table):
+            table = table.sum(axis=axis)
+            return table if by else table[np.newaxis]
+
+        return CubeRollup(by, labels, self.metrics, self.integer_metrics, self.norm_max,
+                          reduce(sums), reduce(counts), reduce(squares), reduce(rows))
+
+    def _add_rows(self, row_ids, club_ids, position_ids, sums, counts, squares, rows):
+        df = self._frame()
+        if df is None or not len(row_ids):
+            return
+        club_slot = np.full(len(self.clubs), -1)
+        club_slot[club_ids] = np.arange(len(club_ids))
+        position_slot = np.full(len(self.positions), -1)
+        position_slot[position_ids] = np.arange(len(position_ids))
+        club_at = club_slot[self._club_codes[row_ids]]
+        position_at = position_slot[self._position_codes[row_ids]]
+        keep = (club_at >= 0) & (position_at >= 0)
+        row_ids, club_at, position_at = row_ids[keep], club_at[keep], position_at[keep]
+        if not len(row_ids):
+            return
+
+        values = df.iloc[row_ids, self._metric_positions].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        values = np.where(present, values, 0.0)
+
+        # Group the rows by cell and add each run of equal cells in one reduceat
+        cells = club_at * len(position_ids) + position_at
+        order = np.argsort(cells, kind='stable')
+        cells = cells[order]
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        at = np.unravel_index(cells[starts], rows.shape)
+        sums[at] += np.add.reduceat(values[order], starts, axis=0)
+        counts[at] += np.add.reduceat(present[order].astype(np.float64), starts, axis=0)
+        squares[at] += np.add.reduceat(values[order] ** 2, starts, axis=0)
+        rows[at] += np.diff(np.r_[starts, len(cells)])
+
+
+class CubeRollup:
+    """Aggregates of one rollup; groups without any rows are dropped"""
+
+    def __init__(self, by, labels, metrics, integer_metrics, norm_max, sums, counts, squares, rows):
+        keep = rows > 0
+        self.by = by
+        self.index = pd.Index([label for label, k in zip(labels, keep) if k], name=by)
+        self.metrics = metrics
+        self.integer_metrics = integer_metrics
+        self.norm_max = norm_max
+        self._columns = {metric: j for j, metric in enumerate(metrics)}
+        self._sums = sums[keep]
+        self._counts = counts[keep]
+        self._squares = squares[keep]
+        self._rows = rows[keep]
+
+    def column(self, metric, how='sum'):
+        """One aggregate ('sum', 'mean', 'std' or 'count') of one metric per group"""
+        if metric not in self._columns and metric.endswith('_norm'):
+            # Normalizing is a constant scale, so it commutes with every aggregate
+            base = metric[:-len('_norm')]
+            values = self.column(base, how)
+            if how != 'count':
+                values = values / self.norm_max[base]
+            return values.rename(metric)
+        j = self._columns[metric]
+        sums, counts = self._sums[:, j], self._counts[:, j]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if how == 'sum':
+                values = sums.astype(np.int64) if metric in self.integer_metrics else sums
+            elif how == 'count':
+                values = counts.astype(np.int64)
+            elif how == 'mean':
+                values = sums / counts
+            elif how == 'std':
+                variance = (self._squares[:, j] - sums ** 2 / counts) / (counts - 1)
+                values = np.sqrt(np.clip(variance, 0, None))
+            else:
+                raise ValueError(f"Unsupported aggregation {how!r}")
+        return pd.Series(values, index=self.index, name=metric)
+
+    @property
+    def size(self):
+        """Number of players per group"""
+        return pd.Series(self._rows.astype(np.int64), index=self.index, name='count')
+
+    @property
+    def sum(self):
+        return self.agg({metric: 'sum' for metric in self.metrics})
+
+    @property
+    def mean(self):
+        return self.agg({metric: 'mean' for metric in self.metrics})
+
+    def agg(self, spec):
+        """Same output as DataFrame.groupby(by).agg(spec) for 'sum', 'mean', 'std' and 'count'"""
+        return pd.DataFrame(
+            {metric: self.column(metric, how) for metric, how in spec.items()},
+            index=self.index
+        )
+
+    def total(self, metric, how='sum'):
+        """Scalar aggregate of a rollup with by=None"""
+        return self.column(metric, how).iloc[0]
+
+
+def get_cube(df):
+    """Return the aggregation cube of a frame, built once per frame"""
+    return get_derived(df, 'cube', AggregationCube)
@@ -1,18 +1,164 @@
 import pandas as pd
 import numpy as np
-from pathlib import Path
 import utils.group_stats as gs
-import os
+import utils.cache as cache
+import utils.catalog as catalog
+from utils.aggregate import stream_players
+from utils.filter_index import apply_filters
+from utils.profiling import timed
+import collections
+import functools
+import hashlib
+import logging
+import threading
+import time
 
-def load_data():
+logger = logging.getLogger(__name__)
+
+# Compact dtype schema: string dimensions become categoricals, counts get the
+# smallest integer width that holds their range and rates are stored as float32.
+# Role scores stay float64 so leaderboard ordering is not affected by rounding.
+CATEGORICAL_COLUMNS = ['Club', 'Nationality', 'Position', 'League', 'Season']
+FULL_PRECISION_COLUMNS = list(gs.ROLE_WEIGHTS)
+INTEGER_WIDTHS = [np.int8, np.int16, np.int32, np.int64]
+
+# Clubs that appear under more than one name in the source files
+CLUB_ALIASES = {'Brighton': 'Brighton & Hove Albion'}
+
+# Recently used league/season partitions and partition selections kept in memory
+PARTITION_CACHE_SIZE = 8
+DATASET_CACHE_SIZE = 4
+
+# Memory budget for streaming match- and event-level partitions
+STREAM_MEMORY_BUDGET_MB = 256
+
+@functools.lru_cache(maxsize=PARTITION_CACHE_SIZE)
+@timed()
+def load_partition(league, season, use_cache=True):
+    """
+    Load and preprocess one league/season partition from the catalog, reusing
+    the on-disk cache when its CSV and the scoring code are unchanged
+    """
+    start = time.perf_counter()
+    partition = catalog.get_partition(league, season)
+    name = catalog.partition_name(partition)
+    key = cache.cache_key(partition.path)
+    df = cache.read_frame(name, key) if use_cache else None
+    if df is not None:
+        logger.info("Loaded %s from cache (warm) in %.3fs", name, time.perf_counter() - start)
+        return df
+
+    if partition.level == 'player':
+        df = pd.read_csv(partition.path)
+    else:
+        # Match/event-level exports are aggregated to players chunk by chunk
+        df = stream_players(partition.path, STREAM_MEMORY_BUDGET_MB)
+    df['League'] = league
+    df['Season'] = season
+    df = preprocess(df)
+
+    if use_cache:
+        cache.write_frame(name, key, df)
+    logger.info("Built %s from CSV (cold) in %.3fs", name, time.perf_counter() - start)
+    return df
+
+@timed()
+def load_data(partitions=None, use_cache=True):
+    """
+    Load the preprocessed player statistics of the given (league, season)
+    partitions, by default the first partition of the catalog
+    """
+    if not partitions:
+        default = catalog.default_partition()
+        partitions = [(default.league, default.season)]
+    frames = [load_partition(league, season, use_cache) for league, season in partitions]
+    if len(frames) == 1:
+        return gs.normalize_metrics(frames[0])
+
+    df = pd.concat(frames, ignore_index=True)
+    # Partitions have their own categories; rebuild them over the union
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype(str).astype('category')
+    return gs.normalize_metrics(df)
+
+# Loaded selections in LRU order. _dataset_lock only guards updates to it and
+# to _loading, never a load; each selection is loaded under its own lock so a
+# cold load does not block sessions reading other selections
+_datasets = collections.OrderedDict()
+_dataset_lock = threading.Lock()
+_loading = {}
+
+def _selection(partitions):
+    if not partitions:
+        default = catalog.default_partition()
+        partitions = [(default.league, default.season)]
+    return tuple(tuple(partition) for partition in partitions)
+
+def _load_dataset(selection):
+    entry = _datasets.get(selection)
+    if entry is not None:
+        # Recency is best effort; a cached read never waits for the lock
+        if _dataset_lock.acquire(blocking=False):
+            try:
+                if selection in _datasets:
+                    _datasets.move_to_end(selection)
+            finally:
+                _dataset_lock.release()
+        return entry
+
+    with _dataset_lock:
+        selection_lock = _loading.setdefault(selection, threading.Lock())
+    with selection_lock:
+        # Another session may have loaded it while this one waited
+        entry = _datasets.get(selection)
+        if entry is not None:
+            return entry
+        df = load_data(selection)
+        # Content hash of the selected partitions and the scoring code
+        digest = hashlib.sha256()
+        for league, season in selection:
+            digest.update(cache.cache_key(catalog.get_partition(league, season).path).encode())
+        entry = (df, digest.hexdigest()[:16])
+        with _dataset_lock:
+            _datasets[selection] = entry
+            while len(_datasets) > DATASET_CACHE_SIZE:
+                _datasets.popitem(last=False)
+            _loading.pop(selection, None)
+        return entry
+
+def get_dataset(partitions=None):
+    """
+    Return the process-wide preprocessed dataset for a partition selection,
+    loading it on first use. Frames are shared by every session and must be
+    treated as read-only
+    """
+    return _load_dataset(_selection(partitions))[0]
+
+def get_dataset_version(partitions=None):
+    """
+    Version of the dataset get_dataset returns for the same selection; it
+    changes whenever a source file or the scoring code changes
+    """
+    return _load_dataset(_selection(partitions))[1]
+
+def loaded_dataset_version(partitions=None):
     """
-    Load and preprocess the EPL player statistics data
+    Version of a selection that is already in memory, or None; never loads
+    and never waits on a lock
     """
-    DATA_PATH = Path(__file__).parent.parent.parent / 'data' / 'epl_player_stats_24_25.csv'
-    df = pd.read_csv(DATA_PATH)
+    entry = _datasets.get(_selection(partitions))
+    return entry[1] if entry is not None else None
 
+def preprocess(df):
+    """
+    Derive the performance metrics and role scores. Normalized '_norm'
+    columns are not stored; normalize_metrics serves them lazily
+    """
     # brighton and hove albion and brighton are the same club
-    df['Club'] = df['Club'].replace({'Brighton': 'Brighton & Hove Albion'})
+    df['Club'] = df['Club'].replace(CLUB_ALIASES)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
 
     # Data preprocessing
     df['Minutes_Played'] = pd.to_numeric(df['Minutes'], errors='coerce')
@@ -20,16 +166,36 @@ def load_data():
     df = create_performance_metrics(df)
 
     # State performance scores
-    df['Forward_Score'] = df.apply(gs.calculate_forward_score, axis=1)
-    df['Midfielder_Score'] = df.apply(gs.calculate_midfielder_score, axis=1)
-    df['Defender_Score'] = df.apply(gs.calculate_defender_score, axis=1)
-    df['Goalkeeper_Score'] = df.apply(gs.calculate_goalkeeper_score, axis=1)
+    role_scores = gs.calculate_role_scores(df)
+    for role in role_scores.columns:
+        df[role] = role_scores[role]
     df['Card Score'] = df['Yellow Cards'] * 0.5 + df['Red Cards'] * 1
 
-    df = gs.normalize_metrics(df)
+    # Downcast last: derivations above must not run in narrow integer types
+    df = compact_dtypes(df)
 
     return df
 
+def compact_dtypes(df):
+    """
+    Downcast numeric columns to the compact schema
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if col in FULL_PRECISION_COLUMNS:
+            continue
+        if pd.api.types.is_integer_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            low, high = series.min(), series.max()
+            for width in INTEGER_WIDTHS:
+                info = np.iinfo(width)
+                if info.min <= low and high <= info.max:
+                    columns[col] = series.astype(width)
+                    break
+        elif pd.api.types.is_float_dtype(series):
+            columns[col] = series.astype(np.float32)
+    return df.assign(**columns)
+
 def get_team_colors():
     """
     Return a dictionary of team colors for visualization
@@ -61,16 +227,12 @@ def filter_data(df, team=None, position=None, min_minutes=0):
     """
     Filter dataset based on selected criteria
     """
-    filtered_df = df.copy()
-    
-    if team:
-        filtered_df = filtered_df[filtered_df['Club'] == team]
-    if position:
-        filtered_df = filtered_df[filtered_df['Position'] == position]
-    if min_minutes > 0:
-        filtered_df = filtered_df[filtered_df['Minutes'] >= min_minutes]
-        
-    return filtered_df
+    return apply_filters(
+        df,
+        [team] if team else None,
+        [position] if position else None,
+        min_minutes
+    )
 
 
 def create_performance_metrics(df):
@@ -0,0 +1,24 @@
+import threading
+import weakref
+
+_derived = {}
+_derived_lock = threading.Lock()
+
+
+def get_derived(df, name, build):
+    """
+    Return build(df), computed once per frame object and kept for as long as
+    the frame is alive. Used for indexes and aggregates over the shared dataset
+    """
+    key = (id(df), name)
+    entry = _derived.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    with _derived_lock:
+        entry = _derived.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        value = build(df)
+        ref = weakref.ref(df, lambda _, key=key: _derived.pop(key, None))
+        _derived[key] = (ref, value)
+        return value
@@ -0,0 +1,84 @@
+import collections
+import json
+import threading
+import plotly.graph_objects as go
+from utils.profiling import span
+
+# Serialized figures kept across reruns and sessions
+FIGURE_CACHE_SIZE = 256
+
+
+class FigureCache:
+    """
+    LRU cache of serialized Plotly figures. Figures are stored as JSON, so
+    every hit hands out a fresh figure that a page may modify freely
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._figures = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the cached figure for key, or build, store and return it"""
+        with self._lock:
+            serialized = self._figures.get(key)
+            if serialized is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+        if serialized is not None:
+            with span('deserialize'):
+                # Stored figures were validated when they were built
+                return go.Figure(json.loads(serialized), _validate=False)
+
+        with span('build'):
+            figure = build()
+        with span('serialize'):
+            serialized = figure.to_json()
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = serialized
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self):
+        """Hit and miss counters and the current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._figures),
+                'maxsize': self.maxsize
+            }
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self.hits = self.misses = 0
+
+
+figure_cache = FigureCache()
+
+
+def filter_key(teams=None, positions=None, min_minutes=0):
+    """
+    Normalized filter tuple: the order in which clubs or positions were
+    picked does not change any figure, so selections are sorted
+    """
+    return (tuple(sorted(teams or ())), tuple(sorted(positions or ())), int(min_minutes))
+
+
+def cached_figure(page, chart, version, filters, build, params=()):
+    """
+    Figure of one chart for a dataset version and normalized filter tuple,
+    built by build() only on a cache miss. params holds any other widget
+    state the chart depends on
+    """
+    with span(chart, page=page):
+        return figure_cache.get((page, chart, filters, version, params), build)
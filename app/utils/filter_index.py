@@ -0,0 +1,81 @@
+import numpy as np
+from utils.derived import get_derived
+from utils.profiling import span
+
+
+class FilterIndex:
+    """
+    Precomputed bitsets for the club and position filters plus a sorted
+    minutes array, so any filter combination resolves to row ids by
+    intersecting bitsets instead of building boolean masks over the frame
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.all_rows = np.packbits(np.ones(self.n_rows, dtype=bool))
+        self.no_rows = np.packbits(np.zeros(self.n_rows, dtype=bool))
+        self.club_bits = self._bitsets(df['Club'])
+        self.position_bits = self._bitsets(df['Position'])
+
+        minutes = df['Minutes'].to_numpy()
+        self.minutes_order = np.argsort(minutes, kind='stable')
+        self.sorted_minutes = minutes[self.minutes_order]
+
+    @staticmethod
+    def _bitsets(column):
+        values = column.astype('category')
+        codes = values.cat.codes.to_numpy()
+        return {
+            category: np.packbits(codes == code)
+            for code, category in enumerate(values.cat.categories)
+        }
+
+    def _union(self, bitsets, selected):
+        bits = self.no_rows
+        for value in selected:
+            bits = bits | bitsets.get(value, self.no_rows)
+        return bits
+
+    def minutes_bits(self, min_minutes):
+        """Bitset of the rows with at least min_minutes played"""
+        start = np.searchsorted(self.sorted_minutes, min_minutes, side='left')
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.minutes_order[start:]] = True
+        return np.packbits(mask)
+
+    def bits(self, teams=None, positions=None, min_minutes=0):
+        """Bitset of the rows matching every given filter"""
+        bits = self.all_rows
+        if teams:
+            bits = bits & self._union(self.club_bits, teams)
+        if positions:
+            bits = bits & self._union(self.position_bits, positions)
+        if min_minutes > 0:
+            bits = bits & self.minutes_bits(min_minutes)
+        return bits
+
+    def row_ids(self, teams=None, positions=None, min_minutes=0):
+        """Sorted positional row ids matching every given filter"""
+        bits = self.bits(teams, positions, min_minutes)
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+
+def get_filter_index(df):
+    """Return the filter index of a frame, built once per frame"""
+    return get_derived(df, 'filter_index', FilterIndex)
+
+
+def apply_filters(df, teams=None, positions=None, min_minutes=0):
+    """
+    Return the rows of df matching the filters. Without active filters the
+    frame itself is returned, so nothing is copied
+    """
+    if not teams and not positions and min_minutes <= 0:
+        return df
+    with span('filter'):
+        return df.iloc[get_filter_index(df).row_ids(teams, positions, min_minutes)]
+
+
+def apply_session_filters(df, filters):
+    """Apply the sidebar filter selections stored in st.session_state.filters"""
+    return apply_filters(df, filters['team'], filters['position'], filters['min_minutes'])
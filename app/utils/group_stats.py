@@ -1,93 +1,123 @@
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import os
 
 # Utility functions for performance metrics
+FORWARD_WEIGHTS = {
+    'Goals': 0.35,
+    'Shots On Target': 0.2,
+    'Shots': 0.15,
+    'Conversion %': 0.2,
+    'Assists': 0.15,
+    'Crosses %': 0.1,
+    'fThird Passes %': 0.05,
+    'Successful fThird Passes': 0.1,
+    'Carries Ended with Goal': 0.15,
+    'Carries Ended with Assist': 0.15,
+    'Carries Ended with Shot': 0.1,
+    'Hit Woodwork': 0.05,
+    'Big Chances Missed': -0.1,
+    'Offsides': -0.05,
+    'Dispossessed': -0.05
+}
+
 def calculate_forward_score(player_data):
-    weights = {
-        'Goals': 0.35,
-        'Shots On Target': 0.2,
-        'Shots': 0.15,
-        'Conversion %': 0.2,
-        'Assists': 0.15,
-        'Crosses %': 0.1,
-        'fThird Passes %': 0.05,
-        'Successful fThird Passes': 0.1,
-        'Carries Ended with Goal': 0.15,
-        'Carries Ended with Assist': 0.15,
-        'Carries Ended with Shot': 0.1,
-        'Hit Woodwork': 0.05,
-        'Big Chances Missed': -0.1,
-        'Offsides': -0.05,
-        'Dispossessed': -0.05
-    }
-    
-    score = sum(player_data[metric] * weight for metric, weight in weights.items())
+    score = sum(player_data[metric] * weight for metric, weight in FORWARD_WEIGHTS.items())
     return score
 
+MIDFIELDER_WEIGHTS = {
+    'Goals': 0.25,
+    'Shots On Target': 0.1,
+    'Shots': 0.1,
+    'Conversion %': 0.1,
+    'Passes %': 0.1,
+    'Assists': 0.15,
+    'Crosses %': 0.1,
+    'fThird Passes': 0.15,
+    'Successful fThird Passes': 0.1,
+    'Through Balls': 0.1,
+    'Hit Woodwork': 0.005,
+    'Big Chances Missed': -0.05,
+    'Offsides': -0.05,
+    'Tackles': 0.1,
+    'Interceptions': 0.1,
+    'Carries Ended with Goal': 0.15,
+    'Carries Ended with Assist': 0.15,
+    'Carries Ended with Shot': 0.1,
+    'Clearances': 0.1,
+    'aDuels %': 0.1,
+    'gDuels %': 0.1,
+    'Possession Won': 0.1,
+    'Dispossessed': -0.1
+}
+
 def calculate_midfielder_score(player_data):
-    weights = {
-        'Goals': 0.25,
-        'Shots On Target': 0.1,
-        'Shots': 0.1,
-        'Conversion %': 0.1,
-        'Passes %': 0.1,
-        'Assists': 0.15,
-        'Crosses %': 0.1,
-        'fThird Passes': 0.15,
-        'Successful fThird Passes': 0.1,
-        'Through Balls': 0.1,
-        'Hit Woodwork': 0.005,
-        'Big Chances Missed': -0.05,
-        'Offsides': -0.05,
-        'Tackles': 0.1,
-        'Interceptions': 0.1,
-        'Carries Ended with Goal': 0.15,
-        'Carries Ended with Assist': 0.15,
-        'Carries Ended with Shot': 0.1,
-        'Clearances': 0.1,
-        'aDuels %': 0.1,
-        'gDuels %': 0.1,
-        'Possession Won': 0.1,
-        'Dispossessed': -0.1
-    }
-    
-    score = sum(player_data[metric] * weight for metric, weight in weights.items())
+    score = sum(player_data[metric] * weight for metric, weight in MIDFIELDER_WEIGHTS.items())
     return score
 
+DEFENDER_WEIGHTS = {
+    'Tackles': 0.2,
+    'Interceptions': 0.2,
+    'Clean Sheets': 0.2,
+    'Clearances': 0.1,
+    'aDuels %': 0.1,
+    'gDuels %': 0.1,
+    'Possession Won': 0.1,
+    'Dispossessed': -0.2,
+    'Own Goals': -0.3,
+    'Passes %': 0.1
+}
+
 def calculate_defender_score(player_data):
-    weights = {
-        'Tackles': 0.2,
-        'Interceptions': 0.2,
-        'Clean Sheets': 0.2,
-        'Clearances': 0.1,
-        'aDuels %': 0.1,
-        'gDuels %': 0.1,
-        'Possession Won': 0.1,
-        'Dispossessed': -0.2,
-        'Own Goals': -0.3,
-        'Passes %': 0.1
-    }
-    
-    score = sum(player_data[metric] * weight for metric, weight in weights.items())
+    score = sum(player_data[metric] * weight for metric, weight in DEFENDER_WEIGHTS.items())
     return score
 
+GOALKEEPER_WEIGHTS = {
+    'Saves %': 0.25,
+    'Saves': 0.2,
+    'Goals Prevented': 0.25,
+    'High Claims': 0.15,
+    'Passes %': 0.1,
+    'Penalties Saved': 0.1,
+    'Punches': 0.05,
+    'Dispossessed': -0.1,
+    'Goals Conceded': -0.2
+}
+
 def calculate_goalkeeper_score(player_data):
-    weights = {
-        'Saves %': 0.25,
-        'Saves': 0.2,
-        'Goals Prevented': 0.25,
-        'High Claims': 0.15,
-        'Passes %': 0.1,
-        'Penalties Saved': 0.1,
-        'Punches': 0.05,
-        'Dispossessed': -0.1,
-        'Goals Conceded': -0.2
-    }
-    
-    score = sum(player_data[metric] * weight for metric, weight in weights.items())
+    score = sum(player_data[metric] * weight for metric, weight in GOALKEEPER_WEIGHTS.items())
     return score
 
+# Role score columns and the weights behind each one
+ROLE_WEIGHTS = {
+    'Forward_Score': FORWARD_WEIGHTS,
+    'Midfielder_Score': MIDFIELDER_WEIGHTS,
+    'Defender_Score': DEFENDER_WEIGHTS,
+    'Goalkeeper_Score': GOALKEEPER_WEIGHTS
+}
+
+def build_weight_matrix(role_weights=ROLE_WEIGHTS):
+    """Stack the role weight dicts into a (metrics x roles) weight matrix"""
+    metrics = list(dict.fromkeys(metric for weights in role_weights.values() for metric in weights))
+    row = {metric: i for i, metric in enumerate(metrics)}
+    weight_matrix = np.zeros((len(metrics), len(role_weights)))
+    for j, weights in enumerate(role_weights.values()):
+        for metric, weight in weights.items():
+            weight_matrix[row[metric], j] = weight
+    return metrics, list(role_weights), weight_matrix
+
+def calculate_role_scores(df, role_weights=ROLE_WEIGHTS):
+    """Score every player for every role with a single matrix multiply"""
+    metrics, roles, weight_matrix = build_weight_matrix(role_weights)
+    values = df[metrics].to_numpy(dtype=np.float64)
+    missing = np.isnan(values)
+    scores = np.where(missing, 0.0, values) @ weight_matrix
+    if missing.any():
+        # A missing metric only voids the roles that actually weight it
+        scores[(missing.astype(np.int64) @ (weight_matrix != 0)) > 0] = np.nan
+    return pd.DataFrame(scores, index=df.index, columns=roles)
+
 # Normalize columns to 0-1 scale for scoring
 def normalize_columns(df, columns):
     df_norm = df.copy()
@@ -97,13 +127,48 @@ def normalize_columns(df, columns):
     return df_norm
 
 # Normalize metrics for radar chart
+NORM_SUFFIX = '_norm'
+
+class NormalizedFrame(pd.DataFrame):
+    """
+    DataFrame whose '{col}_norm' columns are computed on first access from the
+    cached per-column maxima instead of being stored for every numeric column.
+    Row subsets keep the maxima of the frame they were taken from, so their
+    normalized values stay relative to the whole dataset
+    """
+    _metadata = ['norm_max']
+
+    @property
+    def _constructor(self):
+        return NormalizedFrame
+
+    def norm(self, col):
+        """Return col divided by its maximum, memoized per frame"""
+        cache = self.__dict__.get('_norm_cache')
+        if cache is None:
+            cache = {}
+            object.__setattr__(self, '_norm_cache', cache)
+        if col not in cache:
+            values = super().__getitem__(col) / self.norm_max[col]
+            cache[col] = values.astype(np.float32).rename(f'{col}{NORM_SUFFIX}')
+        return cache[col]
+
+    def _is_lazy_norm(self, key):
+        return (
+            isinstance(key, str) and key.endswith(NORM_SUFFIX) and key not in self.columns
+            and key[:-len(NORM_SUFFIX)] in getattr(self, 'norm_max', {})
+        )
+
+    def __getitem__(self, key):
+        if self._is_lazy_norm(key):
+            return self.norm(key[:-len(NORM_SUFFIX)])
+        if isinstance(key, list) and any(self._is_lazy_norm(k) for k in key):
+            return pd.concat([self[k] for k in key], axis=1)
+        return super().__getitem__(key)
+
 def normalize_metrics(df):
     """Normalize each metric relative to its maximum value"""
-    df_norm = df.copy()
-    for col in df.columns:
-        if pd.api.types.is_numeric_dtype(df[col]):
-            max_value = df[col].max()
-            df_norm[f'{col}_norm'] = df[col] / max_value
-        else:
-            continue
-    return df_norm
\ No newline at end of file
+    norm_max = {col: df[col].max() for col in df.columns if pd.api.types.is_numeric_dtype(df[col])}
+    df_norm = NormalizedFrame(df)
+    df_norm.norm_max = norm_max
+    return df_norm
@@ -0,0 +1,149 @@
+import collections
+import threading
+import numpy as np
+import pandas as pd
+from utils.cube import get_cube
+from utils.filter_index import get_filter_index
+
+# Composite indices: the mean z-score of their component metrics
+INDEX_COMPONENTS = {
+    'Attack_Index': ['Goals', 'Assists', 'Shots On Target'],
+    'Possession_Index': ['Successful Passes', 'Progressive Carries', 'Possession Won'],
+    'Defense_Index': ['Tackles', 'Interceptions', 'Blocks', 'Clean Sheets']
+}
+
+# Recruitment score: a weighted sum of z-scores
+PERFORMANCE_WEIGHTS = {
+    'Goals_per_90': 3,
+    'Assists_per_90': 2,
+    'Shot_Accuracy': 1,
+    'Passes %': 1,
+    'Defensive_per_90': 1,
+    'Duel_Success_Rate': 1
+}
+
+SCORE_COLUMNS = list(INDEX_COMPONENTS) + ['Performance_Score']
+
+# Index stores kept per dataset version, and cohorts kept per store
+INDEX_STORE_CACHE_SIZE = 4
+COHORT_CACHE_SIZE = 32
+
+
+def cohort_moments(cube, metrics, teams=None, positions=None, min_minutes=0, by=None):
+    """
+    Mean and population standard deviation (as scipy.stats.zscore uses)
+    of each metric over a cohort, one row per group of 'by', from the
+    aggregation cube's sums and sums of squares
+    """
+    rollup = cube.rollup(by, teams, positions, min_minutes)
+    mean = rollup.agg({metric: 'mean' for metric in metrics})
+    count = rollup.agg({metric: 'count' for metric in metrics})
+    std = rollup.agg({metric: 'std' for metric in metrics})
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = std * np.sqrt((count - 1) / count)
+    # Constant metrics have no spread; rounding in the sums must not fake one
+    return mean, std.where(std > 1e-12 * mean.abs(), np.nan)
+
+
+class IndexStore:
+    """
+    Z-scores of the index metrics and the composite scores built from them,
+    for any cohort of one dataset version. Cohort means and standard
+    deviations come from the aggregation cube's sums and sums of squares, so
+    a new cohort only touches the component values of its own rows; each
+    cohort's result is kept for reuse on later reruns.
+    """
+
+    def __init__(self, df, version):
+        self.version = version
+        self.metrics = list(dict.fromkeys(
+            [metric for components in INDEX_COMPONENTS.values() for metric in components]
+            + list(PERFORMANCE_WEIGHTS)
+        ))
+        self.columns = [f'{metric}_z' for metric in self.metrics] + SCORE_COLUMNS
+        # One contiguous row per metric, the layout pandas keeps its blocks in
+        self._values = np.ascontiguousarray(df[self.metrics].to_numpy(dtype=np.float64).T)
+        self._labels = df.index
+        positions = df['Position'].astype('category')
+        self._positions = list(positions.cat.categories)
+        self._position_codes = positions.cat.codes.to_numpy()
+        self._cube = get_cube(df)
+        self._filter_index = get_filter_index(df)
+
+        # Every score is a weighted sum of some of the z-scores
+        score_weights = [
+            {metric: 1 / len(components) for metric in components}
+            for components in INDEX_COMPONENTS.values()
+        ] + [PERFORMANCE_WEIGHTS]
+        self._terms = [
+            (np.array([self.metrics.index(metric) for metric in weights]),
+             np.array(list(weights.values()), dtype=np.float64))
+            for weights in score_weights
+        ]
+
+        self._cohorts = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def moments(self, teams=None, positions=None, min_minutes=0, by=None):
+        """Mean and population standard deviation of every index metric over a cohort"""
+        return cohort_moments(self._cube, self.metrics, teams, positions, min_minutes, by)
+
+    def scores(self, teams=None, positions=None, min_minutes=0, by=None):
+        """
+        Z-score ('<metric>_z') and composite score columns for the rows that
+        match the filters, standardized against those rows (by=None) or
+        against the matching rows of the same position (by='Position'). The
+        frame is shared by every session and must be treated as read-only
+        """
+        key = (tuple(teams or ()), tuple(positions or ()), min_minutes, by)
+        with self._lock:
+            if key in self._cohorts:
+                self._cohorts.move_to_end(key)
+                return self._cohorts[key]
+
+        row_ids = self._filter_index.row_ids(teams, positions, min_minutes)
+        mean, std = self.moments(teams, positions, min_minutes, by)
+        if by == 'Position':
+            group_of = np.full(len(self._positions), -1)
+            for i, label in enumerate(mean.index):
+                group_of[self._positions.index(label)] = i
+            groups = group_of[self._position_codes[row_ids]]
+            mean, std = mean.to_numpy().T[:, groups], std.to_numpy().T[:, groups]
+        elif by is None:
+            mean, std = mean.to_numpy().T, std.to_numpy().T
+        else:
+            raise ValueError(f"Cannot standardize by {by!r}; use 'Position' or None")
+
+        # Fill one (column, row) block and hand it to pandas without a copy
+        values = self._values if len(row_ids) == self._values.shape[1] else self._values[:, row_ids]
+        block = np.empty((len(self.columns), len(row_ids)))
+        z = block[:len(self.metrics)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            np.subtract(values, mean, out=z)
+            np.divide(z, std, out=z)
+        for k, (metrics, weights) in enumerate(self._terms):
+            np.matmul(weights, z[metrics], out=block[len(self.metrics) + k])
+        result = pd.DataFrame(block.T, index=self._labels[row_ids], columns=self.columns, copy=False)
+
+        with self._lock:
+            self._cohorts[key] = result
+            if len(self._cohorts) > COHORT_CACHE_SIZE:
+                self._cohorts.popitem(last=False)
+        return result
+
+
+_stores = collections.OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def get_index_store(df, version):
+    """Return the index store of a dataset version, building it on first use"""
+    with _stores_lock:
+        if version in _stores:
+            _stores.move_to_end(version)
+            return _stores[version]
+        store = IndexStore(df, version)
+        _stores[version] = store
+        if len(_stores) > INDEX_STORE_CACHE_SIZE:
+            _stores.popitem(last=False)
+        return store
@@ -0,0 +1,178 @@
+import argparse
+import numpy as np
+import pandas as pd
+import utils.cache as cache
+import utils.catalog as catalog
+import utils.data_loader as data_loader
+import utils.group_stats as gs
+from utils.aggregate import IDENTITY_COLUMNS, KEY_COLUMNS, RATE_WEIGHTS, combine_rates
+
+
+def merge_source_rows(current, delta):
+    """
+    Add a gameweek delta to cumulative source rows with the same index;
+    counts are summed and percentages re-weighted
+    """
+    merged = current.copy()
+    for col in delta.columns:
+        if col in IDENTITY_COLUMNS or col not in current.columns or col in RATE_WEIGHTS:
+            continue
+        merged[col] = current[col].to_numpy(dtype=np.float64) + delta[col].to_numpy(dtype=np.float64)
+    for col, weight_columns in RATE_WEIGHTS.items():
+        if col not in delta.columns:
+            continue
+        rates = np.column_stack([current[col].to_numpy(dtype=np.float64), delta[col].to_numpy(dtype=np.float64)])
+        weights = np.column_stack([
+            current[weight_columns].to_numpy(dtype=np.float64).sum(axis=1),
+            delta[weight_columns].to_numpy(dtype=np.float64).sum(axis=1)
+        ])
+        merged[col] = combine_rates(rates, weights, current[col].to_numpy(dtype=np.float64))
+    return merged
+
+
+class GameweekIngestor:
+    """
+    Keeps a preprocessed season up to date from per-gameweek delta files.
+    The season is held as one array per column; applying a delta re-derives
+    only the rows of the players in it, writes them in place and updates the
+    running column maxima, so its cost depends on the delta size and not on
+    the size of the season. Players new to the season are appended, which is
+    the one step that copies the columns.
+    """
+
+    def __init__(self, df, source_columns, partition=None):
+        self.source_columns = list(source_columns)
+        self.partition = partition
+        self.version = 0
+        self._load(df)
+
+    def _load(self, df):
+        df = pd.DataFrame(df).reset_index(drop=True)
+        self.columns = {col: df[col].to_numpy(copy=True) if self._is_numeric(df[col]) else df[col].array.copy()
+                        for col in df.columns}
+        self.row_of = {key: i for i, key in enumerate(zip(*(df[col] for col in KEY_COLUMNS)))}
+        self.maxima = {col: np.nanmax(values) for col, values in self.columns.items()
+                       if isinstance(values, np.ndarray) and len(values)}
+
+    @classmethod
+    def from_partition(cls, league, season):
+        """Start from the current preprocessed frame of a catalog partition"""
+        partition = catalog.get_partition(league, season)
+        source_columns = pd.read_csv(partition.path, nrows=0).columns
+        return cls(data_loader.load_partition(league, season), source_columns, partition)
+
+    @staticmethod
+    def _is_numeric(column):
+        return pd.api.types.is_numeric_dtype(column) and not isinstance(column.dtype, pd.CategoricalDtype)
+
+    def apply(self, delta):
+        """Apply one gameweek delta in the source CSV schema"""
+        delta = delta.copy()
+        delta['Club'] = delta['Club'].replace(data_loader.CLUB_ALIASES)
+        for col in ['League', 'Season']:
+            if col in self.columns and col not in delta.columns:
+                delta[col] = self.columns[col][0]
+
+        positions = np.array([self.row_of.get(key, -1) for key in zip(*(delta[col] for col in KEY_COLUMNS))],
+                             dtype=np.int64)
+        known = positions >= 0
+        if known.any():
+            self._update_rows(positions[known], delta[known].reset_index(drop=True))
+        if not known.all():
+            self._append_rows(delta[~known].reset_index(drop=True))
+        self.version += 1
+
+    def _update_rows(self, positions, delta):
+        current = pd.DataFrame({
+            col: np.asarray(self.columns[col][positions]) for col in delta.columns if col in self.columns
+        })
+        merged = merge_source_rows(current, delta)
+        for col in merged.columns:
+            # Integer columns (including the rounded CSV percentages) stay integral
+            values = self.columns.get(col)
+            if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.integer):
+                merged[col] = np.rint(merged[col].to_numpy(dtype=np.float64))
+        derived = data_loader.preprocess(merged)
+
+        for col in derived.columns:
+            values = self.columns.get(col)
+            if col in IDENTITY_COLUMNS or not isinstance(values, np.ndarray):
+                continue
+            new_values = derived[col].to_numpy(dtype=np.float64)
+            if np.issubdtype(values.dtype, np.integer):
+                new_values = np.rint(new_values)
+                values = self._ensure_fits(col, new_values)
+            old_values = values[positions]
+            values[positions] = new_values.astype(values.dtype)
+            self._update_max(col, old_values, values[positions])
+
+    def _ensure_fits(self, col, values):
+        """Widen an integer column whose new values overflow its compact width"""
+        current = self.columns[col]
+        info = np.iinfo(current.dtype)
+        low, high = np.nanmin(values), np.nanmax(values)
+        if info.min <= low and high <= info.max:
+            return current
+        wider = next(w for w in data_loader.INTEGER_WIDTHS if np.iinfo(w).min <= low and high <= np.iinfo(w).max)
+        self.columns[col] = current.astype(wider)
+        return self.columns[col]
+
+    def _update_max(self, col, old_values, new_values):
+        if col not in self.maxima:
+            return
+        new_max = np.nanmax(new_values)
+        if new_max >= self.maxima[col]:
+            self.maxima[col] = new_max
+        elif np.nanmax(old_values) >= self.maxima[col]:
+            # The previous leader went down; only then rescan the column
+            self.maxima[col] = np.nanmax(self.columns[col])
+
+    def _append_rows(self, delta):
+        df = pd.concat([self.frame(), data_loader.preprocess(delta)], ignore_index=True)
+        for col in data_loader.CATEGORICAL_COLUMNS:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(str).astype('category')
+        self._load(df)
+
+    def frame(self):
+        """
+        The current season as a NormalizedFrame over the running maxima. It
+        shares the column arrays, so the next apply() is visible through it
+        """
+        df = gs.NormalizedFrame(pd.DataFrame(self.columns, copy=False))
+        df.norm_max = dict(self.maxima)
+        return df
+
+    def source_frame(self):
+        """The current season in the source CSV schema"""
+        return self.frame()[[col for col in self.source_columns if col in self.columns]]
+
+    def save(self):
+        """
+        Write the season back to its partition CSV and store the derived frame
+        under the new CSV's cache key, so the next load is a warm cache hit
+        """
+        if self.partition is None:
+            raise ValueError("Only an ingestor created with from_partition() can be saved")
+        self.source_frame().to_csv(self.partition.path, index=False)
+        df = pd.DataFrame(self.columns)
+        cache.write_frame(catalog.partition_name(self.partition), cache.cache_key(self.partition.path), df)
+        data_loader.load_partition.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply gameweek delta files to a catalog partition")
+    parser.add_argument('league')
+    parser.add_argument('season')
+    parser.add_argument('deltas', nargs='+', help="Per-gameweek CSV files in the source schema")
+    args = parser.parse_args()
+
+    ingestor = GameweekIngestor.from_partition(args.league, args.season)
+    for path in args.deltas:
+        ingestor.apply(pd.read_csv(path))
+    ingestor.save()
+    print(f"Applied {len(args.deltas)} gameweek(s) to {args.league} {args.season}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import bisect
+import difflib
+import hashlib
+import unicodedata
+import numpy as np
+from utils.derived import get_derived
+
+# Columns that identify a player row; the id is derived from them, so it
+# does not change when rows are reordered or partitions are added
+ID_COLUMNS = ['League', 'Season', 'Club', 'Player Name']
+# Search results returned by default
+SEARCH_LIMIT = 50
+# Queries at least this long fall back to fuzzy matching when prefixes find too few players
+FUZZY_MIN_LENGTH = 3
+FUZZY_CUTOFF = 0.75
+# Letters that Unicode does not decompose into a base letter and an accent
+UNACCENTED = str.maketrans({'Ø': 'O', 'ø': 'o', 'Ł': 'L', 'ł': 'l', 'Đ': 'D', 'đ': 'd',
+                            'ß': 'ss', 'Æ': 'AE', 'æ': 'ae', 'Œ': 'OE', 'œ': 'oe'})
+
+
+def search_key(text):
+    """Case- and accent-insensitive form of a name: 'Martin Ødegaard' -> 'martin odegaard'"""
+    decomposed = unicodedata.normalize('NFKD', text.translate(UNACCENTED))
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().split())
+
+
+def player_id(*identity):
+    """Stable id of a player row from its identity columns"""
+    return hashlib.sha1('|'.join(map(str, identity)).encode()).hexdigest()[:12]
+
+
+class PlayerRegistry:
+    """
+    Stable ids, display labels and name lookups for every player row. Names
+    resolve to rows through dicts, and search walks a sorted list of
+    accent-insensitive name keys (the full name and each word of it) with
+    bisect, so a prefix query costs O(log n) plus the matches; difflib only
+    runs on the keys that start with the query's first letter.
+    """
+
+    def __init__(self, df):
+        names = df['Player Name'].astype(str).to_numpy(dtype=object)
+        identity = [df[col].astype(str).to_numpy(dtype=object) if col in df.columns else [''] * len(df)
+                    for col in ID_COLUMNS]
+        self.ids = np.array([player_id(*values) for values in zip(*identity)], dtype=object)
+        self._row_of_id = {player_id: row for row, player_id in enumerate(self.ids)}
+
+        # Names shared by several rows (other clubs or seasons) get the club and season in their label
+        self._rows_of_name = {}
+        for row, name in enumerate(names):
+            self._rows_of_name.setdefault(name, []).append(row)
+        clubs = df['Club'].astype(str).to_numpy(dtype=object)
+        seasons = identity[ID_COLUMNS.index('Season')]
+        several_seasons = len(set(seasons)) > 1
+        self.labels = np.array([
+            name if len(self._rows_of_name[name]) == 1
+            else f'{name} ({clubs[row]}, {seasons[row]})' if several_seasons
+            else f'{name} ({clubs[row]})'
+            for row, name in enumerate(names)
+        ], dtype=object)
+
+        keys = [search_key(name) for name in names]
+        # Rows in alphabetical order of their labels, as the widgets list them
+        self._order = np.array(sorted(range(len(names)), key=lambda row: (keys[row], self.labels[row])),
+                               dtype=np.int64)
+        self._rank = np.empty(len(names), dtype=np.int64)
+        self._rank[self._order] = np.arange(len(names))
+
+        # One entry per full name and per later word of it, so 'saka' finds 'Bukayo Saka'
+        entries = sorted(
+            (token, row)
+            for row, key in enumerate(keys)
+            for token in dict.fromkeys([key] + [key[i + 1:] for i, c in enumerate(key) if c == ' '])
+        )
+        self._tokens = [token for token, _ in entries]
+        self._token_rows = np.array([row for _, row in entries], dtype=np.int64)
+        self._fuzzy_keys = {}
+        for token in dict.fromkeys(self._tokens):
+            self._fuzzy_keys.setdefault(token[:1], []).append(token)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def has(self, player_id):
+        """Whether a player id belongs to a row of this frame"""
+        return player_id in self._row_of_id
+
+    def row(self, player_id):
+        """Positional row of a player id"""
+        return self._row_of_id[player_id]
+
+    def rows(self, player_ids):
+        """Positional rows of player ids, in the given order"""
+        return np.array([self._row_of_id[player_id] for player_id in player_ids], dtype=np.int64)
+
+    def rows_named(self, name):
+        """Positional rows of every player with exactly this name"""
+        return list(self._rows_of_name.get(name, ()))
+
+    def label(self, player_id):
+        """Display label of a player id; ids of other frames are shown as they are"""
+        row = self._row_of_id.get(player_id)
+        return player_id if row is None else self.labels[row]
+
+    def sorted_rows(self, rows=None):
+        """Rows (all by default) in alphabetical order of their names"""
+        if rows is None:
+            return self._order
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows[np.argsort(self._rank[rows], kind='stable')]
+
+    def search(self, query, rows=None, limit=SEARCH_LIMIT):
+        """
+        Rows whose name, or a word of it, starts with query (ignoring case
+        and accents), in alphabetical order; near misses such as 'odegard'
+        follow when fewer than limit rows match. Only rows in the given
+        positional ids are returned
+        """
+        key = search_key(query)
+        allowed = None
+        if rows is not None:
+            allowed = np.zeros(len(self.ids), dtype=bool)
+            allowed[rows] = True
+        if not key:
+            return self.sorted_rows(rows)[:limit]
+
+        start = bisect.bisect_left(self._tokens, key)
+        stop = bisect.bisect_left(self._tokens, key + '\U0010ffff', lo=start)
+        found = self.sorted_rows(np.unique(self._token_rows[start:stop]))
+        if allowed is not None:
+            found = found[allowed[found]]
+        found = list(found[:limit])
+
+        if len(found) < limit and len(key) >= FUZZY_MIN_LENGTH:
+            seen = set(found)
+            close = difflib.get_close_matches(key, self._fuzzy_keys.get(key[0], []), n=limit, cutoff=FUZZY_CUTOFF)
+            for token in close:
+                start = bisect.bisect_left(self._tokens, token)
+                stop = bisect.bisect_right(self._tokens, token, lo=start)
+                for row in self._token_rows[start:stop]:
+                    if row not in seen and (allowed is None or allowed[row]) and len(found) < limit:
+                        seen.add(row)
+                        found.append(row)
+        return np.array(found, dtype=np.int64)
+
+
+def get_player_registry(df):
+    """Return the player registry of a frame, built once per frame"""
+    return get_derived(df, 'player_registry', PlayerRegistry)
@@ -0,0 +1,149 @@
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Traces of the most recent reruns kept for the debug panel and export
+TRACE_HISTORY = 50
+
+# When set, every finished trace is appended to this file as a JSON line
+TRACE_LOG = os.environ.get('EPL_TRACE_LOG')
+if TRACE_LOG:
+    _handler = logging.FileHandler(TRACE_LOG)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_current = contextvars.ContextVar('profiling_span', default=None)
+_traces = collections.deque(maxlen=TRACE_HISTORY)
+_traces_lock = threading.Lock()
+
+
+class Span:
+    """One timed step of a rerun and the steps nested inside it"""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+        self.started = time.time()
+        self.duration = 0.0
+        # Set on spans opened by step(): the span they belong to and their start
+        self._step_of = None
+        self._start = None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started': self.started,
+            'ms': round(self.duration * 1000, 3),
+            **({'attrs': self.attrs} if self.attrs else {}),
+            **({'children': [child.to_dict() for child in self.children]} if self.children else {})
+        }
+
+    def rows(self, depth=0):
+        """(depth, name, milliseconds) of this span and its descendants, depth first"""
+        yield depth, self.name, self.duration * 1000
+        for child in self.children:
+            yield from child.rows(depth + 1)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """
+    Time a step as a child of the enclosing span. Outside of a trace (scripts,
+    benchmarks) nothing is recorded
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    current = Span(name, **attrs)
+    parent.children.append(current)
+    token = _current.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        _end_step(current)
+        current.duration = time.perf_counter() - start
+        _current.reset(token)
+
+
+def _end_step(owner):
+    """Close the step open in owner, if any, and make owner current again"""
+    current = _current.get()
+    if current is not None and current._step_of is owner:
+        current.duration = time.perf_counter() - current._start
+        _current.set(owner)
+
+
+def step(name=None, **attrs):
+    """
+    Time the code from here to the next step() of the same span, or to the
+    end of that span, without indenting it under a with block. Spans opened
+    meanwhile nest inside the step; step() with no name only closes it
+    """
+    current = _current.get()
+    if current is None:
+        return
+    owner = current._step_of or current
+    _end_step(owner)
+    if name is not None:
+        child = Span(name, **attrs)
+        child._step_of = owner
+        owner.children.append(child)
+        child._start = time.perf_counter()
+        _current.set(child)
+
+
+def timed(name=None):
+    """Decorator running the function inside a span, named after it by default"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextlib.contextmanager
+def trace(name, **attrs):
+    """
+    Record one rerun as a tree of spans. The finished trace is kept for the
+    debug panel and logged as a single JSON line
+    """
+    root = Span(name, **attrs)
+    token = _current.set(root)
+    start = time.perf_counter()
+    try:
+        yield root
+    finally:
+        _end_step(root)
+        root.duration = time.perf_counter() - start
+        _current.reset(token)
+        with _traces_lock:
+            _traces.append(root)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(root.to_dict()))
+
+
+def recent_traces():
+    """Finished traces of this process, oldest first"""
+    with _traces_lock:
+        return list(_traces)
+
+
+def export_traces(traces=None):
+    """Traces as JSON lines, one rerun per line"""
+    traces = recent_traces() if traces is None else traces
+    return '\n'.join(json.dumps(root.to_dict()) for root in traces) + '\n'
@@ -0,0 +1,116 @@
+import weakref
+import numpy as np
+import pandas as pd
+from utils.derived import get_derived
+from utils.filter_index import get_filter_index
+
+# Presorted ids are scanned in blocks of at least this many rows
+SCAN_BLOCK = 4096
+
+
+class RankEngine:
+    """
+    Presorted row ids and percentile ranks of every numeric metric. A top-k
+    leaderboard under any filter scans the presorted ids until k matching
+    rows are found instead of sorting the filtered rows on every render.
+    Percentiles are computed within each league and within each
+    (league, position) group, so leagues of different strength are not
+    mixed.
+    """
+
+    def __init__(self, df):
+        self.metrics = [
+            col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        ]
+        self._frame = weakref.ref(df)
+        self._labels = df.index
+        self.n_rows = len(df)
+        values = df[self.metrics].to_numpy(dtype=np.float64)
+        # Descending, ties in row order like nlargest(keep='first'); NaN rows are left out
+        self._order = {}
+        for j, metric in enumerate(self.metrics):
+            order = np.argsort(-values[:, j], kind='stable').astype(np.int32)
+            self._order[metric] = order[:np.count_nonzero(~np.isnan(values[:, j]))]
+
+        groupings = {'League': ['League'], 'Position': ['League', 'Position']}
+        self._percentiles = {}
+        for within, keys in groupings.items():
+            keys = [key for key in keys if key in df.columns]
+            groups = (df.groupby(keys, observed=True, sort=False).ngroup().to_numpy() if keys
+                      else np.zeros(self.n_rows, dtype=np.int64))
+            self._percentiles[within] = np.column_stack([
+                _percentiles(values[:, j], self._order[metric], groups)
+                for j, metric in enumerate(self.metrics)
+            ]) if self.metrics else np.empty((self.n_rows, 0), dtype=np.float32)
+
+    def top_k(self, metric, k=10, teams=None, positions=None, min_minutes=0):
+        """Positional ids of the k highest values of metric among the filtered rows"""
+        order = self._order[metric]
+        if not teams and not positions and min_minutes <= 0:
+            return order[:k].astype(np.int64)
+        bits = get_filter_index(self._frame()).bits(teams, positions, min_minutes)
+        members = np.unpackbits(bits, count=self.n_rows).view(bool)
+        found = []
+        block = max(SCAN_BLOCK, 4 * k)
+        start = 0
+        while start < len(order) and sum(len(ids) for ids in found) < k:
+            ids = order[start:start + block]
+            found.append(ids[members[ids]])
+            start += block
+            block *= 2
+        return np.concatenate(found)[:k].astype(np.int64) if found else np.array([], dtype=np.int64)
+
+    def percentiles(self, row_ids, metrics, within='League'):
+        """
+        Percentile (0-100) of each metric for the given positional ids, among
+        players of the same league or of the same league and position
+        """
+        columns = [self.metrics.index(metric) for metric in metrics]
+        return pd.DataFrame(
+            self._percentiles[within][np.ix_(row_ids, columns)],
+            index=self._labels[row_ids],
+            columns=metrics
+        )
+
+
+def _percentiles(values, order, groups):
+    """
+    Percentile ranks (0-100, ties averaged, NaN left out) within each group,
+    the same as groupby(groups).rank(pct=True) * 100, from a descending order
+    """
+    percentiles = np.full(len(values), np.nan, dtype=np.float32)
+    if not len(order):
+        return percentiles
+    # A stable sort by group keeps every group's rows in descending order
+    ids = order[np.argsort(groups[order], kind='stable')]
+    group_of, sorted_values = groups[ids], values[ids]
+    n = len(ids)
+    group_starts = np.flatnonzero(np.r_[True, group_of[1:] != group_of[:-1]])
+    sizes = np.diff(np.r_[group_starts, n])
+    group_index = np.repeat(np.arange(len(group_starts)), sizes)
+    ascending_rank = sizes[group_index] - (np.arange(n) - group_starts[group_index])
+
+    # Tied values share the average of their ranks
+    new_tie = (group_of[1:] != group_of[:-1]) | (sorted_values[1:] != sorted_values[:-1])
+    tie_starts = np.flatnonzero(np.r_[True, new_tie])
+    tie_sizes = np.diff(np.r_[tie_starts, n])
+    rank = np.repeat(np.add.reduceat(ascending_rank.astype(np.float64), tie_starts) / tie_sizes, tie_sizes)
+
+    percentiles[ids] = rank / sizes[group_index] * 100
+    return percentiles
+
+
+def get_rank_engine(df):
+    """Return the rank engine of a frame, built once per frame"""
+    return get_derived(df, 'rank_engine', RankEngine)
+
+
+def leaderboard(df, metric, k=10, columns=None, teams=None, positions=None, min_minutes=0):
+    """
+    Same rows as apply_filters(df, ...).nlargest(k, metric)[columns]. Meant
+    for long-lived frames such as the dataset; frames rebuilt per selection
+    should call nlargest directly instead of building an engine each time
+    """
+    rows = df.iloc[get_rank_engine(df).top_k(metric, k, teams, positions, min_minutes)]
+    return rows[columns] if columns is not None else rows
@@ -0,0 +1,179 @@
+import collections
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from utils.derived import get_derived
+from utils.filter_index import get_filter_index
+from utils.cube import get_cube
+from utils.indices import PERFORMANCE_WEIGHTS, cohort_moments
+
+# Metrics a recruitment profile can weight: rates and percentages, so
+# players with different playing time compare fairly
+RECRUITMENT_METRICS = [
+    'Goals_per_90', 'Assists_per_90', 'G+A_per_90', 'Key_Passes_per_90', 'Progressive_per_90',
+    'Defensive_per_90', 'Duel_Success_Rate', 'Clean_Sheet_Rate', 'Shot_Accuracy', 'Conversion %',
+    'Passes %', 'Crosses %', 'fThird Passes %', 'gDuels %', 'aDuels %'
+]
+
+# Named weight profiles over the z-scored metrics; 'Balanced' is the
+# Performance_Score weighting of the Advanced Metrics page
+RECRUITMENT_PROFILES = {
+    'Balanced': PERFORMANCE_WEIGHTS,
+    'Poacher': {'Goals_per_90': 3, 'Conversion %': 2, 'Shot_Accuracy': 1},
+    'Target Man': {'Goals_per_90': 2, 'aDuels %': 2, 'Duel_Success_Rate': 1, 'Shot_Accuracy': 1},
+    'Creative Playmaker': {'Assists_per_90': 3, 'Key_Passes_per_90': 2, 'fThird Passes %': 1, 'Passes %': 1},
+    'Box-to-Box': {'G+A_per_90': 1, 'Progressive_per_90': 2, 'Defensive_per_90': 2, 'Duel_Success_Rate': 1},
+    'Wing-Back': {'Crosses %': 2, 'Assists_per_90': 2, 'Progressive_per_90': 2, 'Defensive_per_90': 1},
+    'Ball-Playing CB': {'Passes %': 2, 'Progressive_per_90': 2, 'Defensive_per_90': 2, 'aDuels %': 1, 'gDuels %': 1},
+    'Stopper CB': {'Defensive_per_90': 3, 'aDuels %': 2, 'gDuels %': 2}
+}
+
+# Undervalued shortlist: field players above these cohort quantiles
+MINUTES_QUANTILE = 0.3
+SCORE_QUANTILE = 0.7
+MIN_APPEARANCES = 10
+
+# Z-score matrices kept per cohort
+ZSCORE_CACHE_SIZE = 32
+
+
+def profile_matrix(profiles, metrics=RECRUITMENT_METRICS):
+    """Stack named weight dicts into a (metrics x profiles) weight matrix"""
+    row = {metric: i for i, metric in enumerate(metrics)}
+    weights = np.zeros((len(metrics), len(profiles)))
+    for j, profile in enumerate(profiles.values()):
+        for metric, weight in profile.items():
+            if metric not in row:
+                raise ValueError(f"Profiles can only weight {', '.join(metrics)}; got {metric!r}")
+            weights[row[metric], j] = weight
+    return weights
+
+
+class RecruitmentEngine:
+    """
+    Scores every player of a cohort for any number of weight profiles with
+    one matrix multiply over the cohort's z-scores, and picks each profile's
+    undervalued shortlist with quantile cut-offs computed for all profiles at
+    once. The z-scores of a cohort are standardized from the aggregation
+    cube's moments and kept for later reruns.
+    """
+
+    def __init__(self, df):
+        self.metrics = RECRUITMENT_METRICS
+        self._values = df[self.metrics].to_numpy(dtype=np.float64)
+        self._labels = df.index
+        self._minutes = df['Minutes'].to_numpy(dtype=np.float64)
+        self._appearances = df['Appearances'].to_numpy()
+        self._field = (df['Position'] != 'GKP').to_numpy()
+        positions = df['Position'].astype('category')
+        self._positions = list(positions.cat.categories)
+        self._position_codes = positions.cat.codes.to_numpy()
+        # Built inside get_derived, so the frame's other indexes are looked up on use
+        self._frame = weakref.ref(df)
+        self._zscores = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def zscores(self, teams=None, positions=None, min_minutes=0, by=None):
+        """
+        Positional ids of the cohort and its (rows x metrics) z-scores,
+        standardized against the cohort (by=None) or within each position
+        """
+        key = (tuple(teams or ()), tuple(positions or ()), min_minutes, by)
+        with self._lock:
+            if key in self._zscores:
+                self._zscores.move_to_end(key)
+                return self._zscores[key]
+
+        df = self._frame()
+        row_ids = get_filter_index(df).row_ids(teams, positions, min_minutes)
+        mean, std = cohort_moments(get_cube(df), self.metrics, teams, positions, min_minutes, by)
+        if by == 'Position':
+            group_of = np.full(len(self._positions), -1)
+            for i, label in enumerate(mean.index):
+                group_of[self._positions.index(label)] = i
+            groups = group_of[self._position_codes[row_ids]]
+            mean, std = mean.to_numpy()[groups], std.to_numpy()[groups]
+        elif by is None:
+            mean, std = mean.to_numpy(), std.to_numpy()
+        else:
+            raise ValueError(f"Cannot standardize by {by!r}; use 'Position' or None")
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = (self._values[row_ids] - mean) / std
+
+        with self._lock:
+            self._zscores[key] = (row_ids, z)
+            if len(self._zscores) > ZSCORE_CACHE_SIZE:
+                self._zscores.popitem(last=False)
+        return row_ids, z
+
+    def _scores(self, profiles, teams, positions, min_minutes, by):
+        row_ids, z = self.zscores(teams, positions, min_minutes, by)
+        weights = profile_matrix(profiles, self.metrics)
+        missing = np.isnan(z)
+        scores = np.where(missing, 0.0, z) @ weights
+        if missing.any():
+            # A metric without a z-score only voids the profiles that weight it
+            scores[(missing.astype(np.int64) @ (weights != 0)) > 0] = np.nan
+        return row_ids, scores
+
+    def scores(self, profiles=RECRUITMENT_PROFILES, teams=None, positions=None, min_minutes=0, by=None):
+        """Score of every cohort player (rows) for every profile (columns)"""
+        row_ids, scores = self._scores(profiles, teams, positions, min_minutes, by)
+        return pd.DataFrame(scores, index=self._labels[row_ids], columns=list(profiles))
+
+    def shortlists(self, profiles=RECRUITMENT_PROFILES, teams=None, positions=None, min_minutes=0,
+                   by=None, k=20):
+        """
+        Each profile's undervalued field players, best first: more than the
+        cohort's 30% minutes quantile, a score above the profile's 70%
+        quantile and more than 10 appearances. One row per (profile, rank)
+        with the player's index label and score
+        """
+        row_ids, scores = self._scores(profiles, teams, positions, min_minutes, by)
+        names = list(profiles)
+        if not len(row_ids) or not names:
+            return pd.DataFrame({'Profile': pd.Series(dtype=object), 'Rank': pd.Series(dtype=np.int64),
+                                 'Score': pd.Series(dtype=np.float64)})
+        minutes = self._minutes[row_ids]
+        eligible = (
+            self._field[row_ids]
+            & (minutes > np.quantile(minutes, MINUTES_QUANTILE))
+            & (self._appearances[row_ids] > MIN_APPEARANCES)
+        )
+        # One contiguous row per profile, so the partitions below run along rows
+        by_profile = np.ascontiguousarray(scores.T)
+        # All cut-offs in one partition; nanquantile loops over profiles, so
+        # it only handles the ones that have missing scores
+        incomplete = np.isnan(by_profile).any(axis=1)
+        cutoffs = np.quantile(by_profile, SCORE_QUANTILE, axis=1)
+        if incomplete.any():
+            cutoffs[incomplete] = np.nanquantile(by_profile[incomplete], SCORE_QUANTILE, axis=1)
+        with np.errstate(invalid='ignore'):
+            selected = eligible & (by_profile > cutoffs[:, None])
+        ranked = np.where(selected, by_profile, -np.inf)
+        # Partition out each profile's k best, then sort those best first;
+        # ties keep row order, as a stable sort_values would
+        if k < len(row_ids):
+            candidates = np.argpartition(-ranked, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(len(row_ids)), ranked.shape)
+        order = np.take_along_axis(
+            candidates,
+            np.lexsort((candidates, -np.take_along_axis(ranked, candidates, axis=1)), axis=1),
+            axis=1
+        )
+        counts = np.minimum(selected.sum(axis=1), k)
+        profile_ids = np.repeat(np.arange(len(names)), counts)
+        ranks = np.concatenate([np.arange(1, n + 1) for n in counts])
+        rows = order[profile_ids, ranks - 1]
+        return pd.DataFrame({
+            'Profile': pd.Categorical.from_codes(profile_ids, names),
+            'Rank': ranks,
+            'Score': scores[rows, profile_ids]
+        }, index=self._labels[row_ids[rows]])
+
+
+def get_recruitment_engine(df):
+    """Return the recruitment engine of a frame, built once per frame"""
+    return get_derived(df, 'recruitment_engine', RecruitmentEngine)
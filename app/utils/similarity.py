@@ -0,0 +1,94 @@
+import numpy as np
+from utils.derived import get_derived
+
+# Style features compared between players: per-90 rates and percentages,
+# each scaled to [0, 1] by its column maximum like the '_norm' columns
+SIMILARITY_FEATURES = [
+    'Goals_per_90', 'Assists_per_90', 'Key_Passes_per_90', 'Shot_Accuracy', 'Conversion %',
+    'Progressive_per_90', 'Passes %', 'Crosses %', 'fThird Passes %',
+    'Defensive_per_90', 'Duel_Success_Rate', 'gDuels %', 'aDuels %'
+]
+
+# Feature weightings offered for the search; features not listed weigh 1
+WEIGHTINGS = {
+    'Balanced': {},
+    'Attacking': {'Goals_per_90': 3, 'Assists_per_90': 2, 'Key_Passes_per_90': 2,
+                  'Shot_Accuracy': 2, 'Conversion %': 2},
+    'Possession': {'Progressive_per_90': 3, 'Passes %': 3, 'fThird Passes %': 2,
+                   'Key_Passes_per_90': 2, 'Crosses %': 2},
+    'Defensive': {'Defensive_per_90': 3, 'Duel_Success_Rate': 3, 'gDuels %': 2, 'aDuels %': 2}
+}
+
+
+class SimilarityIndex:
+    """
+    Exact nearest-neighbour search over the style features of every player.
+    The feature matrix and its squared norms are built once, so a query is
+    one matrix-vector product plus a partial sort, whatever the weighting
+    """
+
+    def __init__(self, df):
+        self.features = [col for col in SIMILARITY_FEATURES if col in df.columns]
+        norm_max = getattr(df, 'norm_max', {})
+        values = df[self.features].to_numpy(dtype=np.float64)
+        scale = np.array([norm_max.get(col) or np.nanmax(np.abs(values[:, j]), initial=0) or 1
+                          for j, col in enumerate(self.features)])
+        self._values = np.nan_to_num(values / scale).astype(np.float32)
+        self._squares = self._values ** 2
+        positions = df['Position'].astype('category')
+        self.positions = list(positions.cat.categories)
+        self._position_codes = positions.cat.codes.to_numpy()
+        self._minutes = df['Minutes'].to_numpy()
+
+    def weights(self, weighting='Balanced'):
+        """Weight vector of a named weighting, in feature order"""
+        overrides = WEIGHTINGS[weighting]
+        return np.array([overrides.get(col, 1) for col in self.features], dtype=np.float32)
+
+    def search(self, row, k=10, positions=None, weighting='Balanced', min_minutes=0):
+        """
+        Positional ids and weighted Euclidean distances of the k players most
+        similar to the player at positional id row, closest first
+        """
+        w = self.weights(weighting)
+        query = self._values[row]
+        # |x - q|^2 weighted, expanded so the matrix is only read once
+        distances = self._squares @ w - 2 * (self._values @ (w * query)) + (query ** 2) @ w
+
+        excluded = np.zeros(len(distances), dtype=bool)
+        if positions:
+            codes = [self.positions.index(p) for p in positions if p in self.positions]
+            excluded |= ~np.isin(self._position_codes, codes)
+        if min_minutes > 0:
+            excluded |= self._minutes < min_minutes
+        excluded[row] = True
+        distances[excluded] = np.inf
+
+        k = min(k, int((~excluded).sum()))
+        if k <= 0:
+            return np.array([], dtype=np.int64), np.array([])
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return nearest, np.sqrt(np.clip(distances[nearest], 0, None))
+
+    def max_distance(self, weighting='Balanced'):
+        """Largest possible distance, between opposite corners of the unit cube"""
+        return float(np.sqrt(self.weights(weighting).sum()))
+
+
+def get_similarity_index(df):
+    """Return the similarity index of a frame, built once per frame"""
+    return get_derived(df, 'similarity_index', SimilarityIndex)
+
+
+def similar_players(df, row, k=10, positions=None, weighting='Balanced', min_minutes=0):
+    """
+    The k players of df most similar to the one at positional id row, with
+    their distance and a similarity between 0 and 1
+    """
+    index = get_similarity_index(df)
+    rows, distances = index.search(row, k, positions, weighting, min_minutes)
+    result = df.iloc[rows][['Player Name', 'Club', 'Position', 'Minutes']].copy()
+    result['Distance'] = distances
+    result['Similarity'] = 1 - distances / index.max_distance(weighting)
+    return result
@@ -0,0 +1,261 @@
+import collections
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+import utils.group_stats as gs
+from utils.derived import get_derived
+from utils.filter_index import get_filter_index
+from utils.cube import get_cube
+from utils.indices import INDEX_COMPONENTS, PERFORMANCE_WEIGHTS, SCORE_COLUMNS, cohort_moments
+
+# Season totals resampled as Poisson counts around the observed total, which
+# resamples the player's per-90 rate at the minutes they actually played
+COUNT_COLUMNS = [
+    'Goals', 'Assists', 'Shots', 'Big Chances Missed', 'Hit Woodwork', 'Offsides', 'Passes', 'Crosses',
+    'fThird Passes', 'Through Balls', 'Progressive Carries', 'Carries Ended with Goal',
+    'Carries Ended with Assist', 'Carries Ended with Shot', 'Possession Won', 'Dispossessed',
+    'Clearances', 'Interceptions', 'Blocks', 'Tackles', 'Ground Duels', 'Aerial Duels',
+    'Goals Conceded', 'Own Goals', 'Saves', 'Penalties Saved', 'Punches', 'High Claims'
+]
+# Successes resampled as binomial draws out of their (resampled) attempts at
+# the observed success rate
+SUCCESS_COLUMNS = {
+    'Shots On Target': 'Shots',
+    'Successful Passes': 'Passes',
+    'Successful Crosses': 'Crosses',
+    'Successful fThird Passes': 'fThird Passes',
+    'gDuels Won': 'Ground Duels',
+    'aDuels Won': 'Aerial Duels',
+    'Clean Sheets': 'Appearances'
+}
+# Rates rebuilt from the resampled totals, as create_performance_metrics builds them
+PER_90 = {
+    'Goals_per_90': ['Goals'],
+    'Assists_per_90': ['Assists'],
+    'Defensive_per_90': ['Tackles', 'Interceptions', 'Clearances']
+}
+PERCENTAGES = {
+    'Shot_Accuracy': (['Shots On Target'], ['Shots']),
+    'Passes %': (['Successful Passes'], ['Passes']),
+    'Duel_Success_Rate': (['gDuels Won', 'aDuels Won'], ['Ground Duels', 'Aerial Duels']),
+    'Crosses %': (['Successful Crosses'], ['Crosses']),
+    'fThird Passes %': (['Successful fThird Passes'], ['fThird Passes']),
+    'gDuels %': (['gDuels Won'], ['Ground Duels']),
+    'aDuels %': (['aDuels Won'], ['Aerial Duels'])
+}
+# Any other weighted metric (Conversion %, Saves %, Goals Prevented) keeps its observed value
+
+# Scores that get confidence bands
+BAND_COLUMNS = SCORE_COLUMNS + list(gs.ROLE_WEIGHTS)
+
+BOOTSTRAP_RESAMPLES = 1000
+CONFIDENCE = 0.9
+# Players resampled together in one vectorized block
+BLOCK_ROWS = 128
+# Player resamples drawn per cohort (about 2 microseconds each): cohorts too
+# large for BOOTSTRAP_RESAMPLES within the budget get fewer, down to MIN_RESAMPLES
+RESAMPLE_BUDGET = 1_000_000
+MIN_RESAMPLES = 100
+# Bands kept per (cohort, resamples, confidence, seed)
+BAND_CACHE_SIZE = 16
+
+
+def _percent(successes, attempts):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(attempts > 0, successes / attempts * 100, 0.0)
+
+
+def resamples_for(n_rows, n_resamples=BOOTSTRAP_RESAMPLES):
+    """Resamples drawn for a cohort of n_rows players"""
+    return int(np.clip(RESAMPLE_BUDGET // max(n_rows, 1), MIN_RESAMPLES, n_resamples))
+
+
+def features(totals, observed, minutes, metrics, shape):
+    """
+    (players x metrics [x resamples]) values of the weighted metrics, rebuilt
+    from season totals of the given (players [x resamples]) shape
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        per_90 = np.where(minutes > 0, 90 / minutes, 0.0)
+    values = np.empty((shape[0], len(metrics)) + shape[1:])
+    for k, metric in enumerate(metrics):
+        if metric in PER_90:
+            values[:, k] = sum(totals[column] for column in PER_90[metric]) * per_90
+        elif metric in PERCENTAGES:
+            successes, attempts = PERCENTAGES[metric]
+            values[:, k] = _percent(sum(totals[column] for column in successes),
+                                    sum(totals[column] for column in attempts))
+        else:
+            values[:, k] = totals.get(metric, observed.get(metric))
+    return values
+
+
+def bootstrap_block(block):
+    """
+    Low and high quantiles of every score for one block of players, from
+    n_resamples parametric resamples of their season totals drawn at once.
+    block: (observed, minutes, weights, constant, void, metrics, n_resamples,
+    quantiles, seed), with each player's (scores x metrics) weights
+    """
+    observed, minutes, weights, constant, void, metrics, n_resamples, quantiles, seed = block
+    rng = np.random.default_rng(seed)
+    # Players first, so each player's resamples are contiguous
+    shape = (len(minutes), n_resamples)
+    fixed = {column: values[:, None] for column, values in observed.items()}
+    totals = {column: rng.poisson(fixed[column], size=shape) for column in COUNT_COLUMNS if column in fixed}
+    for column, attempts in SUCCESS_COLUMNS.items():
+        if column not in fixed:
+            continue
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = np.clip(np.where(fixed[attempts] > 0, fixed[column] / fixed[attempts], 0.0), 0, 1)
+        trials = totals[attempts] if attempts in totals else np.broadcast_to(fixed[attempts].astype(np.int64), shape)
+        totals[column] = rng.binomial(trials, rate)
+        # Some rows count more successes than attempts; those stay Poisson counts
+        over = observed[column] > observed[attempts]
+        if over.any():
+            totals[column][over] = rng.poisson(fixed[column][over], size=(over.sum(), n_resamples))
+
+    values = features(totals, fixed, minutes[:, None], metrics, shape)
+    # Cohort moments stay fixed, so every score is linear in the player's values
+    scores = weights @ values + constant[:, :, None]
+    bands = np.quantile(scores, quantiles, axis=-1)
+    bands[:, void] = np.nan
+    return bands
+
+
+class BootstrapEngine:
+    """
+    Confidence bands of the performance indices, Performance_Score and role
+    scores. Every player's season totals are resampled (Poisson counts,
+    binomial successes) and the scores are recomputed for all players and
+    resamples at once, a block of players at a time; large cohorts draw
+    fewer resamples (resamples_for). Bands are kept per cohort for reuse.
+    """
+
+    def __init__(self, df):
+        self.columns = BAND_COLUMNS
+        z_metrics = list(dict.fromkeys(
+            [metric for components in INDEX_COMPONENTS.values() for metric in components]
+            + list(PERFORMANCE_WEIGHTS)
+        ))
+        role_metrics = list(dict.fromkeys(metric for weights in gs.ROLE_WEIGHTS.values() for metric in weights))
+        self.z_metrics = z_metrics
+        self.metrics = list(dict.fromkeys(z_metrics + role_metrics))
+
+        # Scores are raw weighted sums of the metrics (role scores) plus
+        # weighted sums of their z-scores (indices and Performance_Score)
+        row = {metric: i for i, metric in enumerate(self.metrics)}
+        self._raw_weights = np.zeros((len(self.metrics), len(self.columns)))
+        self._z_weights = np.zeros((len(self.metrics), len(self.columns)))
+        z_scores = [{metric: 1 / len(components) for metric in components}
+                    for components in INDEX_COMPONENTS.values()] + [PERFORMANCE_WEIGHTS]
+        for j, weights in enumerate(z_scores):
+            for metric, weight in weights.items():
+                self._z_weights[row[metric], j] = weight
+        for j, weights in enumerate(gs.ROLE_WEIGHTS.values(), start=len(z_scores)):
+            for metric, weight in weights.items():
+                self._raw_weights[row[metric], j] = weight
+
+        columns = set(COUNT_COLUMNS) | set(SUCCESS_COLUMNS) | set(SUCCESS_COLUMNS.values()) | set(self.metrics)
+        self._observed = {
+            column: np.nan_to_num(df[column].to_numpy(dtype=np.float64))
+            for column in columns if column in df.columns
+        }
+        self._minutes = df['Minutes'].to_numpy(dtype=np.float64)
+        stored = df.reindex(columns=self.metrics).to_numpy(dtype=np.float64)
+        self._missing = np.isnan(stored)
+        # Rebuilt rates differ from the stored ones by rounding; resamples
+        # are shifted by the difference so bands surround the shown scores
+        rebuilt = features(self._observed, self._observed, self._minutes, self.metrics, self._minutes.shape)
+        self._offset = np.nan_to_num(stored - rebuilt)
+        self._labels = df.index
+        positions = df['Position'].astype('category')
+        self._positions = list(positions.cat.categories)
+        self._position_codes = positions.cat.codes.to_numpy()
+        # Built inside get_derived, so the frame's other indexes are looked up on use
+        self._frame = weakref.ref(df)
+        self._bands = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _moments(self, row_ids, teams, positions, min_minutes, by):
+        """(rows x metrics) cohort means and inverse standard deviations, 0 off the z-scored metrics"""
+        mean, std = cohort_moments(get_cube(self._frame()), self.z_metrics, teams, positions, min_minutes, by)
+        if by == 'Position':
+            group_of = np.full(len(self._positions), -1)
+            for i, label in enumerate(mean.index):
+                group_of[self._positions.index(label)] = i
+            groups = group_of[self._position_codes[row_ids]]
+            mean, std = mean.to_numpy()[groups], std.to_numpy()[groups]
+        elif by is None:
+            mean, std = mean.to_numpy()[None], std.to_numpy()[None]
+        else:
+            raise ValueError(f"Cannot standardize by {by!r}; use 'Position' or None")
+        center = np.zeros((len(row_ids), len(self.metrics)))
+        inv_scale = np.zeros((len(row_ids), len(self.metrics)))
+        center[:, :len(self.z_metrics)] = mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            inv_scale[:, :len(self.z_metrics)] = 1 / std
+        return center, inv_scale
+
+    def bands(self, teams=None, positions=None, min_minutes=0, by=None,
+              n_resamples=None, confidence=CONFIDENCE, seed=0):
+        """
+        '<score>_low' and '<score>_high' bounds of the central confidence
+        interval of every score for the rows that match the filters, with
+        the z-scores standardized as IndexStore.scores standardizes them.
+        By default the resamples are capped by cohort size; the count used
+        is in the frame's attrs['resamples']
+        """
+        key = (tuple(teams or ()), tuple(positions or ()), min_minutes, by, n_resamples, confidence, seed)
+        with self._lock:
+            if key in self._bands:
+                self._bands.move_to_end(key)
+                return self._bands[key]
+
+        row_ids = get_filter_index(self._frame()).row_ids(teams, positions, min_minutes)
+        if n_resamples is None:
+            n_resamples = resamples_for(len(row_ids))
+        center, inv_scale = self._moments(row_ids, teams, positions, min_minutes, by)
+        # A metric without a value or spread voids the scores that weight it
+        missing_z = self._missing[row_ids] | np.isnan(inv_scale)
+        void = ((self._missing[row_ids].astype(np.int64) @ (self._raw_weights != 0))
+                + (missing_z.astype(np.int64) @ (self._z_weights != 0))) > 0
+        inv_scale = np.nan_to_num(inv_scale)
+        # Per player: score = values @ (raw + inv_scale * z weights) + constant,
+        # with the stored-value offsets folded into the constant
+        weights = self._raw_weights + inv_scale[:, :, None] * self._z_weights
+        offset = self._offset[row_ids]
+        constant = np.einsum('rk,rks->rs', offset, weights) - (center * inv_scale) @ self._z_weights
+        weights = np.ascontiguousarray(weights.transpose(0, 2, 1))
+        quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+
+        starts = range(0, len(row_ids), BLOCK_ROWS)
+        seeds = np.random.SeedSequence(seed).spawn(len(starts))
+        blocks = [
+            ({column: values[row_ids[start:start + BLOCK_ROWS]] for column, values in self._observed.items()},
+             self._minutes[row_ids[start:start + BLOCK_ROWS]], weights[start:start + BLOCK_ROWS],
+             constant[start:start + BLOCK_ROWS], void[start:start + BLOCK_ROWS],
+             self.metrics, n_resamples, quantiles, block_seed)
+            for start, block_seed in zip(starts, seeds)
+        ]
+        results = [bootstrap_block(block) for block in blocks]
+        low, high = (np.concatenate([result[i] for result in results]) if results
+                     else np.empty((0, len(self.columns))) for i in range(2))
+
+        result = pd.DataFrame(
+            np.column_stack([low, high]),
+            index=self._labels[row_ids],
+            columns=[f'{column}_low' for column in self.columns] + [f'{column}_high' for column in self.columns]
+        )
+        result.attrs['resamples'] = n_resamples
+        with self._lock:
+            self._bands[key] = result
+            if len(self._bands) > BAND_CACHE_SIZE:
+                self._bands.popitem(last=False)
+        return result
+
+
+def get_bootstrap_engine(df):
+    """Return the bootstrap engine of a frame, built once per frame"""
+    return get_derived(df, 'bootstrap_engine', BootstrapEngine)
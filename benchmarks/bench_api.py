@@ -0,0 +1,90 @@
+"""
+JSON API throughput with keep-alive clients: rendered, cached and conditional (304) requests.
+
+    python benchmarks/bench_api.py [--clients 1 8 32] [--requests 2000]
+
+Server and clients share one process and event loop, so the numbers are a
+lower bound for a server with the machine to itself.
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+import synthetic  # noqa: F401  (puts the app packages on sys.path)
+from api import ApiServer
+from utils.data_loader import get_dataset_version
+
+TARGETS = [
+    '/players?team=Arsenal&limit=50',
+    '/players?position=MID&min_minutes=900',
+    '/teams',
+    '/leaderboards/Attack_Index?k=10',
+    '/leaderboards/Goals?k=10&position=FWD',
+    '/filters'
+]
+
+
+async def fetch(reader, writer, target, etag=None):
+    """Send one keep-alive GET; return (status, etag, seconds)"""
+    start = time.perf_counter()
+    head = f'GET {target} HTTP/1.1\r\nHost: bench\r\n'
+    if etag:
+        head += f'If-None-Match: {etag}\r\n'
+    writer.write((head + '\r\n').encode())
+    response = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in response[1:] if ': ' in line)
+    await reader.readexactly(int(headers.get('Content-Length', 0)))
+    return int(response[0].split(' ')[1]), headers.get('ETag'), time.perf_counter() - start
+
+
+async def client(port, n_requests, offset, conditional):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    etags, timings = {}, []
+    for i in range(n_requests):
+        target = TARGETS[(offset + i) % len(TARGETS)]
+        status, etag, elapsed = await fetch(reader, writer, target, etags.get(target) if conditional else None)
+        assert status in (200, 304), status
+        etags[target] = etag
+        timings.append(elapsed)
+    writer.close()
+    return timings
+
+
+async def run(mode, n_clients, n_requests):
+    # A cache of size 0 renders every response
+    server = ApiServer(cache_size=0 if mode == 'rendered' else 1024)
+    listener = await server.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    # Warm the response cache and the per-cohort index caches
+    await client(port, len(TARGETS), 0, False)
+    per_client = max(1, n_requests // n_clients)
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        client(port, per_client, i, mode == 'conditional') for i in range(n_clients)
+    ])
+    wall = time.perf_counter() - start
+    listener.close()
+    await listener.wait_closed()
+    timings = np.concatenate(results)
+    return len(timings) / wall, np.percentile(timings, [50, 99]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    get_dataset_version()
+
+    print(f"{'mode':>12} {'clients':>8} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for mode in ['rendered', 'cached', 'conditional']:
+        for n_clients in args.clients:
+            n_requests = args.requests // 10 if mode == 'rendered' else args.requests
+            rate, (p50, p99) = asyncio.run(run(mode, n_clients, n_requests))
+            print(f"{mode:>12} {n_clients:>8} {rate:>9.0f} {p50:>9.2f} {p99:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Figure payload and build time of the large player charts: plain plotly express vs the bounded chart helpers.
+
+    python benchmarks/bench_charts.py [--rows 562 5000 50000 200000]
+
+Payload is the size of the figure JSON sent to the browser; time covers
+building the figure and serializing it.
+"""
+import argparse
+import time
+
+import plotly.express as px
+
+from synthetic import make_players
+import utils.data_loader as data_loader
+from utils import charts
+
+CHARTS = {
+    'talent scatter': (
+        px.scatter, charts.scatter,
+        dict(x='Minutes', y='Goals_per_90', color='Appearances', hover_data=['Player Name', 'Club', 'Position'])
+    ),
+    'minutes bar': (px.bar, charts.bar, dict(x='Player Name', y='Minutes', color='Position'))
+}
+
+
+def measure(build, df, kwargs):
+    start = time.perf_counter()
+    payload = len(build(df, **kwargs).to_json())
+    return payload, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[562, 5000, 50_000, 200_000])
+    args = parser.parse_args()
+
+    print(f"{'chart':>15} {'rows':>8} {'plain (KB)':>11} {'plain (ms)':>11} {'bounded (KB)':>13} {'bounded (ms)':>13}")
+    for n_rows in args.rows:
+        df = data_loader.preprocess(make_players(n_rows))
+        for name, (plain, bounded, kwargs) in CHARTS.items():
+            plain_size, plain_time = measure(plain, df, kwargs)
+            bounded_size, bounded_time = measure(bounded, df, kwargs)
+            print(f"{name:>15} {n_rows:>8} {plain_size / 1024:>11.0f} {plain_time * 1000:>11.0f} "
+                  f"{bounded_size / 1024:>13.0f} {bounded_time * 1000:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
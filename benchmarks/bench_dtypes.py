@@ -0,0 +1,60 @@
+"""
+Memory footprint and groupby speed of the compact dtype schema vs default dtypes.
+
+    python benchmarks/bench_dtypes.py [--rows 562 50000 500000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic import make_players
+import utils.data_loader as data_loader
+
+GROUPBY_METRICS = ['Goals', 'Assists', 'Goals Conceded', 'Shots', 'Shots On Target',
+                   'Goals_per_90', 'Defensive_per_90', 'Passes %']
+
+
+def default_dtypes(df):
+    """Undo the compact schema: object strings, int64 counts, float64 rates"""
+    dtypes = {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            dtypes[col] = object
+        elif pd.api.types.is_integer_dtype(df[col]):
+            dtypes[col] = np.int64
+        elif pd.api.types.is_float_dtype(df[col]):
+            dtypes[col] = np.float64
+    return df.astype(dtypes)
+
+
+def time_groupbys(df, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df.groupby('Club', observed=True)[GROUPBY_METRICS].agg(['sum', 'mean'])
+        df.groupby('Position', observed=True)[GROUPBY_METRICS].mean()
+        df.groupby(['Club', 'Position'], observed=True)[GROUPBY_METRICS].sum()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[562, 50_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'default (MB)':>13} {'compact (MB)':>13} {'saving':>7} "
+          f"{'groupby default':>16} {'groupby compact':>16}")
+    for n_rows in args.rows:
+        compact = data_loader.preprocess(make_players(n_rows))
+        before = default_dtypes(compact)
+        before_mb = before.memory_usage(deep=True).sum() / 2**20
+        compact_mb = compact.memory_usage(deep=True).sum() / 2**20
+        print(f"{n_rows:>8} {before_mb:>13.2f} {compact_mb:>13.2f} {1 - compact_mb / before_mb:>7.0%} "
+              f"{time_groupbys(before) * 1000:>13.1f} ms {time_groupbys(compact) * 1000:>13.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
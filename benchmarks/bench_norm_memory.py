@@ -0,0 +1,42 @@
+"""
+Memory of materializing every '{col}_norm' column vs the lazy NormalizedFrame.
+
+    python benchmarks/bench_norm_memory.py [--rows 562 50000 500000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import make_players
+import utils.data_loader as data_loader
+import utils.group_stats as gs
+
+RADAR_METRICS = ['Goals', 'Assists', 'Shots On Target', 'Conversion %', 'Big Chances Missed',
+                 'Through Balls', 'Tackles', 'Interceptions', 'Blocks', 'Possession Won',
+                 'gDuels Won', 'aDuels Won', 'Passes %', 'Clean Sheets']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[562, 50_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'eager (MB)':>11} {'lazy (MB)':>10} {'lazy + radar (MB)':>18} {'first access (ms)':>18}")
+    for n_rows in args.rows:
+        df = gs.normalize_metrics(data_loader.preprocess(make_players(n_rows)))
+        base_mb = df.memory_usage(deep=True).sum() / 2**20
+        eager_mb = base_mb + sum(
+            len(df) * np.dtype(np.float32).itemsize for _ in df.norm_max
+        ) / 2**20
+
+        start = time.perf_counter()
+        for metric in RADAR_METRICS:
+            df[f'{metric}_norm']
+        first_access = time.perf_counter() - start
+        radar_mb = base_mb + sum(s.memory_usage(deep=True) for s in df._norm_cache.values()) / 2**20
+        print(f"{n_rows:>8} {eager_mb:>11.2f} {base_mb:>10.2f} {radar_mb:>18.2f} {first_access * 1000:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
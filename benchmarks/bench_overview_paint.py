@@ -0,0 +1,53 @@
+"""
+Overview render time with every section built up front vs sections loaded on demand.
+
+    python benchmarks/bench_overview_paint.py [--runs 5]
+
+Runs the app headless with streamlit's AppTest from the repository root. A
+cold render starts from an empty figure cache, a warm one reruns the page
+with the same filters.
+"""
+import argparse
+import os
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from synthetic import APP_DIR
+from utils.figure_cache import figure_cache
+
+
+def render(on_demand, cold):
+    at = AppTest.from_file(str(APP_DIR / 'main.py'), default_timeout=300)
+    at.session_state['overview_on_demand'] = on_demand
+    if cold:
+        figure_cache.clear()
+    else:
+        at.run()
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    assert not at.exception, at.exception
+    return elapsed, len(at.main.get('plotly_chart'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    # main.py reads its stylesheet relative to the repository root
+    os.chdir(APP_DIR.parent)
+    render(True, cold=True)
+
+    print(f"{'mode':>10} {'cache':>6} {'charts':>7} {'best (ms)':>10}")
+    for label, on_demand in [('all', False), ('on demand', True)]:
+        for cache in ['cold', 'warm']:
+            timings, charts = [], 0
+            for _ in range(args.runs):
+                elapsed, charts = render(on_demand, cold=cache == 'cold')
+                timings.append(elapsed)
+            print(f"{label:>10} {cache:>6} {charts:>7} {min(timings) * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
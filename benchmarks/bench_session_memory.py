@@ -0,0 +1,61 @@
+"""
+Memory held per additional Streamlit session.
+
+    python benchmarks/bench_session_memory.py [--sessions 10]
+
+Each simulated session is an AppTest run of main.py kept alive for the whole
+benchmark. For every session count it reports the bytes referenced from
+session state (DataFrames measured with memory_usage(deep=True)) and the
+process RSS.
+"""
+import argparse
+import gc
+import sys
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from synthetic import APP_DIR
+
+MAIN_PATH = str(APP_DIR / 'main.py')
+
+
+def deep_size(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(pd.DataFrame(obj).memory_usage(deep=True).sum())
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_size(k) + deep_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(deep_size(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, default=10)
+    args = parser.parse_args()
+
+    sessions = []
+    print(f"{'sessions':>8} {'state/session (KB)':>19} {'RSS (MB)':>9}")
+    for n_sessions in range(1, args.sessions + 1):
+        app = AppTest.from_file(MAIN_PATH, default_timeout=120)
+        app.run()
+        sessions.append(app)
+        gc.collect()
+        state_bytes = deep_size(app.session_state.to_dict())
+        print(f"{n_sessions:>8} {state_bytes / 1024:>19.1f} {rss_bytes() / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Peak memory and time of eager vs streaming ingestion of a match-level export.
+
+    python benchmarks/bench_streaming.py [--rows 1000000] [--players 600] [--budget 16 64 256]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import make_players
+from utils.aggregate import aggregate_players, peak_rss_mb, stream_players
+
+WRITE_CHUNK = 100_000
+
+
+def write_match_rows(path, n_rows, n_players):
+    """Write n_rows match lines spread over n_players players, chunk by chunk"""
+    for seed, start in enumerate(range(0, n_rows, WRITE_CHUNK)):
+        df = make_players(min(WRITE_CHUNK, n_rows - start), seed=seed)
+        player = pd.Series(range(start, start + len(df))) % n_players
+        clubs = sorted(df['Club'].unique())
+        df['Player Name'] = 'Player ' + player.astype(str)
+        df['Club'] = [clubs[i % len(clubs)] for i in player]
+        df.to_csv(path, mode='a', header=start == 0, index=False)
+
+
+def run(path, mode, budget):
+    """Aggregate the export in this process and print 'seconds peak_rss_mb players'"""
+    start = time.perf_counter()
+    if mode == 'eager':
+        df = aggregate_players(pd.read_csv(path))
+    else:
+        df = stream_players(path, budget)
+    print(time.perf_counter() - start, peak_rss_mb(), len(df))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--players', type=int, default=600)
+    parser.add_argument('--budget', type=int, nargs='+', default=[16, 64, 256])
+    parser.add_argument('--run', nargs=3, metavar=('PATH', 'MODE', 'BUDGET'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run(args.run[0], args.run[1], int(args.run[2]))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'matches.csv')
+        write_match_rows(path, args.rows, args.players)
+        size_mb = os.path.getsize(path) / 2 ** 20
+        print(f"{args.rows} rows, {size_mb:.0f} MB CSV")
+        print(f"{'mode':>16} {'time (s)':>9} {'peak RSS (MB)':>14} {'players':>8}")
+        # Each mode runs in a fresh process so peak RSS is not shared
+        for mode, budget in [('eager', 0)] + [('stream', b) for b in args.budget]:
+            out = subprocess.run([sys.executable, __file__, '--run', path, mode, str(budget)],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            label = mode if mode == 'eager' else f'stream {budget} MB'
+            print(f"{label:>16} {float(out[0]):>9.2f} {float(out[1]):>14.0f} {out[2]:>8}")
+
+
+if __name__ == '__main__':
+    main()
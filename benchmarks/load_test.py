@@ -0,0 +1,153 @@
+"""
+Rerun latency and server memory of the app under N concurrent simulated sessions.
+
+    python benchmarks/load_test.py [--sessions 1 5 10 20] [--actions 20] [--output load.json]
+
+Runs main.py headless with streamlit's AppTest, in-process and without a
+network. Every session runs in its own thread, as on the Streamlit server,
+and keeps switching pages, clubs, minimum minutes and compared players. For
+each session count it reports the completed out of expected reruns, the
+p50/p95/p99 rerun latency, the rerun throughput and the process RSS, in
+total and per session. Exits with status 1 if any rerun failed or was lost.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from synthetic import APP_DIR
+from bench_session_memory import rss_bytes
+from utils.data_loader import get_dataset
+from utils.players import get_player_registry
+
+MAIN_PATH = str(APP_DIR / 'main.py')
+PAGES = ["Overview", "Position Analysis", "Player Analysis", "Team Analysis", "Advanced Metrics"]
+
+
+def widget(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def step(at, rng):
+    """Apply one random user action to a session and rerun it"""
+    action = rng.choice(['page', 'page', 'clubs', 'minutes', 'players'])
+    if action == 'page':
+        at.sidebar.selectbox[0].select(PAGES[rng.integers(len(PAGES))])
+    elif action == 'clubs':
+        clubs = widget(at.sidebar.multiselect, "Select Team(s)")
+        picked = rng.choice(clubs.options, size=rng.integers(0, 3), replace=False)
+        clubs.set_value(list(picked))
+    elif action == 'minutes':
+        widget(at.sidebar.slider, "Minimum Minutes Played").set_value(int(rng.integers(0, 20)) * 90)
+    else:
+        at.sidebar.selectbox[0].select("Player Analysis")
+        at.run()
+        players = at.main.multiselect
+        if players and players[0].options:
+            # The widget lists labels but holds player ids
+            registry = get_player_registry(get_dataset())
+            labels = rng.choice(players[0].options, size=min(2, len(players[0].options)), replace=False)
+            players[0].set_value([registry.ids[registry.labels == label][0] for label in labels])
+    start = time.perf_counter()
+    at.run()
+    return time.perf_counter() - start
+
+
+def run_sessions(n_sessions, actions, seed, timeout):
+    """Start n sessions, drive them concurrently and return latencies, errors and wall time"""
+    sessions = []
+    for _ in range(n_sessions):
+        at = AppTest.from_file(MAIN_PATH, default_timeout=timeout)
+        at.run()
+        sessions.append(at)
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def drive(i, at):
+        rng = np.random.default_rng(seed + i)
+        for _ in range(actions):
+            # A failed action is recorded and the session keeps going, so
+            # one bad rerun cannot silently end its thread
+            try:
+                elapsed = step(at, rng)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            with lock:
+                latencies.append(elapsed)
+                if at.exception:
+                    errors.append(str(at.exception[0].message))
+
+    threads = [threading.Thread(target=drive, args=(i, at)) for i, at in enumerate(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    rss = rss_bytes()
+    return latencies, errors, wall, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10, 20])
+    parser.add_argument('--actions', type=int, default=20, help='reruns per session')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=300, help='seconds before a rerun fails')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+    # main.py reads its stylesheet relative to the repository root
+    os.chdir(APP_DIR.parent)
+
+    # Load the dataset and warm the process-wide caches before measuring
+    AppTest.from_file(MAIN_PATH, default_timeout=args.timeout).run()
+    gc.collect()
+    baseline = rss_bytes()
+
+    rows = []
+    failed = False
+    print(f"{'sessions':>8} {'reruns':>11} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'reruns/s':>9} {'RSS (MB)':>9} {'MB/session':>11} {'errors':>7}")
+    for n_sessions in args.sessions:
+        latencies, errors, wall, rss = run_sessions(n_sessions, args.actions, args.seed, args.timeout)
+        expected = n_sessions * args.actions
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else (np.nan,) * 3
+        row = {
+            'sessions': n_sessions,
+            'reruns': len(latencies),
+            'expected_reruns': expected,
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'reruns_per_s': len(latencies) / wall,
+            'rss_mb': rss / 2**20,
+            'mb_per_session': (rss - baseline) / 2**20 / n_sessions,
+            'errors': errors
+        }
+        rows.append(row)
+        reruns = f"{len(latencies)}/{expected}"
+        print(f"{n_sessions:>8} {reruns:>11} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} "
+              f"{row['reruns_per_s']:>9.1f} {row['rss_mb']:>9.1f} {row['mb_per_session']:>11.2f} {len(errors):>7}")
+        for error in sorted(set(errors)):
+            print(f"    {error}")
+        failed = failed or bool(errors) or len(latencies) < expected
+        gc.collect()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({'actions': args.actions, 'results': rows}, indent=2) + '\n')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
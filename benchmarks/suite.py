@@ -0,0 +1,315 @@
+"""
+Data pipeline and page engine benchmark suite on synthetic player tables at 1x, 100x and 1000x the season CSV.
+
+    python benchmarks/suite.py [--scales 1 100 1000] [--repeat 3] [--output results.json] [--baseline old.json]
+    python benchmarks/suite.py --compare old.json new.json [--threshold 0.25]
+
+Every case is timed best-of-repeat and written to a JSON file together with
+the library versions and git commit. Comparing two result files flags each
+case that got slower than the threshold and exits with status 1 if any did.
+Where an engine replaced a pandas step of a page, both are timed so the
+speedup shows in one run.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from synthetic import APP_DIR, SOURCE_PATH, make_players
+import utils.cache as cache
+import utils.catalog as catalog
+import utils.data_loader as data_loader
+import utils.group_stats as gs
+from utils.correlation import CorrelationCube
+from utils.cube import AggregationCube
+from utils.figure_cache import FigureCache, filter_key
+from utils.filter_index import FilterIndex, apply_filters
+from utils.indices import IndexStore
+from utils.ingest import GameweekIngestor
+from utils.players import PlayerRegistry
+from utils.ranks import RankEngine
+from utils.recruitment import RECRUITMENT_METRICS, RecruitmentEngine
+from utils.similarity import SimilarityIndex
+from utils.uncertainty import BootstrapEngine
+
+TEAM_SPEC = {
+    'Goals': 'sum', 'Assists': 'sum', 'Goals Conceded': 'sum', 'Shots': 'sum',
+    'Shots On Target': 'sum', 'Goals_per_90': 'mean', 'Defensive_per_90': 'mean',
+    'Passes': 'mean', 'Passes %': 'mean', 'Progressive Carries': 'mean'
+}
+POSITION_SPEC = {
+    'Goals_per_90': 'mean', 'Assists_per_90': 'mean', 'G+A_per_90': 'mean',
+    'Shot_Accuracy': 'mean', 'Passes %': 'mean', 'Defensive_per_90': 'mean',
+    'Duel_Success_Rate': 'mean', 'Minutes': 'mean'
+}
+ROLE_SCORES = [
+    gs.calculate_forward_score, gs.calculate_midfielder_score,
+    gs.calculate_defender_score, gs.calculate_goalkeeper_score
+]
+CORRELATION_METRICS = ['Goals', 'Assists', 'Shots', 'Shots On Target', 'Passes', 'Successful Passes',
+                       'Progressive Carries', 'Possession Won', 'Minutes']
+LEADERBOARD_METRICS = ['Forward_Score', 'Midfielder_Score', 'Defender_Score']
+RECRUITMENT_PROFILES = 100
+GAMEWEEK_PLAYERS = 300
+# Fixed, so the case measures the per-resample cost at every scale
+BOOTSTRAP_RESAMPLES = 10
+# Differences below this many seconds are treated as noise when comparing
+NOISE_FLOOR = 0.001
+
+
+def best_of(fn, repeat=3, setup=None):
+    best = float('inf')
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@contextlib.contextmanager
+def synthetic_catalog(raw, league, season):
+    """Serve raw as the only catalog partition, with its own data and cache directories"""
+    saved = catalog.DATA_DIR, catalog.CATALOG_PATH, cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        raw.to_csv(tmp / 'players.csv', index=False)
+        with open(tmp / 'catalog.json', 'w') as f:
+            json.dump({'partitions': [{'league': league, 'season': season, 'path': 'players.csv'}]}, f)
+        catalog.DATA_DIR, catalog.CATALOG_PATH, cache.CACHE_DIR = tmp, tmp / 'catalog.json', tmp / '.cache'
+        data_loader.load_partition.cache_clear()
+        try:
+            yield [(league, season)]
+        finally:
+            catalog.DATA_DIR, catalog.CATALOG_PATH, cache.CACHE_DIR = saved
+            data_loader.load_partition.cache_clear()
+
+
+def random_profiles(n_profiles, seed=0):
+    """Recruitment profiles weighting 3 to 6 random metrics with weights 1 to 3"""
+    rng = np.random.default_rng(seed)
+    return {
+        f'profile {i}': {
+            metric: int(rng.integers(1, 4))
+            for metric in rng.choice(RECRUITMENT_METRICS, rng.integers(3, 7), replace=False)
+        }
+        for i in range(n_profiles)
+    }
+
+
+def make_delta(source, n_players, seed=1):
+    """One gameweek for n_players existing players: 90 minutes and small counts"""
+    rng = np.random.default_rng(seed)
+    delta = source.sample(n_players, random_state=seed).reset_index(drop=True)
+    for col in delta.columns[4:]:
+        delta[col] = rng.integers(0, 3, len(delta)).astype(source[col].dtype)
+    delta['Minutes'] = 90
+    delta['Appearances'] = 1
+    return delta
+
+
+def clear_disk_cache():
+    data_loader.load_partition.cache_clear()
+    for stale in cache.CACHE_DIR.glob('*.feather'):
+        stale.unlink()
+
+
+def run_scale(scale, base_rows, repeat):
+    """Time every pipeline step on a table of scale * base_rows rows"""
+    n_rows = scale * base_rows
+    raw = make_players(n_rows)
+    results = {}
+
+    with synthetic_catalog(raw, 'Benchmark', f'x{scale}') as partitions:
+        results['load_data (cold)'] = best_of(
+            lambda: data_loader.load_data(partitions), repeat, setup=clear_disk_cache
+        )
+        data_loader.load_data(partitions)
+        results['load_data (warm)'] = best_of(
+            lambda: data_loader.load_data(partitions), repeat,
+            setup=data_loader.load_partition.cache_clear
+        )
+
+    # preprocess mutates its input, so every run gets a fresh copy
+    fresh = [None]
+    results['preprocess'] = best_of(
+        lambda: data_loader.preprocess(fresh[0]), repeat,
+        setup=lambda: fresh.__setitem__(0, raw.copy())
+    )
+    results['create_performance_metrics'] = best_of(lambda: data_loader.create_performance_metrics(raw), repeat)
+    for score in ROLE_SCORES:
+        results[score.__name__] = best_of(lambda: score(raw), repeat)
+    results['calculate_role_scores'] = best_of(lambda: gs.calculate_role_scores(raw), repeat)
+
+    df = data_loader.preprocess(raw.copy())
+    results['normalize_metrics'] = best_of(lambda: gs.normalize_metrics(df), repeat)
+    df = gs.normalize_metrics(df)
+
+    team = df['Club'].cat.categories[0]
+    results['filter index build'] = best_of(lambda: FilterIndex(df), repeat)
+    data_loader.filter_data(df, team, 'MID', 455)
+    results['filter_data'] = best_of(lambda: data_loader.filter_data(df, team, 'MID', 455), repeat)
+
+    results['groupby team stats'] = best_of(
+        lambda: df.groupby('Club', observed=True).agg(TEAM_SPEC), repeat
+    )
+    results['groupby position stats'] = best_of(
+        lambda: df.groupby('Position', observed=True).agg(POSITION_SPEC), repeat
+    )
+    results['cube build'] = best_of(lambda: AggregationCube(df), repeat)
+    cube = AggregationCube(df)
+    results['cube team stats'] = best_of(lambda: cube.rollup('Club', [team], None, 455).agg(TEAM_SPEC), repeat)
+    results['cube position stats'] = best_of(
+        lambda: cube.rollup('Position', None, None, 455).agg(POSITION_SPEC), repeat
+    )
+
+    # Page engines, each next to the pandas step it replaced
+    selection = (list(df['Club'].cat.categories[:5]), None, 455)
+    results['DataFrame.corr'] = best_of(
+        lambda: apply_filters(df, *selection)[CORRELATION_METRICS].corr(), repeat
+    )
+    results['correlation cube build'] = best_of(lambda: CorrelationCube(df), repeat)
+    correlation = CorrelationCube(df)
+    results['correlation cube corr'] = best_of(lambda: correlation.corr(CORRELATION_METRICS, *selection), repeat)
+
+    store = IndexStore(df, 'suite')
+    results['index store new cohort'] = best_of(
+        lambda: store.scores(*selection), repeat, setup=store._cohorts.clear
+    )
+    results['index store cached'] = best_of(lambda: store.scores(*selection), repeat)
+
+    results['nlargest leaderboards'] = best_of(
+        lambda: [apply_filters(df, *selection).nlargest(10, metric) for metric in LEADERBOARD_METRICS], repeat
+    )
+    results['rank engine build'] = best_of(lambda: RankEngine(df), repeat)
+    ranks = RankEngine(df)
+    results['rank engine leaderboards'] = best_of(
+        lambda: [df.iloc[ranks.top_k(metric, 10, *selection)] for metric in LEADERBOARD_METRICS], repeat
+    )
+
+    results['similarity index build'] = best_of(lambda: SimilarityIndex(df), repeat)
+    similarity = SimilarityIndex(df)
+    results['similarity search'] = best_of(lambda: similarity.search(0, 10, ['FWD', 'MID'], min_minutes=900), repeat)
+
+    results['player registry build'] = best_of(lambda: PlayerRegistry(df), repeat)
+    registry = PlayerRegistry(df)
+    results['player search (prefix)'] = best_of(lambda: registry.search('mart'), repeat)
+    results['player search (fuzzy)'] = best_of(lambda: registry.search('odegrd'), repeat)
+
+    profiles = random_profiles(RECRUITMENT_PROFILES)
+    results['recruitment shortlists'] = best_of(lambda: RecruitmentEngine(df).shortlists(profiles), repeat)
+
+    delta = make_delta(raw, min(GAMEWEEK_PLAYERS, n_rows))
+    ingestor = [None]
+    results['gameweek delta apply'] = best_of(
+        lambda: (ingestor[0].apply(delta), ingestor[0].frame()), repeat,
+        setup=lambda: ingestor.__setitem__(0, GameweekIngestor(data_loader.preprocess(raw.copy()), raw.columns))
+    )
+
+    def team_stats():
+        return cube.rollup('Club', *selection).agg(TEAM_SPEC).reset_index()
+    overview_figures = {
+        'goals': lambda: px.bar(team_stats(), x='Club', y=['Goals', 'Goals Conceded'], barmode='group'),
+        'shots': lambda: px.scatter(team_stats(), x='Shots', y='Goals', text='Club'),
+        'style': lambda: px.scatter(team_stats(), x='Goals_per_90', y='Defensive_per_90', text='Club')
+    }
+    figures = FigureCache()
+    keys = {chart: ('suite', chart, filter_key(*selection), 'v1', ()) for chart in overview_figures}
+    results['overview figures build'] = best_of(lambda: [build() for build in overview_figures.values()], repeat)
+    for chart, build in overview_figures.items():
+        figures.get(keys[chart], build)
+    results['figure cache hit'] = best_of(
+        lambda: [figures.get(keys[chart], build) for chart, build in overview_figures.items()], repeat
+    )
+
+    results['bootstrap bands'] = best_of(
+        lambda: BootstrapEngine(df).bands(*selection, n_resamples=BOOTSTRAP_RESAMPLES), repeat
+    )
+    return n_rows, results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, threshold):
+    """Print old vs new timings of every common case; return the regressed ones"""
+    old = {(r['case'], r['scale']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    print(f"{'case':>28} {'scale':>6} {'old (ms)':>10} {'new (ms)':>10} {'change':>8}")
+    for r in current['results']:
+        key = (r['case'], r['scale'])
+        if key not in old:
+            continue
+        before, after = old[key], r['seconds']
+        change = after / before - 1 if before else 0.0
+        regressed = change > threshold and after - before > NOISE_FLOOR
+        if regressed:
+            regressions.append(key)
+        print(f"{r['case']:>28} {r['scale']:>5}x {before * 1000:>10.2f} {after * 1000:>10.2f} "
+              f"{change:>+7.0%}{'  SLOWER' if regressed else ''}")
+    print(f"{len(regressions)} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='result file to compare this run against')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='compare two result files without running')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown flagged as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (json.loads(Path(path).read_text()) for path in args.compare)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    base_rows = len(pd.read_csv(SOURCE_PATH, usecols=[0]))
+    current = {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+            'base_rows': base_rows
+        },
+        'results': []
+    }
+    print(f"{'case':>28} {'scale':>6} {'rows':>8} {'best (ms)':>10}")
+    for scale in args.scales:
+        n_rows, results = run_scale(scale, base_rows, args.repeat)
+        for case, seconds in results.items():
+            current['results'].append({'case': case, 'scale': scale, 'rows': n_rows, 'seconds': seconds})
+            print(f"{case:>28} {scale:>5}x {n_rows:>8} {seconds * 1000:>10.2f}")
+
+    Path(args.output).write_text(json.dumps(current, indent=2) + '\n')
+    print(f"results written to {args.output}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Make the app packages (utils, components) importable from the benchmarks
+APP_DIR = Path(__file__).parent.parent / 'app'
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+SOURCE_PATH = Path(__file__).parent.parent / 'data' / 'epl_player_stats_24_25.csv'
+
+
+def make_players(n_rows, seed=0):
+    """
+    Build a synthetic player table with the exact schema of the season CSV
+    by resampling real rows; player names get a suffix so they stay unique
+    """
+    source = pd.read_csv(SOURCE_PATH)
+    rng = np.random.default_rng(seed)
+    df = source.iloc[rng.integers(0, len(source), n_rows)].reset_index(drop=True)
+    df['Player Name'] = df['Player Name'] + ' #' + pd.Series(np.arange(n_rows)).astype(str)
+    return df
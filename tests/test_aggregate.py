@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.aggregate as aggregate
+
+SEASON_CSV = Path(__file__).parent.parent / 'data' / 'epl_player_stats_24_25.csv'
+
+
+@pytest.fixture
+def match_rows(tmp_path):
+    """60 season rows relabelled as match lines of 7 players, written to a CSV"""
+    df = pd.read_csv(SEASON_CSV).head(60).reset_index(drop=True)
+    player = pd.Series(np.arange(len(df)) % 7)
+    df['Player Name'] = 'Player ' + player.astype(str)
+    df['Club'] = np.where(player < 4, 'Arsenal', 'Chelsea')
+    # Player 0 never attempts a pass, so Passes % falls back to the plain mean
+    df.loc[player == 0, 'Passes'] = 0
+    # A gap in one chunk turns the column into floats, as in one eager read
+    df.loc[45, 'Tackles'] = np.nan
+    path = tmp_path / 'matches.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_streamed_equals_eager(match_rows, monkeypatch):
+    # Eight rows per chunk, so partials of several chunks are combined
+    monkeypatch.setattr(aggregate, 'chunk_rows', lambda path, budget: 8)
+    eager = aggregate.aggregate_players(pd.read_csv(match_rows))
+    streamed = aggregate.stream_players(match_rows)
+    assert len(streamed) == 7
+    pd.testing.assert_frame_equal(streamed, eager, rtol=1e-12)
+
+
+def test_zero_weight_rate_falls_back_to_mean(match_rows):
+    source = pd.read_csv(match_rows)
+    players = aggregate.aggregate_players(source).set_index('Player Name')
+    expected = source.loc[source['Player Name'] == 'Player 0', 'Passes %'].mean()
+    # Passes % is an integer column in the source and stays one
+    assert players.loc['Player 0', 'Passes %'] == np.rint(expected)
+
+
+def test_player_level_input_is_unchanged():
+    source = pd.read_csv(SEASON_CSV).head(30)
+    source = source.drop_duplicates(['Player Name', 'Club']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(aggregate.aggregate_players(source), source, rtol=1e-12)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.correlation import CorrelationCube
+
+METRICS = ['Goals', 'Passes', 'Tackles', 'Saves', 'Constant']
+
+
+def make_frame(with_missing):
+    rng = np.random.default_rng(3)
+    n = 24
+    df = pd.DataFrame({
+        'Club': np.array(['Arsenal', 'Chelsea', 'Everton'])[np.arange(n) % 3],
+        'Position': np.array(['DEF', 'MID'])[np.arange(n) % 2],
+        'Minutes': rng.integers(0, 3000, n),
+        'Goals': rng.poisson(4, n).astype(float),
+        'Passes': rng.normal(800, 200, n),
+        'Tackles': rng.poisson(30, n).astype(float),
+        'Saves': rng.poisson(2, n).astype(float),
+        # No spread: every correlation with it is NaN
+        'Constant': np.full(n, 5.0)
+    })
+    if with_missing:
+        df.loc[[1, 4, 9, 17], 'Goals'] = np.nan
+        df.loc[[4, 5, 20], 'Tackles'] = np.nan
+        # Saves is present on two rows only
+        df.loc[2:, 'Saves'] = np.nan
+    return df
+
+
+def expected(df, teams, positions, min_minutes):
+    rows = df['Minutes'] >= min_minutes
+    if teams:
+        rows &= df['Club'].isin(teams)
+    if positions:
+        rows &= df['Position'].isin(positions)
+    return df.loc[rows, METRICS].corr()
+
+
+@pytest.mark.parametrize('with_missing', [False, True])
+@pytest.mark.parametrize('teams, positions, min_minutes', [
+    (None, None, 0),
+    (['Arsenal', 'Everton'], None, 0),
+    (None, ['MID'], 0),
+    # Few rows below the threshold are subtracted from the cells...
+    (None, None, 300),
+    # ...many are recomputed from the rows above it
+    (['Chelsea'], None, 2000),
+    (['Chelsea'], ['DEF'], 3000),
+])
+def test_matches_pairwise_corr(with_missing, teams, positions, min_minutes):
+    df = make_frame(with_missing)
+    cube = CorrelationCube(df)
+    assert cube.has_missing == with_missing
+    result = cube.corr(METRICS, teams, positions, min_minutes)
+    pd.testing.assert_frame_equal(result, expected(df, teams, positions, min_minutes), rtol=1e-9, atol=1e-12)
+
+
+def test_constant_metric_is_nan():
+    result = CorrelationCube(make_frame(False)).corr(METRICS)
+    assert result['Constant'].isna().all()
+    assert result.loc['Goals', 'Goals'] == 1.0
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+import utils.data_loader as data_loader
+import utils.group_stats as gs
+from utils.indices import INDEX_COMPONENTS, PERFORMANCE_WEIGHTS, IndexStore
+
+SEASON_CSV = Path(__file__).parent.parent / 'data' / 'epl_player_stats_24_25.csv'
+
+# scipy warns about the constant column the fixture adds on purpose
+pytestmark = pytest.mark.filterwarnings('ignore:Precision loss:RuntimeWarning')
+
+
+@pytest.fixture(scope='module')
+def players():
+    df = pd.read_csv(SEASON_CSV).head(150)
+    # No spread: its z-scores and the index built on it are NaN
+    df['Blocks'] = 3
+    df = data_loader.preprocess(df)
+    # Missing values are left out of the cohort moments, as nan_policy='omit'
+    df.loc[df.index[[2, 7, 30]], 'Goals_per_90'] = np.nan
+    return gs.normalize_metrics(df)
+
+
+def zscores(values):
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return stats.zscore(values, nan_policy='omit')
+
+
+def cohort(df, teams, positions, min_minutes):
+    rows = df['Minutes'] >= min_minutes
+    if teams:
+        rows &= df['Club'].isin(teams)
+    if positions:
+        rows &= df['Position'].isin(positions)
+    return df[rows]
+
+
+def assert_scores(result, expected):
+    for name, components in INDEX_COMPONENTS.items():
+        expected[name] = sum(expected[f'{metric}_z'] for metric in components) / len(components)
+    expected['Performance_Score'] = sum(expected[f'{metric}_z'] * weight for metric, weight in PERFORMANCE_WEIGHTS.items())
+    for column, values in expected.items():
+        np.testing.assert_allclose(result[column], values, rtol=1e-7, atol=1e-9, equal_nan=True, err_msg=column)
+
+
+@pytest.mark.parametrize('teams, positions, min_minutes', [
+    (None, None, 0),
+    (['Arsenal', 'Aston Villa'], None, 0),
+    (None, ['MID', 'DEF'], 900),
+])
+def test_zscores_match_scipy(players, teams, positions, min_minutes):
+    store = IndexStore(players, 'test')
+    result = store.scores(teams, positions, min_minutes)
+    rows = cohort(players, teams, positions, min_minutes)
+    assert list(result.index) == list(rows.index)
+    expected = pd.DataFrame({f'{metric}_z': zscores(rows[metric]) for metric in store.metrics}, index=rows.index)
+    assert expected['Blocks_z'].isna().all()
+    assert_scores(result, expected)
+
+
+def test_zscores_by_position_match_scipy(players):
+    store = IndexStore(players, 'test')
+    result = store.scores(min_minutes=450, by='Position')
+    rows = cohort(players, None, None, 450)
+    expected = pd.DataFrame({
+        f'{metric}_z': rows.groupby('Position', observed=True)[metric].transform(zscores)
+        for metric in store.metrics
+    }, index=rows.index)
+    assert_scores(result, expected)
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = Path(__file__).parent.parent / 'app'
+
+
+def widget(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+@pytest.mark.parametrize('teams, positions, min_minutes', [
+    ([], [], 3000),
+    (['Arsenal'], ['GKP'], 2000),
+    ([], ['GKP'], 0),
+])
+def test_sections_open_under_narrow_filters(teams, positions, min_minutes):
+    at = AppTest.from_file(str(APP / 'main.py'), default_timeout=120)
+    at.run()
+    widget(at.sidebar.multiselect, "Select Team(s)").set_value(teams)
+    widget(at.sidebar.multiselect, "Select Position(s)").set_value(positions)
+    widget(at.sidebar.slider, "Minimum Minutes Played").set_value(min_minutes)
+    at.run()
+    assert not at.exception, at.exception
+
+    # Every on-demand section, including the efficiency scatters sized by 0/0-prone ratios
+    for toggle in at.main.toggle:
+        toggle.set_value(True)
+    at.run()
+    assert not at.exception, at.exception
@@ -0,0 +1,47 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = Path(__file__).parent.parent / 'app'
+
+import utils.cache as cache
+import utils.catalog as catalog
+import utils.data_loader as data_loader
+
+
+@pytest.fixture
+def two_seasons(tmp_path, monkeypatch):
+    """Catalog with the season CSV served as two seasons of the same league"""
+    shutil.copy(catalog.DATA_DIR / 'epl_player_stats_24_25.csv', tmp_path / 'players.csv')
+    with open(tmp_path / 'catalog.json', 'w') as f:
+        json.dump({'partitions': [
+            {'league': 'Premier League', 'season': '2024-25', 'path': 'players.csv'},
+            {'league': 'Premier League', 'season': '2023-24', 'path': 'players.csv'},
+        ]}, f)
+    monkeypatch.setattr(catalog, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(catalog, 'CATALOG_PATH', tmp_path / 'catalog.json')
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path / '.cache')
+    data_loader.load_partition.cache_clear()
+    data_loader._datasets.clear()
+    yield
+    data_loader.load_partition.cache_clear()
+    data_loader._datasets.clear()
+
+
+def test_switching_partitions_drops_selected_players(two_seasons):
+    at = AppTest.from_file(str(APP / 'main.py'), default_timeout=120)
+    at.run()
+    at.sidebar.selectbox[0].select("Player Analysis").run()
+    players = at.main.multiselect[0]
+    players.set_value(players.options[:2]).run()
+    assert not at.exception, at.exception
+    assert len(at.session_state['compare_players']) == 2
+
+    seasons = [m for m in at.sidebar.multiselect if m.label == "Select Season(s)"][0]
+    seasons.set_value(['2023-24']).run()
+    assert not at.exception, at.exception
+    assert at.session_state['compare_players'] == []
+    assert at.main.info[0].value == "Please select players to analyze"
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.group_stats as gs
+
+SEASON_CSV = Path(__file__).parent.parent / 'data' / 'epl_player_stats_24_25.csv'
+
+ROW_WISE = {
+    'Forward_Score': gs.calculate_forward_score,
+    'Midfielder_Score': gs.calculate_midfielder_score,
+    'Defender_Score': gs.calculate_defender_score,
+    'Goalkeeper_Score': gs.calculate_goalkeeper_score
+}
+
+
+@pytest.fixture
+def players():
+    df = pd.read_csv(SEASON_CSV).head(40)
+    # A goalkeeper-only metric and a metric every outfield role weights go missing
+    df.loc[0, 'Saves %'] = np.nan
+    df.loc[1, 'Goals'] = np.nan
+    return df
+
+
+def test_matrix_scores_match_row_wise(players):
+    scores = gs.calculate_role_scores(players)
+    for role, score in ROW_WISE.items():
+        expected = players.apply(score, axis=1).astype(float)
+        np.testing.assert_allclose(scores[role], expected, rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+def test_missing_metric_only_voids_roles_that_weight_it(players):
+    scores = gs.calculate_role_scores(players)
+    assert np.isnan(scores.loc[0, 'Goalkeeper_Score'])
+    assert scores.loc[0, ['Forward_Score', 'Midfielder_Score', 'Defender_Score']].notna().all()
+    assert scores.loc[1, ['Forward_Score', 'Midfielder_Score']].isna().all()
+    assert scores.loc[1, ['Defender_Score', 'Goalkeeper_Score']].notna().all()
+
+
+def test_constant_rows_score_alike(players):
+    same = pd.concat([players.iloc[[5]]] * 3, ignore_index=True)
+    scores = gs.calculate_role_scores(same)
+    assert (scores.nunique() == 1).all()